@@ -0,0 +1,50 @@
+"""
+BirdScrapyd worker agent.
+
+Runs spider executions queued through the API. Start any number of agents, on any
+machine that can reach the database (DATABASE_URL) and share the item and log
+directories with the API:
+
+    python agent.py [--concurrency 4] [--worker-id NAME] [--once]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+
+from app.db.init_db import init_db
+from app.services import SpiderService, ScrapyWorkerPool, WorkerAgent
+
+
+async def main(args):
+    worker_pool = ScrapyWorkerPool() if os.getenv("SPIDER_RUNNER", "pool") == "pool" else None
+    if worker_pool is not None:
+        await worker_pool.start()
+
+    agent = WorkerAgent(
+        SpiderService(worker_pool=worker_pool),
+        concurrency=args.concurrency,
+        worker_id=args.worker_id
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, agent.stop)
+
+    try:
+        await agent.run(exit_when_idle=args.once)
+    finally:
+        if worker_pool is not None:
+            await worker_pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=None, help="executions run at the same time")
+    parser.add_argument("--worker-id", default=None, help="name of this agent (default: host and pid)")
+    parser.add_argument("--once", action="store_true", help="exit once the queue is empty")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    init_db()
+    asyncio.run(main(args))
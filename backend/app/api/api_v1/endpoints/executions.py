@@ -0,0 +1,124 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse, FileResponse
+from typing import Dict, Any, Optional
+import json
+import os
+
+from app.api.api_v1.endpoints.spiders import spider_service, scheduler
+from app.schemas import ItemQuery
+from app.services.spider_service import ACTIVE_STATUSES
+from app.services.columnar import columnar_available
+
+router = APIRouter()
+
+
+@router.get("/queue")
+async def get_queue_stats() -> Dict[str, Any]:
+    """
+    Get the execution queue depth, worker usage and wait times
+    """
+    return await scheduler.get_queue_stats()
+
+
+@router.get("/{execution_id}")
+async def get_execution(execution_id: str) -> Dict[str, Any]:
+    """
+    Get a specific execution by ID
+    """
+    execution = await spider_service.get_execution(execution_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return execution
+
+
+@router.get("/{execution_id}/items")
+async def get_execution_items(
+    execution_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    tail: Optional[int] = Query(None, ge=1, le=1000),
+    follow: bool = False
+):
+    """
+    Get the items scraped by an execution, a page at a time.
+
+    - **offset**/**limit**: page of items; `next_offset` is the offset of the next page
+    - **tail**: return the last N items instead
+    - **follow**: stream the items from offset (or the tail) on as JSON Lines,
+      including new ones, until the execution ends
+    """
+    if not await spider_service.get_execution(execution_id):
+        raise HTTPException(status_code=404, detail="Execution not found")
+
+    if not follow:
+        return await spider_service.get_execution_items(execution_id, offset, limit, tail)
+
+    if tail is not None:
+        offset = max(0, spider_service.item_store.count(execution_id) - tail)
+
+    async def stream():
+        async for item in spider_service.follow_execution_items(execution_id, offset):
+            yield json.dumps(item) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.get("/{execution_id}/log")
+async def get_execution_log(
+    execution_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=5000),
+    tail: Optional[int] = Query(None, ge=1, le=5000)
+) -> Dict[str, Any]:
+    """
+    Get the log of an execution by line offset.
+
+    - **offset**/**limit**: range of lines; `next_offset` is the offset of the next range
+    - **tail**: return the last N lines instead
+    """
+    if not await spider_service.get_execution(execution_id):
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return await spider_service.get_execution_log(execution_id, offset, limit, tail)
+
+
+async def _finished_execution(execution_id: str) -> Dict[str, Any]:
+    """Get an execution whose items are final"""
+    execution = await spider_service.get_execution(execution_id)
+    if not execution:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    if execution["status"] in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail="Execution is still in progress")
+    return execution
+
+
+@router.post("/{execution_id}/items/query")
+async def query_execution_items(execution_id: str, query: ItemQuery) -> Dict[str, Any]:
+    """
+    Query the items of a finished execution without downloading them.
+
+    - **columns**: columns to return (all when omitted)
+    - **filters**: conditions on columns, all of which must hold
+    - **group_by**/**aggregates**: e.g. `{"function": "count"}`, `{"function": "count_distinct", "column": "url"}`
+    """
+    await _finished_execution(execution_id)
+    try:
+        return await spider_service.query_execution_items(execution_id, query.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+
+@router.get("/{execution_id}/items.parquet")
+async def download_execution_items(execution_id: str):
+    """
+    Download the items of a finished execution as a Parquet file
+    """
+    execution = await _finished_execution(execution_id)
+    if not columnar_available():
+        raise HTTPException(status_code=501, detail="pyarrow is required to export items")
+    path = spider_service.item_store.columnar_path(execution_id)
+    if not os.path.exists(path) and not await spider_service.export_execution_items(execution_id):
+        raise HTTPException(status_code=404, detail="No items to export")
+    return FileResponse(path, media_type="application/vnd.apache.parquet",
+                        filename=f"{execution['spider_id']}_{execution_id}.parquet")
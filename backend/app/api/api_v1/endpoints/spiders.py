@@ -1,14 +1,20 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+import os
 
-from app.services import SpiderService
+from app.services import SpiderService, SpiderScheduler, ScrapyWorkerPool
+from app.services.pagination import NEXT_CURSOR_HEADER
 from app.schemas import (
     SpiderConfig, SpiderCreate, SpiderRead, SpiderUpdate,
-    UrlValidationRequest, UrlAnalysisResponse
+    UrlValidationRequest, UrlAnalysisResponse, SpiderPreviewRequest, UrlBatchAnalysisRequest
 )
 
 router = APIRouter()
-spider_service = SpiderService()
+# Run spiders on warm Scrapy workers unless SPIDER_RUNNER=subprocess
+worker_pool = ScrapyWorkerPool() if os.getenv("SPIDER_RUNNER", "pool") == "pool" else None
+spider_service = SpiderService(worker_pool=worker_pool)
+scheduler = SpiderScheduler(spider_service)
 
 
 @router.post("/", response_model=SpiderRead)
@@ -22,12 +28,28 @@ async def create_spider(spider: SpiderCreate):
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.get("/", response_model=List[SpiderRead])
-async def get_spiders():
+@router.get("/", response_model=List[dict])
+async def get_spiders(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
     """
-    Get all spider configurations
+    Get the spider configurations, oldest first
+
+    - **fields**: comma-separated fields to return; by default a summary
+      (id, name, status, created_at, updated_at) without the URLs, blocks and settings
+    - **limit**/**cursor**: page of spiders; the `X-Next-Cursor` header holds the
+      cursor of the next page and is absent on the last one
     """
-    return await spider_service.get_all_spiders()
+    try:
+        spiders, next_cursor = await spider_service.list_spiders(limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return spiders
 
 
 @router.get("/{spider_id}", response_model=SpiderRead)
@@ -64,23 +86,33 @@ async def delete_spider(spider_id: str):
 
 
 @router.post("/{spider_id}/run", status_code=202)
-async def run_spider(spider_id: str, background_tasks: BackgroundTasks):
+async def run_spider(spider_id: str, background_tasks: BackgroundTasks, priority: int = 0):
     """
-    Run a spider in the background
+    Queue a spider run; it starts as soon as a worker slot is free
     """
     # First check if the spider exists
     spider = await spider_service.get_spider(spider_id)
     if not spider:
         raise HTTPException(status_code=404, detail="Spider not found")
 
-    # Check if the spider is already running
-    if spider.status == "running":
-        raise HTTPException(status_code=400, detail="Spider is already running")
+    # Check if the spider is already running or waiting to run
+    if spider.status in ("running", "queued"):
+        raise HTTPException(status_code=400, detail=f"Spider is already {spider.status}")
+    if spider.status == "paused":
+        raise HTTPException(status_code=400, detail="Spider is paused, resume or stop it first")
 
-    # Run the spider in the background
-    background_tasks.add_task(spider_service.run_spider, spider_id)
+    execution = await scheduler.enqueue(spider_id, priority=priority)
 
-    return {"success": True, "message": f"Spider {spider.name} started"}
+    # Start a worker in the background if the pool has room for one
+    if scheduler.reserve_worker():
+        background_tasks.add_task(scheduler.run_worker)
+
+    return {
+        "success": True,
+        "message": f"Spider {spider.name} queued",
+        "execution_id": execution["id"],
+        "status": execution["status"]
+    }
 
 
 @router.post("/{spider_id}/stop")
@@ -93,34 +125,139 @@ async def stop_spider(spider_id: str):
     if not spider:
         raise HTTPException(status_code=404, detail="Spider not found")
 
+    # A queued run is simply removed from the queue
+    if spider.status == "queued":
+        await scheduler.cancel(spider_id)
+        return {"success": True, "message": f"Spider {spider.name} removed from the queue"}
+
+    # A paused run only has its saved state left
+    if spider.status == "paused":
+        await spider_service.discard_paused(spider_id)
+        return {"success": True, "message": f"Paused run of spider {spider.name} stopped"}
+
     # Check if the spider is running
     if spider.status != "running":
         raise HTTPException(status_code=400, detail="Spider is not running")
 
     # Stop the spider
     result = await spider_service.stop_spider(spider_id)
-    if not result:
-        raise HTTPException(status_code=400, detail="Failed to stop spider")
+    if result:
+        return {"success": True, "message": f"Spider {spider.name} stopped"}
+
+    # The run belongs to a worker agent, which stops it on its next heartbeat
+    if await scheduler.request_stop(spider_id):
+        return {"success": True, "message": f"Stop of spider {spider.name} requested"}
+
+    raise HTTPException(status_code=400, detail="Failed to stop spider")
+
+
+@router.post("/{spider_id}/pause", status_code=202)
+async def pause_spider(spider_id: str):
+    """
+    Pause a running spider; its crawl state is saved so the run can be resumed
+    """
+    spider = await spider_service.get_spider(spider_id)
+    if not spider:
+        raise HTTPException(status_code=404, detail="Spider not found")
+
+    if spider.status != "running":
+        raise HTTPException(status_code=400, detail="Spider is not running")
+
+    if not (spider.settings or {}).get("PAUSABLE"):
+        raise HTTPException(status_code=400, detail="Spider is not pausable; set \"PAUSABLE\": true in its settings")
+
+    # The crawl finishes its requests in progress before it reports "paused"
+    try:
+        if await spider_service.pause_spider(spider_id):
+            return {"success": True, "message": f"Spider {spider.name} is pausing"}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The run belongs to a worker agent, which pauses it on its next heartbeat
+    if await scheduler.request_pause(spider_id):
+        return {"success": True, "message": f"Pause of spider {spider.name} requested"}
+
+    raise HTTPException(status_code=400, detail="Failed to pause spider")
+
+
+@router.post("/{spider_id}/resume", status_code=202)
+async def resume_spider(spider_id: str, background_tasks: BackgroundTasks, priority: Optional[int] = None):
+    """
+    Queue the paused run of a spider; it continues from its saved crawl state
+    """
+    spider = await spider_service.get_spider(spider_id)
+    if not spider:
+        raise HTTPException(status_code=404, detail="Spider not found")
+
+    execution = await scheduler.resume_paused(spider_id, priority=priority)
+    if execution is None:
+        raise HTTPException(status_code=400, detail="Spider is not paused")
+
+    if scheduler.reserve_worker():
+        background_tasks.add_task(scheduler.run_worker)
 
-    return {"success": True, "message": f"Spider {spider.name} stopped"}
+    return {
+        "success": True,
+        "message": f"Spider {spider.name} queued to resume",
+        "execution_id": execution["id"],
+        "status": execution["status"]
+    }
 
 
 @router.get("/{spider_id}/executions", response_model=List[dict])
-async def get_spider_executions(spider_id: str):
+async def get_spider_executions(
+    spider_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
     """
-    Get the execution history for a spider
+    Get the execution history for a spider, newest first
+
+    - **fields**: comma-separated fields to return; by default a summary without
+      error_message and stats
+    - **limit**/**cursor**: page of executions; the `X-Next-Cursor` header holds
+      the cursor of the next page and is absent on the last one
     """
     # First check if the spider exists
     spider = await spider_service.get_spider(spider_id)
     if not spider:
         raise HTTPException(status_code=404, detail="Spider not found")
 
-    # Get the execution history
-    executions = await spider_service.get_spider_executions(spider_id)
-
+    # Get a page of the execution history
+    try:
+        executions, next_cursor = await spider_service.get_spider_executions(spider_id, limit, cursor, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return executions
 
 
+@router.get("/{spider_id}/http-cache")
+async def get_http_cache(spider_id: str):
+    """
+    Get the number and size of the pages cached for a spider
+    """
+    spider = await spider_service.get_spider(spider_id)
+    if not spider:
+        raise HTTPException(status_code=404, detail="Spider not found")
+    return {"spider_id": spider_id, **await spider_service.get_http_cache(spider_id)}
+
+
+@router.delete("/{spider_id}/http-cache")
+async def purge_http_cache(spider_id: str):
+    """
+    Drop the cached pages of a spider, so its next run downloads every page
+    """
+    spider = await spider_service.get_spider(spider_id)
+    if not spider:
+        raise HTTPException(status_code=404, detail="Spider not found")
+    purged = await spider_service.purge_http_cache(spider_id)
+    return {"success": True, "spider_id": spider_id, "purged": purged}
+
+
 @router.post("/validate")
 async def validate_spider_config(config: SpiderConfig):
     """
@@ -129,7 +266,26 @@ async def validate_spider_config(config: SpiderConfig):
     is_valid, message = await spider_service.validate_spider_config(config)
     if not is_valid:
         raise HTTPException(status_code=400, detail=message)
-    return {"valid": True, "message": "Configuration is valid"}
+    return {
+        "valid": True,
+        "message": message,
+        "cost": spider_service.estimate_cost(config),
+        "warnings": spider_service.graph_warnings(config)
+    }
+
+
+@router.post("/preview")
+async def preview_spider(request: SpiderPreviewRequest):
+    """
+    Dry run a spider configuration against one page, given by URL or as an HTML
+    snapshot, and return the first items with per-block match counts and timings
+    """
+    try:
+        return await spider_service.preview_spider(
+            request.config, url=request.url, html=request.html, limit=request.limit
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.post("/analyze-url", response_model=UrlAnalysisResponse)
@@ -141,3 +297,25 @@ async def analyze_url(request: UrlValidationRequest):
         return await spider_service.analyze_url(request.url)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/analysis/stats")
+async def get_analysis_stats():
+    """
+    Get the page cache and parse pool statistics of URL analyses and previews,
+    including the time pages wait for and spend in the parse pool
+    """
+    return {"page_cache": spider_service.page_cache.stats(), "parse_pool": spider_service.parse_pool.stats()}
+
+
+@router.post("/analyze-urls")
+async def analyze_urls(request: UrlBatchAnalysisRequest):
+    """
+    Analyze several URLs concurrently; the results are streamed as JSON Lines in
+    the order the analyses finish
+    """
+    async def stream():
+        async for result in spider_service.analyze_urls(request.urls):
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -1,4 +1,4 @@
 """Database package initialization"""
-from .database import SessionLocal
+from .database import SessionLocal, AsyncSessionLocal
 
-__all__ = ['SessionLocal']
+__all__ = ['SessionLocal', 'AsyncSessionLocal']
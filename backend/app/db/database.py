@@ -1,17 +1,139 @@
 """Database configuration module"""
-from sqlalchemy import create_engine, func
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
 import os
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///birdscrapyd.db")
 
+# Engine settings: `auto` picks the profile of the database backend, `default`
+# keeps SQLAlchemy's defaults
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "auto")
+
+# Connections kept open per engine and opened on top of them under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+# Seconds after which PostgreSQL connections are replaced, and milliseconds a
+# statement may run before the server cancels it (0 disables the limit)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT = int(os.getenv("DB_STATEMENT_TIMEOUT", "30000"))
+
+# Milliseconds a SQLite connection waits for a lock, and bytes of the file mapped into memory
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "15000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Async drivers used by the API for each database backend
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def async_database_url(url: str) -> str:
+    """The URL of the same database for its async driver, e.g. sqlite+aiosqlite://"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None or url.get_driver_name() == driver:
+        return url.render_as_string(hide_password=False)
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL)
+
+PROFILES = ("default", "sqlite", "postgresql")
+
+
+def database_profile(url: str, profile: Optional[str] = None) -> str:
+    """The engine profile for a database URL"""
+    profile = profile or DATABASE_PROFILE
+    backend = make_url(url).get_backend_name()
+    if profile == "auto":
+        return backend if backend in PROFILES else "default"
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown database profile {profile!r}, expected auto or one of {', '.join(PROFILES)}")
+    if profile != "default" and profile != backend:
+        raise ValueError(f"The {profile} profile does not apply to a {backend} database")
+    return profile
+
+
+def _in_memory(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+
+def engine_options(url: str, profile: Optional[str] = None, is_async: bool = False) -> Dict[str, Any]:
+    """Keyword arguments of create_engine / create_async_engine for a profile"""
+    profile = database_profile(url, profile)
+    url = make_url(url)
+    if profile == "postgresql":
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            # Connections dropped by the server or a proxy are replaced before use
+            "pool_pre_ping": True,
+            "pool_recycle": DB_POOL_RECYCLE,
+        }
+        if DB_STATEMENT_TIMEOUT:
+            if is_async:
+                options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT)}}
+            else:
+                options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT}"}
+        return options
+    if profile == "sqlite":
+        options: Dict[str, Any] = {}
+        if not is_async:
+            # Sync sessions are created in FastAPI's threadpool and closed in
+            # another thread; the pool hands a connection to one thread at a time
+            options["connect_args"] = {"check_same_thread": False}
+        if not _in_memory(url):
+            # In-memory databases keep SQLAlchemy's single-connection pool
+            options["pool_size"] = DB_POOL_SIZE
+            options["max_overflow"] = DB_MAX_OVERFLOW
+        return options
+    return {}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        # Readers no longer block the writer and the writer no longer blocks readers
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Durable across application crashes; only a power loss may lose the last commits
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    finally:
+        cursor.close()
+
+
+def create_database_engine(url: str, profile: Optional[str] = None) -> Engine:
+    """Synchronous engine configured by its profile"""
+    engine = create_engine(url, **engine_options(url, profile))
+    if database_profile(url, profile) == "sqlite" and not _in_memory(make_url(url)):
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+def create_async_database_engine(url: str, profile: Optional[str] = None) -> AsyncEngine:
+    """Async engine configured by its profile"""
+    engine = create_async_engine(url, **engine_options(url, profile, is_async=True))
+    if database_profile(url, profile) == "sqlite" and not _in_memory(make_url(url)):
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
 # Create database engine
-engine = create_engine(DATABASE_URL)
+engine = create_database_engine(DATABASE_URL)
 
 # Create SessionLocal class for database sessions
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and sessions of the API, so queries do not block the event loop.
+# The synchronous ones remain for scripts, worker agents' leases and sync endpoints.
+async_engine = create_async_database_engine(ASYNC_DATABASE_URL)
+
+# Objects stay usable after commit, since API responses are built from them
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Export func for aggregate operations
 sql = func
 
@@ -27,5 +149,13 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.close()
 
-# Export SessionLocal, get_db, and sql
-__all__ = ["SessionLocal", "get_db", "sql"]
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session for `async def` endpoints.
+    The session is closed after the request.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Export the sessions, their dependencies and sql
+__all__ = ["SessionLocal", "AsyncSessionLocal", "get_db", "get_async_db", "sql"]
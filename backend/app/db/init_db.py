@@ -1,5 +1,8 @@
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
 from app.db.database import engine, SessionLocal
-from app.models.models import Base, User
+from app.models.models import User
 from app.core.auth import get_password_hash
 import os
 from dotenv import load_dotenv
@@ -7,9 +10,28 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+# Revision of the schema that create_all built before migrations existed
+BASELINE_REVISION = "0001"
+
+def migrate(bind=None, revision: str = "head"):
+    """
+    Upgrade the database to a migration revision. Databases created before
+    migrations existed are stamped with the baseline revision first.
+    """
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    with (bind or engine).begin() as connection:
+        config.attributes["connection"] = connection
+        tables = inspect(connection).get_table_names()
+        if "spiders" in tables and "alembic_version" not in tables:
+            command.stamp(config, BASELINE_REVISION)
+        command.upgrade(config, revision)
+
 def init_db():
-    # Create all tables defined in models
-    Base.metadata.create_all(bind=engine)
+    # Create or upgrade the tables through the migrations in app/db/migrations
+    migrate()
 
     # Create superuser if doesn't exist
     create_superuser()
@@ -0,0 +1,48 @@
+"""Alembic environment; migrations run on the connection given by init_db or on DATABASE_URL"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.db.database import DATABASE_URL, engine
+from app.models.models import Base
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _configure(**options):
+    context.configure(
+        target_metadata=target_metadata,
+        # SQLite cannot alter columns in place; batch operations recreate the table
+        render_as_batch=True,
+        **options,
+    )
+
+
+def run_migrations_offline():
+    """Emit the SQL of the migrations instead of running it (alembic upgrade --sql)"""
+    _configure(url=DATABASE_URL, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+    with engine.connect() as connection:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
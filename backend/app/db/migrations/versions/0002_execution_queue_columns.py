@@ -0,0 +1,41 @@
+"""Queue and lease columns of executions
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+Databases stamped with 0001 may already have some of these columns, added by
+create_all while the scheduler and the worker agents were introduced; only the
+missing ones are added.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    ("priority", sa.Integer),
+    ("queued_at", sa.DateTime),
+    ("worker_id", sa.String),
+    ("lease_expires_at", sa.DateTime),
+    ("heartbeat_at", sa.DateTime),
+    ("attempts", sa.Integer),
+)
+
+
+def upgrade():
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("spider_executions")}
+    with op.batch_alter_table("spider_executions") as batch:
+        for name, type_ in COLUMNS:
+            if name not in existing:
+                batch.add_column(sa.Column(name, type_(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("spider_executions") as batch:
+        for name, _ in reversed(COLUMNS):
+            batch.drop_column(name)
@@ -0,0 +1,34 @@
+"""Indexes of the execution queries
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_spider_executions_spider_id_started_at", "spider_executions",
+        ["spider_id", sa.text("started_at DESC")],
+    )
+    op.create_index(
+        "ix_spider_executions_status_priority_queued_at", "spider_executions",
+        ["status", sa.text("priority DESC"), "queued_at"],
+    )
+    op.create_index("ix_spider_executions_started_at", "spider_executions", ["started_at"])
+    op.create_index("ix_spider_executions_worker_id", "spider_executions", ["worker_id"])
+
+
+def downgrade():
+    op.drop_index("ix_spider_executions_worker_id", table_name="spider_executions")
+    op.drop_index("ix_spider_executions_started_at", table_name="spider_executions")
+    op.drop_index("ix_spider_executions_status_priority_queued_at", table_name="spider_executions")
+    op.drop_index("ix_spider_executions_spider_id_started_at", table_name="spider_executions")
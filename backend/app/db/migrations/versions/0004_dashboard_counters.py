@@ -0,0 +1,106 @@
+"""Dashboard counters maintained by triggers
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:03
+
+Counts of spiders and executions per status and the total of scraped items are
+kept in dashboard_counters by triggers on spiders and spider_executions, so
+they change in the same transaction as the rows whatever writes them (the
+API, worker agents, bulk updates). app.services.dashboard_counters rebuilds
+them from the tables.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+# table -> event -> [(counter name, delta, condition)]
+TRIGGERS = {
+    "spiders": {
+        "INSERT": [("'spiders:' || COALESCE(NEW.status, '')", "1", "1 = 1")],
+        "UPDATE": [
+            ("'spiders:' || COALESCE(OLD.status, '')", "-1", "COALESCE(OLD.status, '') <> COALESCE(NEW.status, '')"),
+            ("'spiders:' || COALESCE(NEW.status, '')", "1", "COALESCE(OLD.status, '') <> COALESCE(NEW.status, '')"),
+        ],
+        "DELETE": [("'spiders:' || COALESCE(OLD.status, '')", "-1", "1 = 1")],
+    },
+    "spider_executions": {
+        "INSERT": [
+            ("'executions:' || NEW.status", "1", "1 = 1"),
+            ("'items_scraped'", "COALESCE(NEW.items_scraped, 0)", "COALESCE(NEW.items_scraped, 0) <> 0"),
+        ],
+        "UPDATE": [
+            ("'executions:' || OLD.status", "-1", "OLD.status <> NEW.status"),
+            ("'executions:' || NEW.status", "1", "OLD.status <> NEW.status"),
+            ("'items_scraped'", "COALESCE(NEW.items_scraped, 0) - COALESCE(OLD.items_scraped, 0)",
+             "COALESCE(NEW.items_scraped, 0) <> COALESCE(OLD.items_scraped, 0)"),
+        ],
+        "DELETE": [
+            ("'executions:' || OLD.status", "-1", "1 = 1"),
+            ("'items_scraped'", "-COALESCE(OLD.items_scraped, 0)", "COALESCE(OLD.items_scraped, 0) <> 0"),
+        ],
+    },
+}
+
+
+def _statements(changes):
+    return "\n".join(
+        f"INSERT INTO dashboard_counters (name, value) SELECT {name}, {delta} WHERE {condition} "
+        f"ON CONFLICT (name) DO UPDATE SET value = dashboard_counters.value + excluded.value;"
+        for name, delta, condition in changes
+    )
+
+
+def _trigger_name(table, event):
+    return f"{table}_dashboard_counters_{event.lower()}"
+
+
+def upgrade():
+    op.create_table(
+        "dashboard_counters",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for table, events in TRIGGERS.items():
+        for event, changes in events.items():
+            name = _trigger_name(table, event)
+            if postgresql:
+                op.execute(
+                    f"CREATE FUNCTION {name}() RETURNS trigger LANGUAGE plpgsql AS $$\n"
+                    f"BEGIN\n{_statements(changes)}\nRETURN NULL;\nEND\n$$"
+                )
+                op.execute(f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW EXECUTE FUNCTION {name}()")
+            else:
+                op.execute(f"CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW BEGIN\n{_statements(changes)}\nEND")
+
+    # Counters of the existing rows
+    op.execute(
+        "INSERT INTO dashboard_counters (name, value) "
+        "SELECT 'spiders:' || COALESCE(status, ''), COUNT(*) FROM spiders GROUP BY COALESCE(status, '')"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, value) "
+        "SELECT 'executions:' || status, COUNT(*) FROM spider_executions GROUP BY status"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (name, value) "
+        "SELECT 'items_scraped', COALESCE(SUM(items_scraped), 0) FROM spider_executions"
+    )
+
+
+def downgrade():
+    postgresql = op.get_bind().dialect.name == "postgresql"
+    for table, events in TRIGGERS.items():
+        for event in events:
+            name = _trigger_name(table, event)
+            op.execute(f"DROP TRIGGER {name}" + (f" ON {table}" if postgresql else ""))
+            if postgresql:
+                op.execute(f"DROP FUNCTION {name}()")
+    op.drop_table("dashboard_counters")
@@ -0,0 +1,35 @@
+"""Indexes of the keyset-paginated listings
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:04
+
+Pages of a spider's executions continue after (started_at, id), so the ID
+becomes part of the index of a spider's executions.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_spider_executions_spider_id_started_at_id", "spider_executions",
+        ["spider_id", sa.text("started_at DESC"), sa.text("id DESC")],
+    )
+    op.drop_index("ix_spider_executions_spider_id_started_at", table_name="spider_executions")
+    op.create_index("ix_spiders_created_at_id", "spiders", ["created_at", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_spiders_created_at_id", table_name="spiders")
+    op.create_index(
+        "ix_spider_executions_spider_id_started_at", "spider_executions",
+        ["spider_id", sa.text("started_at DESC")],
+    )
+    op.drop_index("ix_spider_executions_spider_id_started_at_id", table_name="spider_executions")
@@ -0,0 +1,51 @@
+"""Creation time of executions
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:05
+
+Pages of a spider's executions continued after (started_at, id), but claiming
+and resuming an execution rewrite started_at, which moved it between pages.
+They continue after the creation time instead, which is set once. Existing
+executions get the time they were queued or started.
+
+Rows without a creation time come first in ascending and last in descending
+order, as SQLite sorts NULLs; PostgreSQL indexes are created with the same
+order so they serve the listings.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    postgresql = bind.dialect.name == "postgresql"
+    # Databases stamped with 0001 by create_all may have the column already
+    if "created_at" not in {column["name"] for column in sa.inspect(bind).get_columns("spider_executions")}:
+        op.add_column("spider_executions", sa.Column("created_at", sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE spider_executions SET created_at = COALESCE(queued_at, started_at, CURRENT_TIMESTAMP) "
+        "WHERE created_at IS NULL"
+    )
+    op.create_index(
+        "ix_spider_executions_spider_id_created_at_id", "spider_executions",
+        ["spider_id", sa.text("created_at DESC NULLS LAST" if postgresql else "created_at DESC"), sa.text("id DESC")],
+    )
+    if postgresql:
+        op.drop_index("ix_spiders_created_at_id", table_name="spiders")
+        op.create_index("ix_spiders_created_at_id", "spiders", [sa.text("created_at NULLS FIRST"), "id"])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.drop_index("ix_spiders_created_at_id", table_name="spiders")
+        op.create_index("ix_spiders_created_at_id", "spiders", ["created_at", "id"])
+    op.drop_index("ix_spider_executions_spider_id_created_at_id", table_name="spider_executions")
+    with op.batch_alter_table("spider_executions") as batch:
+        batch.drop_column("created_at")
@@ -1,6 +1,6 @@
 """Models package initialization"""
-from .models import Spider, SpiderExecution, User
+from .models import DashboardCounter, Spider, SpiderExecution, User
 
 Job = SpiderExecution  # Alias for backward compatibility
 
-__all__ = ['Spider', 'SpiderExecution', 'Job', 'User']
+__all__ = ['Spider', 'SpiderExecution', 'Job', 'User', 'DashboardCounter']
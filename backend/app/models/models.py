@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, JSON, Text, ForeignKey, Integer, Boolean
+from sqlalchemy import Column, String, DateTime, JSON, Text, ForeignKey, Integer, BigInteger, Boolean, Index
 from sqlalchemy.orm import relationship, DeclarativeBase
 import datetime
 import uuid
@@ -32,21 +32,60 @@ class Spider(Base):
     created_at = Column(DateTime, default=datetime.datetime.now)
     updated_at = Column(DateTime, nullable=True, onupdate=datetime.datetime.now)
 
+    # Keyset pages of the spider listing, oldest first
+    __table_args__ = (Index("ix_spiders_created_at_id", "created_at", "id"),)
+
 class SpiderExecution(Base):
     """SQLAlchemy model for spider execution records"""
     __tablename__ = "spider_executions"
 
     id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
     spider_id = Column(String, ForeignKey("spiders.id"), nullable=False)
-    status = Column(String, nullable=False)  # running, finished, error, idle
+    status = Column(String, nullable=False)  # queued, running, stopping, pausing, paused, finished, error, stopped, cancelled
+    priority = Column(Integer, default=0)
+    queued_at = Column(DateTime, nullable=True)
+    # Set once; started_at changes when the execution is claimed or resumed
+    created_at = Column(DateTime, default=datetime.datetime.now)
     started_at = Column(DateTime, default=datetime.datetime.now)
     finished_at = Column(DateTime, nullable=True)
     items_scraped = Column(Integer, default=0)
     error_message = Column(Text, nullable=True)
     stats = Column(JSON, nullable=True)
 
+    # Lease of the worker (API scheduler or agent) running the execution; an
+    # execution whose lease is not renewed in time is put back in the queue
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)
+
     # Relationship with Spider model
     spider = relationship("Spider", backref="executions")
 
+    # Indexes are created by the migrations in app/db/migrations; keep both in sync
+    __table_args__ = (
+        # Executions of a spider, newest first (job lists and their keyset pages)
+        Index("ix_spider_executions_spider_id_created_at_id", "spider_id", created_at.desc(), id.desc()),
+        # Latest run of a spider (stop/pause/resume lookups)
+        Index("ix_spider_executions_spider_id_started_at_id", "spider_id", started_at.desc(), id.desc()),
+        # Executions by status; queued ones in the order they are claimed
+        Index("ix_spider_executions_status_priority_queued_at", "status", priority.desc(), "queued_at"),
+        # Recent executions of all spiders
+        Index("ix_spider_executions_started_at", "started_at"),
+        # Executions leased by a worker
+        Index("ix_spider_executions_worker_id", "worker_id"),
+    )
+
+class DashboardCounter(Base):
+    """
+    Count of spiders or executions with a status ("spiders:idle",
+    "executions:finished") or the total of scraped items ("items_scraped").
+    Maintained by database triggers created in the migrations.
+    """
+    __tablename__ = "dashboard_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
 # Add Job model as an alias for SpiderExecution to maintain compatibility
 Job = SpiderExecution
@@ -1,8 +1,10 @@
 """Schemas package initialization"""
 from .spider import (
     SpiderConfig, SpiderCreate, SpiderRead, SpiderUpdate, SelectorInfo,
-    UrlValidationRequest, UrlAnalysisResponse, BlockBase, SpiderStatus
+    UrlValidationRequest, UrlAnalysisResponse, BlockBase, SpiderStatus, SpiderPreviewRequest,
+    UrlBatchAnalysisRequest, SpiderSummary
 )
+from .execution import ItemFilter, ItemAggregate, ItemQuery, ExecutionSummary
 
 __all__ = [
     'SpiderConfig',
@@ -13,5 +15,12 @@ __all__ = [
     'UrlValidationRequest',
     'UrlAnalysisResponse',
     'BlockBase',
-    'SpiderStatus'
+    'SpiderStatus',
+    'SpiderPreviewRequest',
+    'UrlBatchAnalysisRequest',
+    'SpiderSummary',
+    'ItemFilter',
+    'ItemAggregate',
+    'ItemQuery',
+    'ExecutionSummary'
 ]
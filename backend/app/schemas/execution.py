@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional, Any, Literal
+from datetime import datetime
+
+class ExecutionSummary(BaseModel):
+    """Schema for an execution in listings, without its error message and stats"""
+    id: str
+    spider_id: str
+    status: str
+    priority: Optional[int] = 0
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    items_scraped: Optional[int] = 0
+
+class ItemFilter(BaseModel):
+    """Schema for a condition on an item column"""
+    column: str
+    op: Literal["eq", "ne", "lt", "le", "gt", "ge", "in", "not_in", "contains", "is_null", "not_null"]
+    value: Optional[Any] = None
+
+class ItemAggregate(BaseModel):
+    """Schema for an aggregate over an item column (no column counts rows)"""
+    function: Literal["count", "count_distinct", "sum", "mean", "min", "max", "distinct"]
+    column: Optional[str] = None
+
+class ItemQuery(BaseModel):
+    """Schema for a projection, filter and group-by query over execution items"""
+    columns: Optional[List[str]] = None
+    filters: List[ItemFilter] = []
+    group_by: List[str] = []
+    aggregates: List[ItemAggregate] = []
+    limit: int = Field(default=1000, ge=1, le=10000)
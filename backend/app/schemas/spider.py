@@ -35,6 +35,23 @@ class SpiderRead(SpiderConfig):
     status: Optional[str] = "idle"
     # model_config already defined in SpiderConfig parent class with from_attributes=True
 
+class SpiderSummary(BaseModel):
+    """Schema for a spider in listings, without its URLs, blocks and settings"""
+    id: str
+    name: str
+    status: Optional[str] = "idle"
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+class SpiderPreviewRequest(BaseModel):
+    """Schema for a dry run of a spider configuration against one page"""
+    config: SpiderConfig
+    # Page to fetch; defaults to the first start URL
+    url: Optional[str] = None
+    # HTML snapshot to use instead of fetching the page
+    html: Optional[str] = None
+    limit: int = Field(default=20, ge=1, le=1000)
+
 class SpiderStatus(BaseModel):
     """Schema for spider execution status updates"""
     spider_id: str
@@ -50,6 +67,10 @@ class UrlValidationRequest(BaseModel):
     """Schema for URL validation request"""
     url: str
 
+class UrlBatchAnalysisRequest(BaseModel):
+    """Schema for analyzing several URLs at once"""
+    urls: List[str] = Field(min_length=1, max_length=100)
+
 class SelectorInfo(BaseModel):
     """Schema for selector information"""
     selector: str
@@ -66,6 +87,9 @@ class UrlAnalysisResponse(BaseModel):
     status: str
     available_selectors: List[SelectorInfo]
     page_title: Optional[str]
+    # Most frequent tags and classes of the page
+    tag_counts: Dict[str, int] = Field(default_factory=dict)
+    class_counts: Dict[str, int] = Field(default_factory=dict)
     timestamp: datetime = Field(default_factory=datetime.now)
 
     model_config = ConfigDict(from_attributes=True)
@@ -1,4 +1,7 @@
 """Services package initialization"""
 from .spider_service import get_all_spiders, get_spider_jobs, SpiderService
+from .scheduler import SpiderScheduler
+from .worker_pool import ScrapyWorkerPool
+from .agent import WorkerAgent
 
-__all__ = ['get_all_spiders', 'get_spider_jobs', 'SpiderService']
+__all__ = ['get_all_spiders', 'get_spider_jobs', 'SpiderService', 'SpiderScheduler', 'ScrapyWorkerPool', 'WorkerAgent']
@@ -0,0 +1,103 @@
+"""Standalone worker agent running queued executions from the shared database"""
+from typing import Dict, Optional
+from app.services.execution_queue import ExecutionLeases, default_worker_id, requeue_expired
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Executions an agent runs at the same time
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", os.cpu_count() or 4))
+
+# Seconds between two looks at the queue while the agent has free capacity
+AGENT_POLL_INTERVAL = float(os.getenv("AGENT_POLL_INTERVAL", "2.0"))
+
+
+class WorkerAgent:
+    """
+    Claim queued executions and run them with a local SpiderService.
+
+    Any number of agents, on any number of machines, can serve the same database:
+    each claim is an atomic lease (see ExecutionLeases), renewed by heartbeats while
+    the run is in progress. Progress is reported through the execution rows, as
+    for runs started by the API. On shutdown the runs in progress are terminated
+    and put back in the queue; if the agent dies instead, its leases expire and
+    another worker picks the executions up.
+    """
+
+    def __init__(self, spider_service, concurrency: Optional[int] = None,
+                 worker_id: Optional[str] = None, poll_interval: Optional[float] = None,
+                 leases: Optional[ExecutionLeases] = None):
+        self.spider_service = spider_service
+        self.concurrency = concurrency or AGENT_CONCURRENCY
+        self.poll_interval = AGENT_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.leases = leases or ExecutionLeases(worker_id or default_worker_id("agent"))
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    @property
+    def worker_id(self) -> str:
+        return self.leases.worker_id
+
+    async def run(self, exit_when_idle: bool = False):
+        """Run executions until stop() is called (or the queue is empty, with exit_when_idle)"""
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        logger.info(f"Worker agent {self.worker_id} started with {self.concurrency} slots")
+        try:
+            while not self._stopping.is_set():
+                await asyncio.to_thread(requeue_expired)
+                while len(self.tasks) < self.concurrency:
+                    execution = await asyncio.to_thread(self.leases.claim)
+                    if execution is None:
+                        break
+                    self.leases.start_heartbeat(self.spider_service)
+                    self.tasks[execution["id"]] = asyncio.create_task(self._run(execution))
+
+                if exit_when_idle and not self.tasks:
+                    break
+
+                # Sleep until the next poll, a finished run or shutdown
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._shutdown()
+            logger.info(f"Worker agent {self.worker_id} stopped")
+
+    def stop(self):
+        """Stop claiming executions; runs in progress are interrupted and requeued"""
+        if self._stopping is not None:
+            self._stopping.set()
+            self._wakeup.set()
+
+    async def _run(self, execution: Dict[str, str]):
+        try:
+            await self.spider_service.run_spider(execution["spider_id"], execution_id=execution["id"])
+        except Exception as e:
+            logger.exception(f"Error running execution {execution['id']}: {str(e)}")
+        finally:
+            self.tasks.pop(execution["id"], None)
+            await asyncio.to_thread(self.leases.release, execution["id"])
+            self._wakeup.set()
+
+    async def _shutdown(self):
+        """Interrupt the runs in progress and hand them back to the queue"""
+        interrupted = dict(self.leases.held)
+        for execution_id in interrupted:
+            process = self.spider_service.running_spiders.get(execution_id)
+            if process is not None:
+                await process.terminate()
+            elif execution_id in self.tasks:
+                # Not started yet
+                self.tasks[execution_id].cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        await self.leases.stop_heartbeat()
+        # Runs that finished in the meantime keep their final status
+        requeued = await asyncio.to_thread(self.leases.requeue, interrupted)
+        if requeued:
+            logger.info(f"Worker agent {self.worker_id} requeued {requeued} executions")
@@ -0,0 +1,286 @@
+"""Compile a spider block graph into straight-line Scrapy callback code"""
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+from collections import OrderedDict
+from app.services.block_graph import REGEX_MODES, analyze_block_graph, next_block_ids, normalize_blocks
+
+try:
+    from parsel.csstranslator import HTMLTranslator
+except ImportError:  # pragma: no cover - parsel ships with Scrapy
+    HTMLTranslator = None
+
+
+# Helpers the compiled callbacks rely on, emitted once at the top of every spider module
+RUNTIME_HELPERS = '''
+def _extract(value):
+    """Return the text of a selector, or the value itself if it is already extracted"""
+    if hasattr(value, 'get') and not isinstance(value, dict):
+        return value.get()
+    if hasattr(value, 'extract'):
+        return value.extract()
+    return value
+
+
+def _match_value(match):
+    """Group 1 of a match (or the whole match for patterns without groups)"""
+    if match is None:
+        return None
+    return match.group(1) if match.re.groups else match.group(0)
+
+
+def _match_values(pattern, text):
+    """Values of every match of a pattern"""
+    if pattern.groups:
+        return [match.group(1) for match in pattern.finditer(text)]
+    return pattern.findall(text)
+
+
+def _match_groups(match):
+    """Named groups of a match as a dict, or all groups as a list"""
+    if match is None:
+        return None
+    return match.groupdict() if match.re.groupindex else list(match.groups())
+
+
+def _item(field_name, value):
+    """Build an output item; dict values (named regex groups) become several fields"""
+    item = dict(value) if isinstance(value, dict) else {field_name: _extract(value)}
+    item['timestamp'] = datetime.now().isoformat()
+    item['url'] = getattr(value, 'url', None)
+    return item
+'''
+
+# Module of a generated spider, filled in with str.format
+SPIDER_TEMPLATE = """
+import scrapy
+import re
+from datetime import datetime
+{runtime_helpers}
+{constants}
+
+class {class_name}Spider(scrapy.Spider):
+    name = {name!r}
+    start_urls = {start_urls!r}
+    custom_settings = {settings!r}
+
+    async def start(self):
+        # Start requests go through the duplicate filter like any other, so a run
+        # resumed from its JOBDIR does not fetch the pages it already crawled
+        for request in self.start_requests():
+            yield request
+
+    def start_requests(self):
+        # Start URLs are fetched on every run, even in incremental mode, since
+        # they are where the pages that changed are found
+        for url in self.start_urls:
+            yield scrapy.Request(url, meta={{"dont_skip_incremental": True}})
+
+{methods}"""
+
+
+class CompiledGraph(NamedTuple):
+    """Generated source: module-level constants and the spider's methods"""
+    constants: str
+    methods: str
+
+
+def starting_block_ids(block_map: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Blocks that are not referenced by any other block, in configuration order"""
+    referenced = set()
+    for block in block_map.values():
+        referenced.update(next_block_ids(block))
+
+    starting = [block_id for block_id in block_map if block_id not in referenced]
+    if not starting and block_map:
+        # If no clear starting block, just use the first one
+        starting = [next(iter(block_map))]
+    return starting
+
+
+class BlockGraphCompiler:
+    """
+    Turn the Selector/Processor/Output graph into Python source for spider methods.
+
+    Every parameter is resolved at generation time and embedded as a literal, so the
+    generated callbacks never look blocks up or branch on their type while crawling.
+    CSS selectors are translated to XPath and regular expressions are compiled once,
+    as module-level constants of the spider.
+    A block reached from a single parent is inlined into its parent's loop, giving
+    straight-line code along each path; blocks with several parents (fan-in) or that
+    close a cycle become `_block_<n>` methods and are called instead, which keeps the
+    generated code linear in the number of blocks.
+
+    With `trace`, the values of every block are produced through a module-level
+    `_trace(block_id, produce)` hook, which previews define to count and time them.
+    """
+
+    def __init__(self, blocks, trace: bool = False):
+        # Normalized once per configuration and shared with validation
+        self.graph = analyze_block_graph(blocks)
+        self.trace = trace
+        self.block_map = self.graph.block_map
+        self._constants: "OrderedDict[str, str]" = OrderedDict()
+        self._translator = HTMLTranslator() if HTMLTranslator else None
+        self.method_names = {block_id: f"_block_{index}" for index, block_id in enumerate(self.block_map)}
+        self.parent_counts = self.graph.parent_counts
+        self._pending: List[str] = []
+        self._var_counter = 0
+
+    def compile(self) -> CompiledGraph:
+        """Return module-level constants and the parse/block methods (class-body indented)"""
+        parse_body: List[str] = []
+        # If no clear starting block, just use the first one
+        for block_id in self.graph.starting or list(self.block_map)[:1]:
+            parse_body.extend(self._emit(block_id, "response", 2, []))
+
+        lines = [
+            "    def parse(self, response):",
+            '        """Main parsing method for start URLs"""',
+        ]
+        lines.extend(self._as_generator(parse_body))
+
+        generated: Set[str] = set()
+        while self._pending:
+            block_id = self._pending.pop(0)
+            if block_id in generated:
+                continue
+            generated.add(block_id)
+            lines.append("")
+            lines.extend(self._method(block_id))
+
+        constants = "".join(f"{name} = {value}\n" for value, name in self._constants.items())
+        return CompiledGraph(constants, "\n".join(lines) + "\n")
+
+    def _constant(self, prefix: str, value: str) -> str:
+        """Name of a module-level constant, shared by blocks using the same value"""
+        if value not in self._constants:
+            self._constants[value] = f"_{prefix}_{len(self._constants)}"
+        return self._constants[value]
+
+    def _new_var(self, prefix: str) -> str:
+        self._var_counter += 1
+        return f"{prefix}{self._var_counter}"
+
+    def _method(self, block_id: str) -> List[str]:
+        block = self.block_map[block_id]
+        body = self._emit(block_id, "value", 2, [], inline_self=True)
+        return [
+            f"    def {self.method_names[block_id]}(self, value):",
+            f"        # {block.get('type')!r} block {block_id!r}",
+            *self._as_generator(body),
+        ]
+
+    @staticmethod
+    def _as_generator(body: List[str]) -> List[str]:
+        """Make sure a method body is a generator even if no output is reachable"""
+        if not any(line.lstrip().startswith("yield") for line in body):
+            body = body + ["        yield from ()"]
+        return body
+
+    def _call(self, block_id: str, var: str, indent: int) -> List[str]:
+        """Call a block method instead of inlining the block"""
+        self._pending.append(block_id)
+        return [" " * (indent * 4) + f"yield from self.{self.method_names[block_id]}({var})"]
+
+    def _emit(self, block_id: str, var: str, indent: int, path: List[str],
+              inline_self: bool = False) -> List[str]:
+        """Generate the statements that process `var` with a block and its successors"""
+        if block_id not in self.block_map:
+            return []
+
+        if not inline_self and (block_id in path or self.parent_counts[block_id] > 1):
+            return self._call(block_id, var, indent)
+
+        block = self.block_map[block_id]
+        params = block.get("params") or {}
+        block_type = block.get("type")
+        pad = " " * (indent * 4)
+        path = path + [block_id]
+
+        if block_type == "Selector":
+            element = self._new_var("element")
+            query = self._selector(params, var)
+            if query is None:
+                return [f"{pad}self.logger.error({'Unknown selector type: ' + str(params.get('selector_type'))!r})"]
+            body = self._successors(block, element, indent + 1, path)
+            return [self._loop(block_id, element, query, True, pad)] + (body or [f"{pad}    pass"])
+
+        if block_type == "Processor":
+            data = self._new_var("data")
+            processed = self._processor(params, var)
+            if processed is None:
+                return [f"{pad}self.logger.error({'Unknown processor type: ' + str(params.get('processor_type'))!r})"]
+            value, many = processed
+            if many or self.trace:
+                # Processors that produce several values loop like a selector
+                body = self._successors(block, data, indent + 1, path)
+                return [self._loop(block_id, data, value, many, pad)] + (body or [f"{pad}    pass"])
+            return [f"{pad}{data} = {value}"] + self._successors(block, data, indent, path)
+
+        if block_type == "Output":
+            field_name = params.get("field_name", "data")
+            item = f"_item({field_name!r}, {var})"
+            if self.trace:
+                name = self._new_var("item")
+                return [self._loop(block_id, name, item, False, pad), f"{pad}    yield {name}"]
+            return [f"{pad}yield {item}"]
+
+        return [f"{pad}self.logger.error({'Unknown block type: ' + str(block_type)!r})"]
+
+    def _successors(self, block: Dict[str, Any], var: str, indent: int, path: List[str]) -> List[str]:
+        lines: List[str] = []
+        for next_id in next_block_ids(block):
+            lines.extend(self._emit(next_id, var, indent, path))
+        return lines
+
+    def _loop(self, block_id: str, var: str, values: str, many: bool, pad: str) -> str:
+        """Loop over the values of a block, through the trace hook when tracing"""
+        if self.trace:
+            values = f"_trace({block_id!r}, lambda: {values if many else '[' + values + ']'})"
+        return f"{pad}for {var} in {values}:"
+
+    def _selector(self, params: Dict[str, Any], var: str) -> Optional[str]:
+        """Expression selecting the elements of a selector block"""
+        selector_type = params.get("selector_type", "css")
+        selector = params.get("selector", "")
+        if selector_type == "css":
+            xpath = self._css_to_xpath(selector)
+            if xpath is None:
+                # Let parsel report the invalid selector while crawling
+                return f"{var}.css({selector!r})"
+            selector_type, selector = "xpath", xpath
+        if selector_type != "xpath":
+            return None
+        query = self._constant("XPATH", repr(selector))
+        return f"{var}.xpath({query})"
+
+    def _css_to_xpath(self, selector: str) -> Optional[str]:
+        """Translate a CSS selector the way parsel would on every call"""
+        if self._translator is None:
+            return None
+        try:
+            return self._translator.css_to_xpath(selector)
+        except Exception:
+            return None
+
+    def _processor(self, params: Dict[str, Any], var: str) -> Optional[Tuple[str, bool]]:
+        """Expression of a processor block's output, and whether it holds several values"""
+        processor_type = params.get("processor_type", "extract")
+        if processor_type in ("extract", "extract_first"):
+            return f"_extract({var})", False
+        if processor_type == "regular_expression":
+            pattern = self._constant("PATTERN", f"re.compile({params.get('pattern', '')!r})")
+            mode = params.get("regex_mode", "first")
+            text = f"(_extract({var}) or '')"
+            if mode == "all":
+                # Every match, as group 1 when the pattern has groups
+                return f"_match_values({pattern}, {text})", True
+            if mode == "groups":
+                # All groups of the first match at once
+                return f"_match_groups({pattern}.search({text}))", False
+            return f"_match_value({pattern}.search({text}))", False
+        return None
+
+
+def compile_block_graph(blocks, trace: bool = False) -> CompiledGraph:
+    """Compile blocks into the source of the spider's constants and methods"""
+    return BlockGraphCompiler(blocks, trace).compile()
@@ -0,0 +1,239 @@
+"""Validation and static analysis of spider block graphs"""
+from typing import Any, Dict, List, NamedTuple, Optional
+from collections import OrderedDict, deque
+import hashlib
+import json
+import re
+import threading
+
+# Block types the compiler knows how to generate
+BLOCK_TYPES = ("Selector", "Processor", "Output")
+
+# Match modes of the regular_expression processor
+REGEX_MODES = ("first", "all", "groups")
+
+# Analysed graphs kept in memory, keyed by a hash of their blocks
+GRAPH_CACHE_SIZE = 1024
+
+# Elements a selector is assumed to match per input when estimating fan-out
+ASSUMED_SELECTOR_MATCHES = 10
+
+
+def normalize_blocks(blocks) -> "OrderedDict[str, Dict[str, Any]]":
+    """
+    Map block IDs to block dicts, keeping configuration order.
+    Blocks can be dicts or Pydantic models.
+    """
+    block_map = OrderedDict()
+    for block in blocks or []:
+        if not isinstance(block, dict):
+            block = block.model_dump() if hasattr(block, "model_dump") else vars(block)
+        block_map[block["id"]] = block
+    return block_map
+
+
+def next_block_ids(block: Dict[str, Any]) -> List[str]:
+    """IDs referenced by a block's 'next' parameter"""
+    next_ids = (block.get("params") or {}).get("next")
+    if isinstance(next_ids, list):
+        return list(next_ids)
+    if isinstance(next_ids, str):
+        return [next_ids]
+    return []
+
+
+def blocks_hash(block_map: Dict[str, Dict[str, Any]]) -> str:
+    """Hash of a block graph, independent of how the blocks were given"""
+    payload = json.dumps(list(block_map.values()), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class BlockGraph(NamedTuple):
+    """A normalized block graph and the result of its validation"""
+    key: str
+    block_map: "OrderedDict[str, Dict[str, Any]]"
+    # Blocks no other block points to, in configuration order
+    starting: List[str]
+    # Number of distinct blocks pointing to each block
+    parent_counts: Dict[str, int]
+    # Topological order of the blocks (empty if the graph has a cycle)
+    order: List[str]
+    # First problem found that breaks the generated code (unknown block types,
+    # bad references, cycles), None for a valid graph
+    error: Optional[str]
+    # Static cost estimate of a valid graph
+    cost: Dict[str, Any]
+    # Problems that do not stop a run, e.g. blocks that never produce an item
+    warnings: List[str]
+
+    @property
+    def valid(self) -> bool:
+        return self.error is None
+
+
+def _multi_valued(block: Dict[str, Any]) -> bool:
+    """Whether a block can hand several values to its successors per input"""
+    params = block.get("params") or {}
+    return block.get("type") == "Selector" or (
+        params.get("processor_type") == "regular_expression" and params.get("regex_mode") == "all"
+    )
+
+
+def _check_block(block_id: str, block: Dict[str, Any], block_map: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """Problems of a block on its own"""
+    block_type = block.get("type")
+    params = block.get("params") or {}
+    if block_type not in BLOCK_TYPES:
+        return f"Invalid block type: {block_type}"
+
+    # Regular expressions are compiled into the generated spider, so reject bad ones early
+    if block_type == "Processor" and params.get("processor_type") == "regular_expression":
+        pattern = params.get("pattern", "")
+        if not isinstance(pattern, str):
+            return f"Invalid regular expression in block {block_id}: the pattern must be a string"
+        try:
+            re.compile(pattern)
+        except re.error as e:
+            return f"Invalid regular expression in block {block_id}: {str(e)}"
+        if params.get("regex_mode", "first") not in REGEX_MODES:
+            return f"Invalid regex_mode in block {block_id}: {params.get('regex_mode')}"
+
+    for next_id in next_block_ids(block):
+        if next_id not in block_map:
+            return f"Block {next_id} referenced in 'next' parameter does not exist"
+    return None
+
+
+def _find_cycle(block_map: Dict[str, Dict[str, Any]], remaining: set, parents: Dict[str, List[str]]) -> List[str]:
+    """
+    A cycle among the blocks a topological sort could not order. Every such block
+    has a parent among them, so walking up parents must eventually repeat a block.
+    """
+    block_id = next(block_id for block_id in block_map if block_id in remaining)
+    seen: Dict[str, int] = {}
+    walk: List[str] = []
+    while block_id not in seen:
+        seen[block_id] = len(walk)
+        walk.append(block_id)
+        block_id = next(parent for parent in parents[block_id] if parent in remaining)
+    cycle = walk[seen[block_id]:]
+    cycle.reverse()
+    # Start from the block that comes first in the configuration
+    positions = {block_id: index for index, block_id in enumerate(block_map)}
+    first = min(range(len(cycle)), key=lambda index: positions[cycle[index]])
+    cycle = cycle[first:] + cycle[:first]
+    return cycle + [cycle[0]]
+
+
+def _analyze(block_map: "OrderedDict[str, Dict[str, Any]]") -> BlockGraph:
+    """Validate a block graph in time linear in its blocks and connections"""
+    key = blocks_hash(block_map)
+    parent_counts = {block_id: 0 for block_id in block_map}
+    for block in block_map.values():
+        for next_id in set(next_block_ids(block)):
+            if next_id in parent_counts:
+                parent_counts[next_id] += 1
+    starting = [block_id for block_id, count in parent_counts.items() if count == 0]
+
+    def result(order: List[str], error: Optional[str], cost: Optional[Dict[str, Any]] = None,
+               warnings: Optional[List[str]] = None) -> BlockGraph:
+        return BlockGraph(key, block_map, starting, parent_counts, order, error, cost or {}, warnings or [])
+
+    for block_id, block in block_map.items():
+        error = _check_block(block_id, block, block_map)
+        if error:
+            return result([], error)
+
+    # Values only flow out of Selector and Processor blocks; the compiler ignores
+    # the 'next' of an Output
+    children = {
+        block_id: [] if block.get("type") == "Output" else list(OrderedDict.fromkeys(next_block_ids(block)))
+        for block_id, block in block_map.items()
+    }
+    parents: Dict[str, List[str]] = {block_id: [] for block_id in block_map}
+    for block_id, next_ids in children.items():
+        for next_id in next_ids:
+            parents[next_id].append(block_id)
+
+    # Kahn's algorithm
+    in_degree = {block_id: len(parents[block_id]) for block_id in block_map}
+    ready = deque(block_id for block_id in block_map if in_degree[block_id] == 0)
+    order: List[str] = []
+    while ready:
+        block_id = ready.popleft()
+        order.append(block_id)
+        for next_id in children[block_id]:
+            in_degree[next_id] -= 1
+            if in_degree[next_id] == 0:
+                ready.append(next_id)
+    if len(order) < len(block_map):
+        cycle = _find_cycle(block_map, set(block_map) - set(order), parents)
+        return result([], f"Cycle detected in block connections: {' -> '.join(cycle)}")
+
+    # Crawls start by selecting from the page; blocks not fed by one never run.
+    # Like dead ends below they are reported but do not stop a run, since
+    # half-built branches compile and saved spiders with them ran before
+    warnings: List[str] = []
+    entry_points = {block_id for block_id in starting if block_map[block_id].get("type") == "Selector"}
+    reachable = set()
+    for block_id in order:
+        if block_id in reachable or block_id in entry_points:
+            reachable.add(block_id)
+            reachable.update(children[block_id])
+    unreachable = [block_id for block_id in block_map if block_id not in reachable]
+    if unreachable:
+        warnings.append(f"Blocks not reachable from a starting Selector: {', '.join(unreachable)}")
+
+    # Number of paths to an Output, selectors on the deepest one and estimated
+    # items per input, from the outputs back to the starting blocks
+    paths: Dict[str, int] = {}
+    depth: Dict[str, int] = {}
+    items: Dict[str, int] = {}
+    for block_id in reversed(order):
+        block = block_map[block_id]
+        multi = _multi_valued(block)
+        if block.get("type") == "Output":
+            paths[block_id], depth[block_id], items[block_id] = 1, 0, 1
+            continue
+        useful = [next_id for next_id in children[block_id] if paths[next_id]]
+        paths[block_id] = sum(paths[next_id] for next_id in useful)
+        depth[block_id] = int(multi) + max((depth[next_id] for next_id in useful), default=0)
+        items[block_id] = (ASSUMED_SELECTOR_MATCHES if multi else 1) * sum(items[next_id] for next_id in useful)
+    dead_ends = [block_id for block_id in block_map if not paths[block_id]]
+    if dead_ends:
+        warnings.append(f"Blocks with no path to an Output: {', '.join(dead_ends)}")
+
+    return result(order, None, {
+        "blocks": len(block_map),
+        "outputs": sum(1 for block in block_map.values() if block.get("type") == "Output"),
+        "paths": sum(paths[block_id] for block_id in starting),
+        "max_selector_depth": max((depth[block_id] for block_id in starting), default=0),
+        "estimated_items_per_page": sum(items[block_id] for block_id in starting),
+        "assumed_selector_matches": ASSUMED_SELECTOR_MATCHES,
+    }, warnings)
+
+
+_cache: "OrderedDict[str, BlockGraph]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def analyze_block_graph(blocks) -> BlockGraph:
+    """
+    Normalize and validate a block graph. Results are cached by the hash of the
+    blocks, so validating, saving, compiling and running the same configuration
+    analyse it once.
+    """
+    block_map = normalize_blocks(blocks)
+    key = blocks_hash(block_map)
+    with _cache_lock:
+        graph = _cache.get(key)
+        if graph is not None:
+            _cache.move_to_end(key)
+            return graph
+
+    graph = _analyze(block_map)
+    with _cache_lock:
+        _cache[key] = graph
+        while len(_cache) > GRAPH_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return graph
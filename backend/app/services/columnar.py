@@ -0,0 +1,193 @@
+"""Columnar (Parquet) copies of execution items and vectorized queries over them"""
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import os
+
+# Items converted and written per Parquet row group
+COLUMNAR_BATCH_SIZE = int(os.getenv("COLUMNAR_BATCH_SIZE", "50000"))
+
+# Aggregate functions accepted by query_columnar
+AGGREGATE_FUNCTIONS = ("count", "count_distinct", "sum", "mean", "min", "max", "distinct")
+
+
+def columnar_available() -> bool:
+    """Whether pyarrow, needed for the columnar files, is installed"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _column_type(kinds: set):
+    """Arrow type of a column from the Python types of its values"""
+    import pyarrow as pa
+
+    if kinds == {bool}:
+        return pa.bool_()
+    if kinds == {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    # Strings, and nested or mixed values stored as JSON text
+    return pa.string()
+
+
+def _infer_schema(batches: Iterator[List[Dict[str, Any]]]):
+    """Schema covering every field of every item, in order of first appearance"""
+    import pyarrow as pa
+
+    kinds: Dict[str, set] = {}
+    for batch in batches:
+        for item in batch:
+            for key, value in item.items():
+                field_kinds = kinds.setdefault(key, set())
+                if value is not None:
+                    field_kinds.add(type(value))
+    return pa.schema([(key, _column_type(field_kinds)) for key, field_kinds in kinds.items()])
+
+
+def _to_column(values: List[Any], column_type) -> List[Any]:
+    import pyarrow as pa
+
+    if column_type == pa.string():
+        return [
+            value if value is None or isinstance(value, str) else json.dumps(value)
+            for value in values
+        ]
+    return values
+
+
+def write_columnar(batches, path: str) -> Dict[str, Any]:
+    """
+    Write items to a Parquet file and return a description of it.
+
+    `batches` is a callable returning a fresh iterator over lists of items; it is
+    read twice, once to infer a schema that fits every item and once to write one
+    row group per batch, so memory stays bounded by the batch size.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _infer_schema(batches())
+    rows = 0
+    temp_path = f"{path}.tmp"
+    with pq.ParquetWriter(temp_path, schema) as writer:
+        for batch in batches():
+            columns = {
+                field.name: _to_column([item.get(field.name) for item in batch], field.type)
+                for field in schema
+            }
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            rows += len(batch)
+    os.replace(temp_path, path)
+
+    return {
+        "format": "parquet",
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "columns": {field.name: str(field.type) for field in schema},
+    }
+
+
+def _filter_expression(filters: List[Dict[str, Any]], schema):
+    import pyarrow.compute as pc
+
+    expression = None
+    for condition in filters:
+        column, op, value = condition["column"], condition["op"], condition.get("value")
+        if column not in schema.names:
+            raise ValueError(f"Unknown column: {column}")
+        field = pc.field(column)
+        if op == "eq":
+            term = field == value
+        elif op == "ne":
+            term = field != value
+        elif op == "lt":
+            term = field < value
+        elif op == "le":
+            term = field <= value
+        elif op == "gt":
+            term = field > value
+        elif op == "ge":
+            term = field >= value
+        elif op in ("in", "not_in"):
+            if not isinstance(value, list):
+                raise ValueError(f"Filter '{op}' on {column} needs a list value")
+            term = field.isin(value) if op == "in" else ~field.isin(value)
+        elif op == "contains":
+            term = pc.match_substring(field, str(value))
+        elif op == "is_null":
+            term = field.is_null()
+        elif op == "not_null":
+            term = field.is_valid()
+        else:
+            raise ValueError(f"Unknown filter operator: {op}")
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def query_columnar(path: str, columns: Optional[List[str]] = None,
+                   filters: Optional[List[Dict[str, Any]]] = None,
+                   group_by: Optional[List[str]] = None,
+                   aggregates: Optional[List[Dict[str, Any]]] = None,
+                   limit: int = 1000) -> Dict[str, Any]:
+    """
+    Project, filter and aggregate the items of a Parquet file.
+
+    Only the referenced columns are read, filters are pushed down to the scan (row
+    groups whose statistics exclude them are skipped) and aggregates are computed
+    by Arrow's vectorized group-by. Without aggregates the matching rows are
+    returned, up to `limit`.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(path, format="parquet")
+    schema = dataset.schema
+    group_by = group_by or []
+    aggregates = aggregates or []
+    for column in [*(columns or []), *group_by]:
+        if column not in schema.names:
+            raise ValueError(f"Unknown column: {column}")
+
+    try:
+        expression = _filter_expression(filters or [], schema)
+
+        if not aggregates and not group_by:
+            table = dataset.head(limit, columns=columns or schema.names, filter=expression)
+            return {"columns": table.column_names, "rows": table.to_pylist(), "row_count": table.num_rows}
+
+        specs = []
+        needed = list(group_by)
+        for aggregate in aggregates:
+            column, function = aggregate.get("column"), aggregate["function"]
+            if function not in AGGREGATE_FUNCTIONS:
+                raise ValueError(f"Unknown aggregate function: {function}")
+            if column is None:
+                if function != "count":
+                    raise ValueError(f"Aggregate '{function}' needs a column")
+                specs.append(([], "count_all"))
+                continue
+            if column not in schema.names:
+                raise ValueError(f"Unknown column: {column}")
+            needed.append(column)
+            specs.append((column, function))
+
+        table = dataset.to_table(columns=list(dict.fromkeys(needed)), filter=expression)
+        # 'distinct' only exists as a grouped aggregation in Arrow
+        scalar_distinct = [spec for spec in specs if spec[1] == "distinct" and not group_by]
+        grouped_specs = [spec for spec in specs if spec not in scalar_distinct]
+        if group_by or grouped_specs:
+            grouped = table.group_by(group_by).aggregate(grouped_specs)
+            result_columns, rows = grouped.column_names, grouped.to_pylist() or ([] if group_by else [{}])
+        else:
+            result_columns, rows = [], [{}]
+        for column, _ in scalar_distinct:
+            result_columns.append(f"{column}_distinct")
+            rows[0][f"{column}_distinct"] = pc.unique(table[column]).to_pylist()
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError) as e:
+        raise ValueError(str(e))
+
+    return {"columns": result_columns, "rows": rows[:limit], "row_count": len(rows)}
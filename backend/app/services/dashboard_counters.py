@@ -0,0 +1,62 @@
+"""Dashboard statistics read from the counters the database triggers maintain"""
+from typing import Any, Dict
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import DashboardCounter, Spider, SpiderExecution
+
+# Prefixes of the per-status counters and the name of the scraped items total
+SPIDER_STATUS = "spiders:"
+EXECUTION_STATUS = "executions:"
+ITEMS_SCRAPED = "items_scraped"
+
+
+async def read_counters(db: AsyncSession) -> Dict[str, int]:
+    """All counters; one row per spider and execution status, however long the history"""
+    return {name: value for name, value in await db.execute(select(DashboardCounter.name, DashboardCounter.value))}
+
+
+async def get_dashboard_stats(db: AsyncSession) -> Dict[str, Any]:
+    counters = await read_counters(db)
+    return {
+        "total_spiders": sum(value for name, value in counters.items() if name.startswith(SPIDER_STATUS)),
+        "running_spiders": counters.get(SPIDER_STATUS + "running", 0),
+        "completed_jobs": counters.get(EXECUTION_STATUS + "finished", 0),
+        "total_items_scraped": counters.get(ITEMS_SCRAPED, 0),
+    }
+
+
+async def rebuild_counters(db: AsyncSession) -> Dict[str, Dict[str, int]]:
+    """
+    Recount the counters from the spiders and executions tables, e.g. after
+    rows were changed with the triggers disabled. Returns the counters that
+    were off, with the value they had and the recounted one.
+    """
+    if db.bind.dialect.name == "postgresql":
+        # Writers wait until the counters are rebuilt, so no change is lost in between
+        await db.execute(text("LOCK TABLE spiders, spider_executions IN SHARE MODE"))
+    # Deleting first takes SQLite's write lock before the tables are counted
+    counted = {name: value for name, value in await db.execute(
+        delete(DashboardCounter).returning(DashboardCounter.name, DashboardCounter.value)
+    )}
+
+    spider_status = func.coalesce(Spider.status, "")
+    await db.execute(insert(DashboardCounter).from_select(
+        ["name", "value"],
+        select(literal(SPIDER_STATUS) + spider_status, func.count()).group_by(spider_status),
+    ))
+    await db.execute(insert(DashboardCounter).from_select(
+        ["name", "value"],
+        select(literal(EXECUTION_STATUS) + SpiderExecution.status, func.count()).group_by(SpiderExecution.status),
+    ))
+    await db.execute(insert(DashboardCounter).from_select(
+        ["name", "value"],
+        select(literal(ITEMS_SCRAPED), func.coalesce(func.sum(SpiderExecution.items_scraped), 0)),
+    ))
+    actual = await read_counters(db)
+    await db.commit()
+
+    return {
+        name: {"counted": counted.get(name, 0), "actual": actual.get(name, 0)}
+        for name in counted.keys() | actual.keys()
+        if counted.get(name, 0) != actual.get(name, 0)
+    }
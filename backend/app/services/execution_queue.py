@@ -0,0 +1,302 @@
+"""Leases on queued spider executions, shared by the API scheduler and worker agents"""
+from typing import Any, Dict, Optional, Set, Tuple
+from sqlalchemy import func
+from app.models import Spider, SpiderExecution
+from app.db import SessionLocal
+import asyncio
+import datetime
+import logging
+import os
+import socket
+
+logger = logging.getLogger(__name__)
+
+# Seconds a claimed execution stays leased without a heartbeat
+EXECUTION_LEASE_SECONDS = float(os.getenv("EXECUTION_LEASE_SECONDS", "60"))
+
+# Seconds between two heartbeats renewing the leases of a worker
+HEARTBEAT_INTERVAL = float(os.getenv("HEARTBEAT_INTERVAL", str(EXECUTION_LEASE_SECONDS / 4)))
+
+# Claims of an execution after which a lost lease fails it instead of requeueing it
+MAX_EXECUTION_ATTEMPTS = int(os.getenv("MAX_EXECUTION_ATTEMPTS", "3"))
+
+# Statuses of an execution held by a worker
+LEASED_STATUSES = ("running", "stopping", "pausing")
+
+
+def default_worker_id(role: str) -> str:
+    """Identify a worker process across machines"""
+    return f"{role}-{socket.gethostname()}-{os.getpid()}"
+
+
+def requeue_expired() -> int:
+    """
+    Put executions whose worker stopped sending heartbeats back in the queue.
+    Executions that already used up MAX_EXECUTION_ATTEMPTS claims fail instead.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.datetime.now()
+        expired = db.query(SpiderExecution).filter(
+            SpiderExecution.status.in_(LEASED_STATUSES),
+            SpiderExecution.lease_expires_at < now
+        ).all()
+
+        requeued = 0
+        for execution in expired:
+            exhausted = (execution.attempts or 0) >= MAX_EXECUTION_ATTEMPTS
+            values = {"worker_id": None, "lease_expires_at": None}
+            if exhausted:
+                values.update(
+                    status="error",
+                    finished_at=now,
+                    error_message=f"Worker {execution.worker_id} was lost {execution.attempts} times"
+                )
+            else:
+                values.update(status="queued")
+            # Only if no heartbeat renewed the lease in the meantime
+            updated = db.query(SpiderExecution).filter(
+                SpiderExecution.id == execution.id,
+                SpiderExecution.worker_id == execution.worker_id,
+                SpiderExecution.lease_expires_at < now
+            ).update(values, synchronize_session=False)
+            if updated:
+                db.query(Spider).filter(Spider.id == execution.spider_id).update(
+                    {"status": "error" if exhausted else "queued"}, synchronize_session=False
+                )
+                requeued += 0 if exhausted else 1
+                logger.warning(f"Lease of execution {execution.id} held by {execution.worker_id} expired")
+        db.commit()
+        return requeued
+    finally:
+        db.close()
+
+
+class ExecutionLeases:
+    """
+    The executions a worker has claimed from the queue.
+
+    A claim is a conditional update of a queued row, so of several workers racing for
+    the same execution only one wins, whatever the database. On PostgreSQL the
+    candidate row is also selected with FOR UPDATE SKIP LOCKED, so concurrent workers
+    pick different rows instead of contending for the same one. Claimed executions
+    carry a lease that the heartbeat renews; when a worker dies its leases expire and
+    requeue_expired() makes the executions available again.
+    """
+
+    def __init__(self, worker_id: str, lease_seconds: Optional[float] = None,
+                 heartbeat_interval: Optional[float] = None):
+        self.worker_id = worker_id
+        self.lease_seconds = EXECUTION_LEASE_SECONDS if lease_seconds is None else lease_seconds
+        self.heartbeat_interval = HEARTBEAT_INTERVAL if heartbeat_interval is None else heartbeat_interval
+        # Execution ID -> spider ID of the executions currently held
+        self.held: Dict[str, str] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def _lease_deadline(self, now: datetime.datetime) -> datetime.datetime:
+        return now + datetime.timedelta(seconds=self.lease_seconds)
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Claim the highest-priority, oldest queued execution"""
+        db = SessionLocal()
+        try:
+            while True:
+                candidate = db.query(SpiderExecution.id, SpiderExecution.spider_id).filter(
+                    SpiderExecution.status == "queued"
+                ).order_by(
+                    SpiderExecution.priority.desc(),
+                    SpiderExecution.queued_at.asc()
+                ).with_for_update(skip_locked=True).first()
+
+                if candidate is None:
+                    db.rollback()
+                    return None
+
+                now = datetime.datetime.now()
+                claimed = db.query(SpiderExecution).filter(
+                    SpiderExecution.id == candidate.id,
+                    SpiderExecution.status == "queued"
+                ).update({
+                    "status": "running",
+                    "started_at": now,
+                    "worker_id": self.worker_id,
+                    "lease_expires_at": self._lease_deadline(now),
+                    "heartbeat_at": now,
+                    "attempts": func.coalesce(SpiderExecution.attempts, 0) + 1
+                }, synchronize_session=False)
+                db.commit()
+
+                if claimed:
+                    self.held[candidate.id] = candidate.spider_id
+                    return {"id": candidate.id, "spider_id": candidate.spider_id}
+                # Another worker claimed it first; try the next one
+        finally:
+            db.close()
+
+    def release(self, execution_id: str):
+        """Give up the lease of an execution that has reached a final state"""
+        self.held.pop(execution_id, None)
+        db = SessionLocal()
+        try:
+            db.query(SpiderExecution).filter(
+                SpiderExecution.id == execution_id,
+                SpiderExecution.worker_id == self.worker_id
+            ).update({"lease_expires_at": None}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def requeue(self, execution_ids) -> int:
+        """Put executions this worker could not finish back in the queue, e.g. on shutdown"""
+        execution_ids = set(execution_ids)
+        if not execution_ids:
+            return 0
+        db = SessionLocal()
+        try:
+            executions = db.query(SpiderExecution).filter(
+                SpiderExecution.id.in_(execution_ids),
+                SpiderExecution.worker_id == self.worker_id,
+                SpiderExecution.status.in_(LEASED_STATUSES)
+            ).all()
+            for execution in executions:
+                execution.status = "queued"
+                execution.worker_id = None
+                execution.lease_expires_at = None
+                # The interruption was not the execution's fault
+                execution.attempts = max(0, (execution.attempts or 1) - 1)
+                db.query(Spider).filter(Spider.id == execution.spider_id).update(
+                    {"status": "queued"}, synchronize_session=False
+                )
+            db.commit()
+        finally:
+            db.close()
+        for execution_id in execution_ids:
+            self.held.pop(execution_id, None)
+        return len(executions)
+
+    def renew(self) -> Tuple[Set[str], Set[str], Set[str]]:
+        """
+        Extend the leases of the held executions.
+        Returns the executions this worker no longer owns (their lease expired and
+        they were requeued), those whose stop was requested and those to pause.
+        """
+        held = set(self.held)
+        if not held:
+            return set(), set(), set()
+        db = SessionLocal()
+        try:
+            now = datetime.datetime.now()
+            db.query(SpiderExecution).filter(
+                SpiderExecution.id.in_(held),
+                SpiderExecution.worker_id == self.worker_id,
+                SpiderExecution.status.in_(LEASED_STATUSES)
+            ).update({
+                "lease_expires_at": self._lease_deadline(now),
+                "heartbeat_at": now
+            }, synchronize_session=False)
+            owned = dict(db.query(SpiderExecution.id, SpiderExecution.status).filter(
+                SpiderExecution.id.in_(held),
+                SpiderExecution.worker_id == self.worker_id
+            ).all())
+            db.commit()
+        finally:
+            db.close()
+
+        lost = held - set(owned)
+        stopping = {execution_id for execution_id, status in owned.items() if status == "stopping"}
+        pausing = {execution_id for execution_id, status in owned.items() if status == "pausing"}
+        return lost, stopping, pausing
+
+    def start_heartbeat(self, spider_service):
+        """Renew the leases in the background while executions are held"""
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._keep_alive(spider_service))
+
+    async def stop_heartbeat(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+
+    async def _keep_alive(self, spider_service):
+        while self.held:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                # Lease queries run in a thread, so they never block the event loop
+                lost, stopping, pausing = await asyncio.to_thread(self.renew)
+            except Exception as e:
+                # The lease survives a failed heartbeat until it expires
+                logger.exception(f"Heartbeat of {self.worker_id} failed: {str(e)}")
+                continue
+
+            for execution_id in lost:
+                # Another worker owns the execution now, abandon our run of it
+                # without touching its record, items or log
+                self.held.pop(execution_id, None)
+                process = spider_service.running_spiders.get(execution_id)
+                logger.warning(f"Lost the lease of execution {execution_id}, stopping its run")
+                if process is not None:
+                    process.lease_lost = True
+                    await process.terminate()
+
+            for execution_id in stopping:
+                # Stop requested through the API of another process
+                await spider_service.stop_execution(execution_id)
+
+            for execution_id in pausing:
+                # Pause requested through the API of another process
+                try:
+                    await spider_service.pause_execution(execution_id)
+                except ValueError as e:
+                    logger.warning(f"Cannot pause execution {execution_id}: {str(e)}")
+
+
+def request_stop(spider_id: str) -> bool:
+    """Ask the worker holding a spider's running execution to stop it"""
+    db = SessionLocal()
+    try:
+        updated = db.query(SpiderExecution).filter(
+            SpiderExecution.spider_id == spider_id,
+            SpiderExecution.status == "running"
+        ).update({"status": "stopping"}, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+
+def request_pause(spider_id: str) -> bool:
+    """Ask the worker holding a spider's running execution to pause it"""
+    db = SessionLocal()
+    try:
+        updated = db.query(SpiderExecution).filter(
+            SpiderExecution.spider_id == spider_id,
+            SpiderExecution.status == "running"
+        ).update({"status": "pausing"}, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    finally:
+        db.close()
+
+
+def worker_activity() -> Dict[str, Dict[str, Any]]:
+    """Executions held and last heartbeat of every worker with running executions"""
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            SpiderExecution.worker_id,
+            func.count(SpiderExecution.id),
+            func.max(SpiderExecution.heartbeat_at)
+        ).filter(
+            SpiderExecution.status.in_(LEASED_STATUSES),
+            SpiderExecution.worker_id.isnot(None)
+        ).group_by(SpiderExecution.worker_id).all()
+        return {
+            worker_id: {
+                "running": running,
+                "last_heartbeat": heartbeat.isoformat() if heartbeat else None
+            }
+            for worker_id, running, heartbeat in rows
+        }
+    finally:
+        db.close()
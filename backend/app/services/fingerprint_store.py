@@ -0,0 +1,48 @@
+"""Per-spider fingerprint files used by the incremental crawl mode"""
+from typing import Any, Dict, Optional
+from app.services.scrapy_incremental import RECORD
+import os
+
+# Directory holding the fingerprint file of every incremental spider
+INCREMENTAL_DIR = os.getenv("INCREMENTAL_DIR", "fingerprints")
+
+# Downloader middleware skipping fresh pages (see scrapy_incremental.py)
+MIDDLEWARE_PATH = "scrapy_incremental.IncrementalMiddleware"
+
+
+class FingerprintStore:
+    """
+    Pages crawled by earlier runs of each spider, kept across executions.
+
+    Spiders opt in with the INCREMENTAL setting; requests for pages fetched less
+    than INCREMENTAL_FRESHNESS_HOURS (default 24) ago are then skipped.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or INCREMENTAL_DIR
+
+    def path(self, spider_id: str) -> str:
+        return os.path.join(self.directory, f"{os.path.basename(spider_id)}.fp")
+
+    def middleware_settings(self, spider_id: str) -> Dict[str, Any]:
+        """Scrapy settings enabling the incremental middleware for a spider"""
+        os.makedirs(self.directory, exist_ok=True)
+        return {
+            # Early, so skipped requests never reach retries or the download
+            "DOWNLOADER_MIDDLEWARES": {MIDDLEWARE_PATH: 50},
+            "INCREMENTAL_STORE_PATH": os.path.abspath(self.path(spider_id)),
+        }
+
+    def count(self, spider_id: str) -> int:
+        """Number of fingerprints stored for a spider"""
+        try:
+            return os.path.getsize(self.path(spider_id)) // RECORD.size
+        except FileNotFoundError:
+            return 0
+
+    def delete(self, spider_id: str):
+        """Forget the pages crawled by a spider, so its next run is a full crawl"""
+        try:
+            os.unlink(self.path(spider_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,111 @@
+"""HTTP cache shared by the executions of generated spiders"""
+from typing import Any, Dict, List, Optional, Tuple
+from app.services.scrapy_http_cache import ENTRY_SUFFIX
+import os
+import shutil
+
+# Directory holding one cache directory per spider
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "http_cache")
+
+# Bytes the cache of all spiders may use; 0 disables the cache
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(1024 ** 3)))
+
+# Bytes the cache of a single spider may use
+HTTP_CACHE_SPIDER_MAX_BYTES = int(os.getenv("HTTP_CACHE_SPIDER_MAX_BYTES", str(256 * 1024 ** 2)))
+
+# Downloader middleware sending conditional requests (see scrapy_http_cache.py),
+# next to the downloader like Scrapy's own HttpCacheMiddleware
+MIDDLEWARE_PATH = "scrapy_http_cache.ConditionalCacheMiddleware"
+MIDDLEWARE_ORDER = 900
+
+
+class HttpCache:
+    """
+    Pages downloaded by generated spiders, kept with their ETag and Last-Modified
+    headers so later runs only download what changed.
+
+    Entries are evicted least recently used first, once a spider's cache grows past
+    spider_max_bytes and once all caches together grow past max_bytes. Spiders opt
+    out with the setting HTTP_CACHE set to false.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 spider_max_bytes: Optional[int] = None):
+        self.directory = directory or HTTP_CACHE_DIR
+        self.max_bytes = HTTP_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.spider_max_bytes = HTTP_CACHE_SPIDER_MAX_BYTES if spider_max_bytes is None else spider_max_bytes
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def path(self, spider_id: str) -> str:
+        return os.path.join(self.directory, os.path.basename(spider_id))
+
+    def middleware_settings(self, spider_id: str) -> Dict[str, Any]:
+        """Scrapy settings enabling the cache for a run of a spider"""
+        return {
+            "DOWNLOADER_MIDDLEWARES": {MIDDLEWARE_PATH: MIDDLEWARE_ORDER},
+            "HTTP_CACHE_PATH": os.path.abspath(self.path(spider_id)),
+            # A page larger than the spider's whole cache would evict everything else
+            "HTTP_CACHE_MAX_ENTRY_BYTES": min(self.spider_max_bytes, self.max_bytes),
+        }
+
+    def _entries(self, spider_id: Optional[str] = None) -> List[Tuple[float, int, str]]:
+        """(last use, size, path) of the cached pages of a spider, or of all spiders"""
+        if spider_id is not None:
+            directories = [self.path(spider_id)]
+        elif os.path.isdir(self.directory):
+            directories = [entry.path for entry in os.scandir(self.directory) if entry.is_dir()]
+        else:
+            directories = []
+
+        entries = []
+        for directory in directories:
+            try:
+                files = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in files:
+                if not entry.name.endswith(ENTRY_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def usage(self, spider_id: Optional[str] = None) -> Dict[str, int]:
+        """Number and size of the cached pages of a spider, or of all spiders"""
+        entries = self._entries(spider_id)
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+    @staticmethod
+    def _evict(entries: List[Tuple[float, int, str]], max_bytes: int) -> Dict[str, int]:
+        """Remove the least recently used entries until the rest fits in max_bytes"""
+        excess = sum(size for _, size, _ in entries) - max_bytes
+        evicted = {"entries": 0, "bytes": 0}
+        for _, size, path in sorted(entries):
+            if excess <= 0:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            excess -= size
+            evicted["entries"] += 1
+            evicted["bytes"] += size
+        return evicted
+
+    def evict(self, spider_id: str) -> Dict[str, int]:
+        """Bring a spider's cache, then the whole cache, back under their size limits"""
+        evicted = self._evict(self._entries(spider_id), self.spider_max_bytes)
+        globally = self._evict(self._entries(), self.max_bytes)
+        return {name: evicted[name] + globally[name] for name in evicted}
+
+    def purge(self, spider_id: str) -> Dict[str, int]:
+        """Drop every cached page of a spider"""
+        purged = self.usage(spider_id)
+        shutil.rmtree(self.path(spider_id), ignore_errors=True)
+        return purged
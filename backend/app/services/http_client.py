@@ -0,0 +1,81 @@
+"""Shared aiohttp session for the pages the API fetches itself"""
+from typing import Optional
+import asyncio
+import os
+
+# Connections open at the same time, overall and to a single host
+HTTP_CLIENT_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "100"))
+HTTP_CLIENT_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_CLIENT_CONNECTIONS_PER_HOST", "8"))
+
+# Seconds resolved host names are reused
+HTTP_CLIENT_DNS_CACHE_TTL = int(os.getenv("HTTP_CLIENT_DNS_CACHE_TTL", "300"))
+
+# URLs analyzed at the same time across all batch requests
+ANALYSIS_CONCURRENCY = int(os.getenv("ANALYSIS_CONCURRENCY", "10"))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+class HttpClient:
+    """
+    One aiohttp session per process, so URL analyses and previews reuse
+    keep-alive connections and resolved host names instead of setting up a new
+    session per request. The app starts and closes it in its lifespan; outside
+    of the app it is created on first use.
+
+    aiohttp sessions belong to the event loop they were created in, so a new one
+    is created when the client is used from another loop, and the old one is
+    closed on its own loop.
+    """
+
+    def __init__(self, max_connections: Optional[int] = None, connections_per_host: Optional[int] = None,
+                 concurrency: Optional[int] = None):
+        self.max_connections = max_connections or HTTP_CLIENT_MAX_CONNECTIONS
+        self.connections_per_host = connections_per_host or HTTP_CLIENT_CONNECTIONS_PER_HOST
+        self.concurrency = concurrency or ANALYSIS_CONCURRENCY
+        self._session = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    async def start(self):
+        await self.session()
+
+    async def session(self):
+        """The shared session of the running event loop"""
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            await self._discard()
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=HTTP_CLIENT_DNS_CACHE_TTL,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, headers={'User-Agent': USER_AGENT})
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._session
+
+    async def slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding the number of pages analyzed at the same time"""
+        await self.session()
+        return self._semaphore
+
+    async def close(self):
+        await self._discard()
+
+    async def _discard(self):
+        """Close the current session, wherever its loop is, and forget it"""
+        session, loop = self._session, self._loop
+        self._session = None
+        self._semaphore = None
+        self._loop = None
+        if session is None or session.closed:
+            return
+        if loop is asyncio.get_running_loop():
+            await session.close()
+        elif not loop.is_closed():
+            # Closed by its own loop, which may be running in another thread
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        # The connections of a closed loop were closed with it
@@ -0,0 +1,103 @@
+"""Per-execution JSON Lines item store with a byte-offset index"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from app.services.scrapy_item_store import DATA_SUFFIX, INDEX_SUFFIX, OFFSET_FORMAT
+import json
+import os
+import struct
+
+# Directory holding the items of every execution
+ITEM_STORE_DIR = os.getenv("ITEM_STORE_DIR", "items")
+
+# Scrapy pipeline writing the files (see scrapy_item_store.py); importable by
+# the Scrapy processes the same way as the telemetry extension
+PIPELINE_PATH = "scrapy_item_store.ItemStorePipeline"
+
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+
+class ItemStore:
+    """
+    Items of each execution, stored as `<execution_id>.jl` plus `<execution_id>.idx`.
+
+    The index holds one fixed-size offset per item, so a page of items is read with
+    two seeks whatever its position, without scanning the file. Files are written
+    by the Scrapy process and can be read while the run is still in progress.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or ITEM_STORE_DIR
+
+    def path(self, execution_id: str) -> str:
+        """Path of an execution's files, without extension"""
+        return os.path.join(self.directory, os.path.basename(execution_id))
+
+    def pipeline_settings(self, execution_id: str) -> Dict[str, Any]:
+        """Scrapy settings storing the items of a run in this store"""
+        os.makedirs(self.directory, exist_ok=True)
+        return {
+            "ITEM_PIPELINES": {PIPELINE_PATH: 1000},
+            "ITEM_STORE_PATH": os.path.abspath(self.path(execution_id)),
+        }
+
+    def count(self, execution_id: str) -> int:
+        """Number of complete items stored for an execution"""
+        try:
+            return os.path.getsize(self.path(execution_id) + INDEX_SUFFIX) // OFFSET_SIZE
+        except FileNotFoundError:
+            return 0
+
+    def read(self, execution_id: str, offset: int = 0, limit: int = 100) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Return up to `limit` items starting at item number `offset`, and the number
+        of items stored when the page was read
+        """
+        total = self.count(execution_id)
+        offset = max(0, offset)
+        end = min(total, offset + max(0, limit))
+        if offset >= end:
+            return [], total
+
+        path = self.path(execution_id)
+        with open(path + INDEX_SUFFIX, "rb") as index:
+            index.seek(offset * OFFSET_SIZE)
+            # One entry past the page tells where its last item ends
+            entries = index.read((end - offset + 1) * OFFSET_SIZE)
+        # Ignore an entry the writer has not finished yet
+        entries = entries[:len(entries) - len(entries) % OFFSET_SIZE]
+        offsets = [value for (value,) in struct.iter_unpack(OFFSET_FORMAT, entries)]
+
+        with open(path + DATA_SUFFIX, "rb") as data:
+            data.seek(offsets[0])
+            if len(offsets) > end - offset:
+                chunk = data.read(offsets[-1] - offsets[0])
+            else:
+                # The page ends at the last indexed item; later bytes may be a partial line
+                chunk = b"".join(data.readline() for _ in range(end - offset))
+        return [json.loads(line) for line in chunk.splitlines()], total
+
+    def iter_batches(self, execution_id: str, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Read the items stored for an execution sequentially, in lists of batch_size"""
+        total = self.count(execution_id)
+        if not total:
+            return
+        batch = []
+        with open(self.path(execution_id) + DATA_SUFFIX, "rb") as data:
+            for _ in range(total):
+                batch.append(json.loads(data.readline()))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def columnar_path(self, execution_id: str) -> str:
+        """Path of the Parquet copy of an execution's items"""
+        return self.path(execution_id) + ".parquet"
+
+    def delete(self, execution_id: str):
+        """Remove the items of an execution"""
+        for extension in (DATA_SUFFIX, INDEX_SUFFIX, ".parquet"):
+            try:
+                os.unlink(self.path(execution_id) + extension)
+            except FileNotFoundError:
+                pass
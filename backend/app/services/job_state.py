@@ -0,0 +1,60 @@
+"""Scrapy JOBDIR checkpoints of paused executions"""
+from typing import Any, Dict, Optional
+import os
+import shutil
+
+# Directory holding the JOBDIR of every unfinished execution
+JOB_STATE_DIR = os.getenv("JOB_STATE_DIR", "jobs")
+
+
+class JobStateStore:
+    """
+    Crawl state of executions, kept so a paused execution can be resumed.
+
+    Runs of pausable spiders (setting "PAUSABLE": true) get their own JOBDIR:
+    Scrapy keeps the pending requests on disk and the fingerprints of seen
+    requests next to them, and saves both when the crawl is shut down gracefully.
+    Running the execution again with the same JOBDIR continues from there. Other
+    runs keep their queues in memory, which is cheaper and accepts requests that
+    cannot be pickled. Only the state of a paused execution is reused: a run that
+    was killed may have left it inconsistent. The state is deleted once the
+    execution has ended.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or JOB_STATE_DIR
+
+    def path(self, execution_id: str) -> str:
+        return os.path.join(self.directory, os.path.basename(execution_id))
+
+    def settings(self, execution_id: str) -> Dict[str, Any]:
+        """Scrapy settings persisting the crawl state of an execution"""
+        return {"JOBDIR": os.path.abspath(self.path(execution_id))}
+
+    def exists(self, execution_id: str) -> bool:
+        return os.path.isdir(self.path(execution_id))
+
+    def _marker(self, execution_id: str) -> str:
+        return os.path.join(self.path(execution_id), "paused")
+
+    def mark_paused(self, execution_id: str):
+        """Record that the crawl of an execution was shut down cleanly"""
+        os.makedirs(self.path(execution_id), exist_ok=True)
+        open(self._marker(execution_id), "w").close()
+
+    def resumable(self, execution_id: str) -> bool:
+        return os.path.exists(self._marker(execution_id))
+
+    def prepare(self, execution_id: str) -> bool:
+        """
+        Get the JOBDIR of an execution ready for a run, keeping the state of a
+        paused crawl. Returns whether the run resumes one.
+        """
+        if not self.resumable(execution_id):
+            self.delete(execution_id)
+            return False
+        os.unlink(self._marker(execution_id))
+        return True
+
+    def delete(self, execution_id: str):
+        shutil.rmtree(self.path(execution_id), ignore_errors=True)
@@ -0,0 +1,135 @@
+"""Per-execution log files with a sparse line index"""
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+import os
+import struct
+
+# Directory holding the log of every execution
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+
+# Recent log lines kept in memory per running execution
+LOG_RING_SIZE = int(os.getenv("LOG_RING_SIZE", "200"))
+
+# Lines of the log stored in SpiderExecution.error_message when a run fails
+ERROR_EXCERPT_LINES = int(os.getenv("ERROR_EXCERPT_LINES", "20"))
+
+# Maximum length of a stored error excerpt
+ERROR_EXCERPT_CHARS = 4000
+
+# A byte offset is indexed every LOG_INDEX_STRIDE lines
+LOG_INDEX_STRIDE = 1000
+OFFSET_FORMAT = "<Q"
+OFFSET_SIZE = struct.calcsize(OFFSET_FORMAT)
+
+
+class ExecutionLog:
+    """
+    Writer for the log of one run.
+
+    Lines go straight to `<execution_id>.log`, and the offset of every
+    LOG_INDEX_STRIDE-th line to `<execution_id>.log.idx`, so memory use does not
+    grow with the log. Only the last ring_size lines are kept in memory, for the
+    error excerpt.
+    """
+
+    def __init__(self, path: str, ring_size: Optional[int] = None):
+        self.path = path
+        self.recent: Deque[str] = deque(maxlen=ring_size or LOG_RING_SIZE)
+        # Unbuffered, so readers see every line as soon as it is logged
+        self._data = open(path + ".log", "ab", buffering=0)
+        self._index = open(path + ".log.idx", "ab", buffering=0)
+        # Resumed runs continue the log of the previous attempt
+        self._position = self._data.tell()
+        self.line_count = LogStore.count_lines(path)
+
+    def write(self, line: str):
+        """Append a line to the log"""
+        if self.line_count % LOG_INDEX_STRIDE == 0:
+            self._index.write(struct.pack(OFFSET_FORMAT, self._position))
+        data = (line + "\n").encode("utf-8", errors="replace")
+        self._data.write(data)
+        self._position += len(data)
+        self.line_count += 1
+        self.recent.append(line)
+
+    def excerpt(self, lines: Optional[int] = None) -> str:
+        """The last lines of the log, shortened to fit in the database"""
+        excerpt = "\n".join(list(self.recent)[-(lines or ERROR_EXCERPT_LINES):])
+        if len(excerpt) > ERROR_EXCERPT_CHARS:
+            excerpt = "..." + excerpt[-ERROR_EXCERPT_CHARS:]
+        return excerpt
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+
+class LogStore:
+    """Logs of all executions, readable by line offset while they are written"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or LOG_DIR
+
+    def path(self, execution_id: str) -> str:
+        """Path of an execution's log files, without extension"""
+        return os.path.join(self.directory, os.path.basename(execution_id))
+
+    def open(self, execution_id: str, ring_size: Optional[int] = None) -> ExecutionLog:
+        """Open the log of an execution for writing"""
+        os.makedirs(self.directory, exist_ok=True)
+        return ExecutionLog(self.path(execution_id), ring_size)
+
+    @staticmethod
+    def _checkpoints(path: str) -> List[int]:
+        try:
+            with open(path + ".log.idx", "rb") as index:
+                entries = index.read()
+        except FileNotFoundError:
+            return []
+        entries = entries[:len(entries) - len(entries) % OFFSET_SIZE]
+        return [offset for (offset,) in struct.iter_unpack(OFFSET_FORMAT, entries)]
+
+    @classmethod
+    def count_lines(cls, path: str) -> int:
+        """Number of complete lines in a log"""
+        checkpoints = cls._checkpoints(path)
+        if not checkpoints:
+            return 0
+        # Only the lines after the last checkpoint need to be counted
+        with open(path + ".log", "rb") as data:
+            data.seek(checkpoints[-1])
+            return (len(checkpoints) - 1) * LOG_INDEX_STRIDE + data.read().count(b"\n")
+
+    def count(self, execution_id: str) -> int:
+        return self.count_lines(self.path(execution_id))
+
+    def read(self, execution_id: str, offset: int = 0, limit: int = 100) -> Tuple[List[str], int]:
+        """
+        Return up to `limit` lines starting at line number `offset`, and the number
+        of lines in the log when it was read
+        """
+        path = self.path(execution_id)
+        total = self.count_lines(path)
+        offset = max(0, offset)
+        end = min(total, offset + max(0, limit))
+        if offset >= end:
+            return [], total
+
+        checkpoint = offset // LOG_INDEX_STRIDE
+        lines = []
+        with open(path + ".log", "rb") as data:
+            data.seek(self._checkpoints(path)[checkpoint])
+            # At most LOG_INDEX_STRIDE lines are skipped to reach the offset
+            for _ in range(offset - checkpoint * LOG_INDEX_STRIDE):
+                data.readline()
+            for _ in range(end - offset):
+                lines.append(data.readline().decode("utf-8", errors="replace").rstrip("\n"))
+        return lines, total
+
+    def delete(self, execution_id: str):
+        """Remove the log of an execution"""
+        for extension in (".log", ".log.idx"):
+            try:
+                os.unlink(self.path(execution_id) + extension)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,135 @@
+"""Single-pass analysis of a page's elements into selector candidates"""
+from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter
+import os
+
+# Element categories offered to the visual builder; the attribute gives the sample values
+ELEMENT_TYPES = {
+    "links": {"tags": ("a",), "attribute": "href"},
+    "images": {"tags": ("img",), "attribute": "src"},
+    "text_blocks": {"tags": ("p", "div", "span", "h1", "h2", "h3", "h4", "h5", "h6")},
+    "lists": {"tags": ("ul", "ol")},
+    "tables": {"tags": ("table",)},
+}
+
+# Selector candidates returned per element type, most frequent first
+ANALYSIS_CANDIDATES = int(os.getenv("ANALYSIS_CANDIDATES", "3"))
+
+# Distinct selectors tracked per element type; further elements count towards their tag
+ANALYSIS_MAX_KEYS = 1000
+
+# Sample values kept per selector and characters kept per sample
+SAMPLE_VALUES = 3
+SAMPLE_LENGTH = 200
+
+_TYPE_OF_TAG = {tag: element_type for element_type, config in ELEMENT_TYPES.items() for tag in config["tags"]}
+
+
+def parse_html(body: bytes, encoding: Optional[str] = None):
+    """Parse a page with lxml's C parser"""
+    import lxml.html
+
+    parser = lxml.html.HTMLParser(encoding=encoding or "utf-8")
+    return lxml.html.document_fromstring(body, parser=parser)
+
+
+def css_selector(tag: str, classes: Tuple[str, ...], element_id: Optional[str]) -> str:
+    """CSS selector for elements with a tag and classes, or an ID"""
+    if classes:
+        return f"{tag}.{'.'.join(classes)}"
+    if element_id:
+        return f"#{element_id}"
+    return tag
+
+
+def xpath_selector(tag: str, classes: Tuple[str, ...], element_id: Optional[str]) -> str:
+    """XPath selector for elements with a tag and classes, or an ID"""
+    if classes:
+        return f"//{tag}[contains(@class, '{' '.join(classes)}')]"
+    if element_id:
+        return f"//{tag}[@id='{element_id}']"
+    return f"//{tag}"
+
+
+def _text_sample(element) -> str:
+    """Leading text of an element, without serializing all of a large container"""
+    parts = []
+    length = 0
+    for text in element.itertext():
+        parts.append(text)
+        length += len(text)
+        if length >= SAMPLE_LENGTH:
+            break
+    return "".join(parts).strip()[:SAMPLE_LENGTH]
+
+
+def analyze_dom(root) -> Dict[str, Any]:
+    """
+    Walk a parsed page once, counting tags, classes and IDs and, for every
+    element type, how many elements each candidate selector matches together
+    with a few sample values. Memory stays bounded by the number of distinct
+    selectors tracked, not by the size of the page.
+    """
+    tags: Counter = Counter()
+    classes: Counter = Counter()
+    ids: Counter = Counter()
+    # element type -> selector key -> [count, samples]
+    candidates: Dict[str, Dict[Tuple, List[Any]]] = {element_type: {} for element_type in ELEMENT_TYPES}
+    title = None
+
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions
+            continue
+        tags[tag] += 1
+        element_classes = tuple((element.get("class") or "").split())
+        classes.update(element_classes)
+        element_id = element.get("id")
+        if element_id:
+            ids[element_id] += 1
+        if tag == "title" and title is None:
+            title = element.text
+
+        element_type = _TYPE_OF_TAG.get(tag)
+        if element_type is None:
+            continue
+        keys = candidates[element_type]
+        key = (tag, element_classes, None if element_classes else element_id)
+        if key not in keys and len(keys) >= ANALYSIS_MAX_KEYS:
+            key = (tag, (), None)
+        entry = keys.get(key)
+        if entry is None:
+            entry = keys[key] = [0, []]
+        entry[0] += 1
+        if len(entry[1]) < SAMPLE_VALUES:
+            attribute = ELEMENT_TYPES[element_type].get("attribute")
+            value = element.get(attribute) if attribute else _text_sample(element)
+            if value:
+                entry[1].append(value)
+
+    selectors = []
+    for element_type, keys in candidates.items():
+        ranked = sorted(keys.items(), key=lambda item: -item[1][0])[:ANALYSIS_CANDIDATES]
+        for (tag, element_classes, element_id), (count, samples) in ranked:
+            for selector_type, build in (("css", css_selector), ("xpath", xpath_selector)):
+                selectors.append({
+                    "selector": build(tag, element_classes, element_id),
+                    "type": selector_type,
+                    "count": count,
+                    "sample_values": samples,
+                    "element_type": element_type,
+                })
+
+    return {
+        "page_title": title.strip() if title else None,
+        "selectors": selectors,
+        "tags": dict(tags.most_common(20)),
+        "classes": dict(classes.most_common(20)),
+        "ids": len(ids),
+    }
+
+
+def analyze_page(body: bytes, encoding: Optional[str] = None) -> Dict[str, Any]:
+    """Parse and analyze a page; runs in the parse pool"""
+    return analyze_dom(parse_html(body, encoding))
@@ -0,0 +1,170 @@
+"""In-memory cache of the pages fetched to analyze URLs and preview spiders"""
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+from collections import OrderedDict
+import asyncio
+import os
+import threading
+import time
+
+# Seconds a fetched page is used without asking the server again
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "300"))
+
+# Total size of the cached pages, least recently used pages are dropped first; 0 disables the cache
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Number of most recently used pages that keep the result of parsing them
+PAGE_CACHE_HOT_ENTRIES = int(os.getenv("PAGE_CACHE_HOT_ENTRIES", "16"))
+
+
+class CachedPage:
+    """A fetched page and the validators needed to revalidate it"""
+
+    def __init__(self, url: str, body: bytes, encoding: Optional[str],
+                 etag: Optional[str], last_modified: Optional[str]):
+        self.url = url
+        self.body = body
+        self.encoding = encoding
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        # Result of parsing the page, kept while the page is hot
+        self.parsed: Any = None
+
+    @property
+    def size(self) -> int:
+        return len(self.body)
+
+    @property
+    def text(self) -> str:
+        return self.body.decode(self.encoding or "utf-8", errors="replace")
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """
+    Pages keyed by URL, so repeated analyses of the same page while selectors
+    are tweaked do not download it again.
+
+    A page younger than the TTL is used as is. An older page with an ETag or
+    Last-Modified header is requested conditionally and kept when the server
+    answers 304 Not Modified. Concurrent requests for a page that has to be
+    downloaded or revalidated wait for a single request. Pages are dropped in LRU
+    order once they take more than max_bytes, and only the hot_entries most
+    recently used pages keep the result of parsing them, which can be several
+    times larger than the HTML.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_bytes: Optional[int] = None,
+                 hot_entries: Optional[int] = None):
+        self.ttl = PAGE_CACHE_TTL if ttl is None else ttl
+        self.max_bytes = PAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.hot_entries = PAGE_CACHE_HOT_ENTRIES if hot_entries is None else hot_entries
+        self._pages: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Download or revalidation in progress per URL
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = {"hits": 0, "revalidated": 0, "misses": 0, "coalesced": 0}
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        with self._lock:
+            page = self._pages.get(url)
+            if page is not None:
+                self._pages.move_to_end(url)
+            return page
+
+    def store(self, url: str, body: bytes, encoding: Optional[str] = None,
+              headers: Optional[Mapping[str, str]] = None) -> CachedPage:
+        """Cache a downloaded page, replacing an older copy"""
+        # Header names are case-insensitive; servers send e.g. "etag" as well as "ETag"
+        headers = {name.lower(): value for name, value in (headers or {}).items()}
+        page = CachedPage(url, body, encoding, headers.get("etag"), headers.get("last-modified"))
+        with self._lock:
+            old = self._pages.pop(url, None)
+            if old is not None:
+                self._bytes -= old.size
+            if page.size <= self.max_bytes:
+                self._pages[url] = page
+                self._bytes += page.size
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._pages.popitem(last=False)
+                    self._bytes -= evicted.size
+        return page
+
+    async def parsed(self, page: CachedPage, parse: Callable[[CachedPage], Awaitable[Any]]) -> Any:
+        """The parsed form of a page, parsing it only if it is not kept already"""
+        if page.parsed is not None:
+            return page.parsed
+        parsed = await parse(page)
+        with self._lock:
+            if self._pages.get(page.url) is page:
+                page.parsed = parsed
+                # Drop the results of pages that are no longer among the most recent
+                kept = 0
+                for cached in reversed(self._pages.values()):
+                    if cached.parsed is not None:
+                        kept += 1
+                        if kept > self.hot_entries:
+                            cached.parsed = None
+        return parsed
+
+    async def fetch(self, session, url: str, headers: Optional[Dict[str, str]] = None,
+                    timeout: float = 10) -> CachedPage:
+        """
+        Get a page from the cache, revalidating it once it is older than the TTL,
+        or download it with an aiohttp session
+        """
+        page = self.get(url)
+        if page is not None and time.monotonic() - page.fetched_at < self.ttl:
+            self.counters["hits"] += 1
+            return page
+
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(url)
+        if task is not None and task.get_loop() is loop:
+            self.counters["coalesced"] += 1
+        else:
+            task = loop.create_task(self._download(session, url, page, headers, timeout))
+            self._inflight[url] = task
+            task.add_done_callback(lambda done: self._forget(url, done))
+        # A caller giving up does not cancel the request the others wait for
+        return await asyncio.shield(task)
+
+    def _forget(self, url: str, task: asyncio.Task):
+        if self._inflight.get(url) is task:
+            del self._inflight[url]
+
+    async def _download(self, session, url: str, page: Optional[CachedPage],
+                        headers: Optional[Dict[str, str]], timeout: float) -> CachedPage:
+        request_headers = dict(headers or {})
+        if page is not None:
+            request_headers.update(page.conditional_headers())
+        async with session.get(url, headers=request_headers, timeout=timeout) as response:
+            if page is not None and response.status == 304:
+                page.fetched_at = time.monotonic()
+                self.counters["revalidated"] += 1
+                return page
+            if response.status != 200:
+                raise ValueError(f"Fetching {url} returned HTTP {response.status}")
+            body = await response.read()
+            self.counters["misses"] += 1
+            return self.store(url, body, response.get_encoding(), response.headers)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._pages),
+                "bytes": self._bytes,
+                "parsed": sum(1 for page in self._pages.values() if page.parsed is not None),
+                **self.counters,
+            }
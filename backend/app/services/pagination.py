@@ -0,0 +1,51 @@
+"""Keyset cursors and field projection of the spider and execution listings"""
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+import base64
+import datetime
+import json
+
+# Response header carrying the cursor of the next page, absent on the last one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(sort_value: Optional[datetime.datetime], row_id: str) -> str:
+    """Opaque cursor pointing after a row of a listing sorted by a timestamp and the ID"""
+    payload = [sort_value.isoformat() if sort_value else None, row_id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime.datetime], str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.datetime.fromisoformat(sort_value) if sort_value else None), str(row_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str], available: Sequence[str], summary: Iterable[str]) -> List[str]:
+    """
+    Fields of a listing requested as a comma-separated list, in the order of
+    the available ones; the summary fields when none are requested.
+    """
+    if not fields:
+        requested = set(summary)
+    else:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested.difference(available)
+        if unknown:
+            raise ValueError(
+                f"Unknown fields: {', '.join(sorted(unknown))}; available fields: {', '.join(available)}"
+            )
+    return [field for field in available if field in requested]
+
+
+def page(rows: List[Any], limit: Optional[int], key) -> Tuple[List[Any], Optional[str]]:
+    """
+    Split the limit + 1 rows fetched for a page into the page and the cursor of
+    the next one; key gives the sort value and the ID of a row.
+    """
+    if limit is None or len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
@@ -0,0 +1,132 @@
+"""Process pool for the CPU-heavy HTML work of URL analyses and previews"""
+from typing import Any, Callable, Dict, Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Worker processes parsing pages; 0 parses in a thread of the API process instead
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# Pages waiting for or being parsed before new ones are rejected
+PARSE_POOL_QUEUE = int(os.getenv("PARSE_POOL_QUEUE", "64"))
+
+# Seconds a page may wait and be parsed before the request gives up
+PARSE_POOL_TIMEOUT = float(os.getenv("PARSE_POOL_TIMEOUT", "30"))
+
+
+def _timed_call(function: Callable, args: tuple):
+    """Run a task in the pool and measure how long it ran there"""
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+class ParsePool:
+    """
+    Run parsing and analysis functions in worker processes, so a large page does
+    not block the event loop and every other request of the API process.
+
+    Functions and their arguments must be picklable, that is module-level
+    functions called with plain data. At most queue_size tasks are accepted at a
+    time, and a task that is not done within the timeout fails; its worker
+    finishes it in the background, and it keeps its place in the queue until
+    then. The time tasks wait for a worker and the time they run are measured
+    separately.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.workers = PARSE_POOL_WORKERS if workers is None else workers
+        self.queue_size = queue_size or PARSE_POOL_QUEUE
+        self.timeout = timeout or PARSE_POOL_TIMEOUT
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.counters = {"tasks": 0, "rejected": 0, "timeouts": 0, "failed": 0,
+                         "queue_seconds": 0.0, "run_seconds": 0.0}
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.workers:
+                    # Workers are spawned rather than forked from the threaded API process
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(thread_name_prefix="parse-pool")
+            return self._executor
+
+    def _release(self, task=None):
+        with self._lock:
+            self._pending -= 1
+
+    def start(self):
+        """Start the worker processes ahead of the first page"""
+        if self.workers:
+            executor = self._get_executor()
+            for _ in range(self.workers):
+                executor.submit(int)
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Run function(*args) in the pool and return its result"""
+        with self._lock:
+            if self._pending >= self.queue_size:
+                self.counters["rejected"] += 1
+                raise ValueError("Too many pages are being parsed, try again later")
+            self._pending += 1
+
+        started = time.perf_counter()
+        try:
+            try:
+                executor = self._get_executor()
+                task = executor.submit(_timed_call, function, args)
+            except BaseException:
+                self._release()
+                raise
+            # The slot is released once the worker is done with the task, not when
+            # the request stops waiting for it
+            task.add_done_callback(self._release)
+            result, run_seconds = await asyncio.wait_for(asyncio.wrap_future(task), self.timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise ValueError(f"Parsing took longer than {self.timeout:g} seconds")
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); the next task gets a new pool
+            self.counters["failed"] += 1
+            logger.error("A parse pool worker died, restarting the pool")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise ValueError("Parsing the page failed")
+
+        elapsed = time.perf_counter() - started
+        self.counters["tasks"] += 1
+        self.counters["run_seconds"] += run_seconds
+        self.counters["queue_seconds"] += max(0.0, elapsed - run_seconds)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        tasks = self.counters["tasks"]
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "queue_size": self.queue_size,
+            **{key: value for key, value in self.counters.items() if not key.endswith("_seconds")},
+            "average_queue_ms": round(self.counters["queue_seconds"] * 1000 / tasks, 3) if tasks else 0.0,
+            "average_run_ms": round(self.counters["run_seconds"] * 1000 / tasks, 3) if tasks else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,178 @@
+"""Bounded job queue and worker pool for spider executions"""
+from typing import Any, Dict, Optional, Set
+from sqlalchemy import func, select, update
+from app.models import Spider, SpiderExecution
+from app.db import AsyncSessionLocal
+from app.services.execution_queue import (
+    ExecutionLeases, default_worker_id, requeue_expired, request_pause, request_stop, worker_activity
+)
+import asyncio
+import datetime
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of spider executions allowed to run at the same time
+MAX_CONCURRENT_SPIDERS = int(os.getenv("MAX_CONCURRENT_SPIDERS", os.cpu_count() or 4))
+
+# Number of recently started executions used to compute the average wait time
+WAIT_TIME_SAMPLE_SIZE = 100
+
+
+class SpiderScheduler:
+    """
+    Schedule spider runs through a persistent queue.
+
+    Queued runs are stored as SpiderExecution rows with status "queued", so the
+    queue survives restarts. At most max_concurrent workers exist at any time;
+    each worker claims the highest-priority, oldest queued execution, runs it and
+    keeps claiming until the queue is empty. Claims are leases shared with the
+    worker agents (see agent.py), so the queue can also be served by other
+    processes; with MAX_CONCURRENT_SPIDERS=0 the API only queues runs.
+    """
+
+    def __init__(self, spider_service, max_concurrent: Optional[int] = None):
+        self.spider_service = spider_service
+        self.max_concurrent = MAX_CONCURRENT_SPIDERS if max_concurrent is None else max_concurrent
+        self.leases = ExecutionLeases(default_worker_id("api"))
+        self.active_workers = 0
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def enqueue(self, spider_id: str, priority: int = 0) -> Dict[str, Any]:
+        """Add a run of a spider to the queue"""
+        async with AsyncSessionLocal() as db:
+            now = datetime.datetime.now()
+            execution = SpiderExecution(
+                spider_id=spider_id,
+                status="queued",
+                priority=priority,
+                queued_at=now,
+                started_at=now
+            )
+            db.add(execution)
+            await db.execute(update(Spider).where(Spider.id == spider_id).values(status="queued"))
+            await db.commit()
+            await db.refresh(execution)
+            return self.spider_service._serialize_execution(execution)
+
+    async def cancel(self, spider_id: str) -> bool:
+        """Remove the queued runs of a spider from the queue"""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(update(SpiderExecution).where(
+                SpiderExecution.spider_id == spider_id,
+                SpiderExecution.status == "queued"
+            ).values(status="cancelled", finished_at=datetime.datetime.now()))
+            cancelled = result.rowcount
+            if cancelled:
+                await db.execute(update(Spider).where(Spider.id == spider_id).values(status="idle"))
+            await db.commit()
+            return cancelled > 0
+
+    async def resume_paused(self, spider_id: str, priority: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Put the paused execution of a spider back in the queue, to continue its crawl"""
+        async with AsyncSessionLocal() as db:
+            execution = await db.scalar(select(SpiderExecution).where(
+                SpiderExecution.spider_id == spider_id,
+                SpiderExecution.status == "paused"
+            ).order_by(SpiderExecution.started_at.desc()).limit(1))
+            if execution is None:
+                return None
+
+            execution.status = "queued"
+            execution.queued_at = datetime.datetime.now()
+            if priority is not None:
+                execution.priority = priority
+            await db.execute(update(Spider).where(Spider.id == spider_id).values(status="queued"))
+            await db.commit()
+            await db.refresh(execution)
+            return self.spider_service._serialize_execution(execution)
+
+    def reserve_worker(self) -> bool:
+        """Reserve a worker slot, returning False when the pool is full"""
+        if self.active_workers >= self.max_concurrent:
+            return False
+        self.active_workers += 1
+        return True
+
+    async def run_worker(self):
+        """Run queued executions until the queue is empty, then release the slot"""
+        try:
+            while True:
+                execution = await asyncio.to_thread(self._claim_next)
+                if execution is None:
+                    break
+                self.leases.start_heartbeat(self.spider_service)
+                try:
+                    await self.spider_service.run_spider(
+                        execution["spider_id"], execution_id=execution["id"]
+                    )
+                finally:
+                    await asyncio.to_thread(self.leases.release, execution["id"])
+        except Exception as e:
+            logger.exception(f"Scheduler worker failed: {str(e)}")
+        finally:
+            self.active_workers -= 1
+
+    async def resume(self) -> int:
+        """Start workers for executions left in the queue, e.g. after a restart"""
+        await asyncio.to_thread(requeue_expired)
+        depth = await self.queue_depth()
+        started = 0
+        while depth > started and self.reserve_worker():
+            task = asyncio.create_task(self.run_worker())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            started += 1
+        return started
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the next queued execution as running and return it"""
+        # Executions of workers that died are claimable again
+        requeue_expired()
+        return self.leases.claim()
+
+    async def request_stop(self, spider_id: str) -> bool:
+        """Ask the worker running a spider in another process to stop it"""
+        return await asyncio.to_thread(request_stop, spider_id)
+
+    async def request_pause(self, spider_id: str) -> bool:
+        """Ask the worker running a spider in another process to pause it"""
+        return await asyncio.to_thread(request_pause, spider_id)
+
+    async def queue_depth(self) -> int:
+        """Number of executions waiting in the queue"""
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(func.count(SpiderExecution.id)).where(SpiderExecution.status == "queued")
+            )
+
+    async def get_queue_stats(self) -> Dict[str, Any]:
+        """Get queue depth, worker usage and wait-time statistics"""
+        async with AsyncSessionLocal() as db:
+            now = datetime.datetime.now()
+            queued, oldest = (await db.execute(
+                select(func.count(SpiderExecution.id), func.min(SpiderExecution.queued_at))
+                .where(SpiderExecution.status == "queued")
+            )).one()
+
+            # Wait time of executions that already left the queue
+            recent = (await db.execute(select(SpiderExecution.queued_at, SpiderExecution.started_at).where(
+                SpiderExecution.queued_at.isnot(None),
+                SpiderExecution.status != "queued",
+                SpiderExecution.status != "cancelled"
+            ).order_by(SpiderExecution.started_at.desc()).limit(WAIT_TIME_SAMPLE_SIZE))).all()
+            waits = [
+                (row.started_at - row.queued_at).total_seconds()
+                for row in recent if row.started_at
+            ]
+
+        return {
+            "queued": queued,
+            "active_workers": self.active_workers,
+            "max_concurrent": self.max_concurrent,
+            "longest_wait_seconds": (now - oldest).total_seconds() if oldest else 0,
+            "average_wait_seconds": sum(waits) / len(waits) if waits else 0,
+            # Workers (this API and agents) holding running executions
+            "workers": await asyncio.to_thread(worker_activity)
+        }
@@ -0,0 +1,158 @@
+"""
+Scrapy downloader middleware revalidating cached pages with conditional requests.
+
+It only activates when HTTP_CACHE_PATH is set. Every cached page is one file in that directory, named after the request
+fingerprint: a JSON line with the status, headers and validators of the response,
+followed by the raw body. Requests for cached pages carry If-None-Match and
+If-Modified-Since; a 304 answer is replaced by the cached response, which then
+goes through the spider callbacks like a downloaded page. The modification time
+of a file is its last use, which the application evicts by (see http_cache.py).
+"""
+import json
+import logging
+import os
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+logger = logging.getLogger(__name__)
+
+# Extension of the cache entries, also used by http_cache.py to size and evict them
+ENTRY_SUFFIX = ".cache"
+
+
+def read_entry(path: str, with_body: bool = False):
+    """Metadata of a cached page (and its body), or None if it is not cached"""
+    try:
+        with open(path, "rb") as entry:
+            metadata = json.loads(entry.readline())
+            if with_body:
+                return metadata, entry.read()
+            return metadata
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_entry(path: str, metadata: dict, body: bytes):
+    """Store a page atomically, so readers never see half an entry"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as entry:
+        entry.write(json.dumps(metadata).encode() + b"\n")
+        entry.write(body)
+    os.replace(temp_path, path)
+
+
+class ConditionalCacheMiddleware:
+    """Reuse cached pages the server reports as not modified"""
+
+    def __init__(self, crawler, directory: str, max_entry_bytes: int):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.directory = directory
+        self.max_entry_bytes = max_entry_bytes
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        directory = settings.get("HTTP_CACHE_PATH")
+        if not directory:
+            raise NotConfigured
+        os.makedirs(directory, exist_ok=True)
+        middleware = cls(crawler, directory, settings.getint("HTTP_CACHE_MAX_ENTRY_BYTES", 0))
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        return middleware
+
+    def spider_opened(self, spider):
+        for name in ("hits", "misses", "stored", "stored_bytes"):
+            self.stats.set_value(f"http_cache/{name}", 0)
+
+    def _path(self, request) -> str:
+        key = self.crawler.request_fingerprinter.fingerprint(request).hex()
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def _cacheable(self, request) -> bool:
+        return request.method == "GET" and not request.meta.get("dont_cache")
+
+    def process_request(self, request, spider):
+        if not self._cacheable(request):
+            return None
+        # Requests the spider made conditional itself are left alone
+        if b"If-None-Match" in request.headers or b"If-Modified-Since" in request.headers:
+            return None
+
+        metadata = read_entry(self._path(request))
+        if metadata is None:
+            return None
+        if metadata.get("etag"):
+            request.headers[b"If-None-Match"] = metadata["etag"]
+        if metadata.get("last_modified"):
+            request.headers[b"If-Modified-Since"] = metadata["last_modified"]
+        request.meta["http_cache_revalidated"] = True
+        return None
+
+    def process_response(self, request, response, spider):
+        if not self._cacheable(request):
+            return response
+        path = self._path(request)
+
+        if response.status == 304 and request.meta.get("http_cache_revalidated"):
+            cached = self._cached_response(path, request)
+            if cached is not None:
+                self.stats.inc_value("http_cache/hits")
+                return cached
+        self.stats.inc_value("http_cache/misses")
+
+        if response.status == 200 and self._store(path, response):
+            self.stats.inc_value("http_cache/stored")
+            self.stats.inc_value("http_cache/stored_bytes", len(response.body))
+        return response
+
+    def _cached_response(self, path: str, request):
+        entry = read_entry(path, with_body=True)
+        if entry is None:
+            return None
+        metadata, body = entry
+        # Mark the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        headers = Headers(metadata["headers"])
+        response_class = responsetypes.from_args(headers=headers, url=metadata["url"], body=body)
+        return response_class(
+            url=metadata["url"],
+            status=metadata["status"],
+            headers=headers,
+            body=body,
+            flags=["cached"],
+            request=request
+        )
+
+    def _store(self, path: str, response) -> bool:
+        etag = response.headers.get(b"ETag")
+        last_modified = response.headers.get(b"Last-Modified")
+        # Without validators the page could never be revalidated
+        if not etag and not last_modified:
+            return False
+        if self.max_entry_bytes and len(response.body) > self.max_entry_bytes:
+            return False
+
+        metadata = {
+            "url": response.url,
+            "status": response.status,
+            "headers": {
+                name.decode("latin-1"): [value.decode("latin-1") for value in values]
+                for name, values in response.headers.items()
+            },
+            "etag": etag.decode("latin-1") if etag else None,
+            "last_modified": last_modified.decode("latin-1") if last_modified else None,
+        }
+        try:
+            write_entry(path, metadata, response.body)
+        except OSError as e:
+            # A full disk must not fail the crawl
+            logger.warning(f"Could not cache {response.url}: {e}")
+            return False
+        return True
@@ -0,0 +1,157 @@
+"""
+Scrapy downloader middleware skipping pages that earlier runs crawled recently.
+
+It only activates when INCREMENTAL is true and INCREMENTAL_STORE_PATH is set. The
+store is a file of fixed-size records (request
+fingerprint prefix, crawl time) sorted by fingerprint, searched by bisection on a
+memory map, so lookups neither load the file nor slow down as it grows. Pages
+fetched during the run are merged into the file when the spider closes.
+"""
+import logging
+import mmap
+import os
+import struct
+import time
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+
+logger = logging.getLogger(__name__)
+
+# 16 bytes of the request fingerprint and the crawl time in seconds since the epoch
+RECORD = struct.Struct("<16sQ")
+KEY_SIZE = 16
+
+
+class FingerprintFile:
+    """Read-only view of a sorted fingerprint file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._map = None
+        if os.path.exists(path) and os.path.getsize(path) >= RECORD.size:
+            self._file = open(path, "rb")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.count = len(self._map) // RECORD.size
+
+    def _key(self, index: int) -> bytes:
+        start = index * RECORD.size
+        return self._map[start:start + KEY_SIZE]
+
+    def lookup(self, key: bytes):
+        """Crawl time of a fingerprint, or None if it is not in the file"""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._key(low) == key:
+            return RECORD.unpack_from(self._map, low * RECORD.size)[1]
+        return None
+
+    def records(self):
+        """All records in fingerprint order"""
+        for index in range(self.count):
+            yield RECORD.unpack_from(self._map, index * RECORD.size)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = self._file = None
+
+
+def merge_fingerprints(path: str, crawled: dict, oldest: float) -> int:
+    """
+    Merge newly crawled fingerprints into the file at path, dropping records
+    crawled before `oldest`. Returns the number of records written.
+    """
+    existing = FingerprintFile(path)
+    new_records = iter(sorted(crawled.items()))
+    temp_path = f"{path}.tmp"
+    written = 0
+    try:
+        with open(temp_path, "wb") as output:
+            def write(key, crawled_at):
+                nonlocal written
+                if crawled_at >= oldest:
+                    output.write(RECORD.pack(key, int(crawled_at)))
+                    written += 1
+
+            # Both sides are sorted: a single sequential merge pass
+            new = next(new_records, None)
+            for key, crawled_at in existing.records():
+                while new is not None and new[0] < key:
+                    write(*new)
+                    new = next(new_records, None)
+                if new is not None and new[0] == key:
+                    write(key, max(crawled_at, new[1]))
+                    new = next(new_records, None)
+                else:
+                    write(key, crawled_at)
+            while new is not None:
+                write(*new)
+                new = next(new_records, None)
+    finally:
+        existing.close()
+    os.replace(temp_path, path)
+    return written
+
+
+class IncrementalMiddleware:
+    """Ignore requests for pages crawled within the freshness window"""
+
+    def __init__(self, crawler, path: str, freshness: float):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.path = path
+        self.freshness = freshness
+        self.store = None
+        # Fingerprints of the pages fetched by this run
+        self.crawled = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get("INCREMENTAL_STORE_PATH")
+        if not path or not settings.getbool("INCREMENTAL"):
+            raise NotConfigured
+        freshness = settings.getfloat("INCREMENTAL_FRESHNESS_HOURS", 24) * 3600
+        middleware = cls(crawler, path, freshness)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def _key(self, request) -> bytes:
+        return self.crawler.request_fingerprinter.fingerprint(request)[:KEY_SIZE]
+
+    def spider_opened(self, spider):
+        self.store = FingerprintFile(self.path)
+        self.stats.set_value("incremental/hits", 0)
+        self.stats.set_value("incremental/misses", 0)
+
+    def spider_closed(self, spider):
+        if self.store is None:
+            return
+        self.store.close()
+        stored = merge_fingerprints(self.path, self.crawled, time.time() - self.freshness)
+        logger.info(f"Incremental store of {spider.name} holds {stored} fingerprints")
+
+    def process_request(self, request, spider):
+        if request.meta.get("dont_skip_incremental"):
+            return None
+        crawled_at = self.store.lookup(self._key(request))
+        if crawled_at is not None and time.time() - crawled_at < self.freshness:
+            self.stats.inc_value("incremental/hits")
+            raise IgnoreRequest(f"Crawled {int(time.time() - crawled_at)}s ago: {request.url}")
+        self.stats.inc_value("incremental/misses")
+        return None
+
+    def process_response(self, request, response, spider):
+        if 200 <= response.status < 400:
+            self.crawled[self._key(request)] = time.time()
+        return response
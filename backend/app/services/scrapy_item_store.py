@@ -0,0 +1,60 @@
+"""
+Scrapy item pipeline writing the items of a run to the execution's item store.
+
+It only activates when ITEM_STORE_PATH is set. Items are appended as JSON Lines
+to `<ITEM_STORE_PATH>.jl`, and the byte offset of every line to
+`<ITEM_STORE_PATH>.idx` as an unsigned 64-bit little-endian integer. A line is written before its offset, so every indexed item is complete
+and readers can follow the files while the crawl is still running.
+"""
+import os
+import struct
+
+from itemadapter import ItemAdapter
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.serialize import ScrapyJSONEncoder
+
+# Extensions of the item and index files
+DATA_SUFFIX = ".jl"
+INDEX_SUFFIX = ".idx"
+
+# Format of one index entry
+OFFSET_FORMAT = "<Q"
+
+
+class ItemStorePipeline:
+    """Append scraped items and their offsets to the execution's files"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.encoder = ScrapyJSONEncoder(ensure_ascii=False)
+        self.data_fd = None
+        self.index_fd = None
+        self.position = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        path = crawler.settings.get("ITEM_STORE_PATH")
+        if not path:
+            raise NotConfigured
+        return cls(path)
+
+    def open_spider(self, spider):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        # Unbuffered descriptors: every item is visible to readers as soon as it is scraped
+        self.data_fd = os.open(self.path + DATA_SUFFIX, flags, 0o644)
+        self.index_fd = os.open(self.path + INDEX_SUFFIX, flags, 0o644)
+        # Resumed runs append to the items of the previous attempt
+        self.position = os.fstat(self.data_fd).st_size
+
+    def close_spider(self, spider):
+        for fd in (self.data_fd, self.index_fd):
+            if fd is not None:
+                os.close(fd)
+        self.data_fd = self.index_fd = None
+
+    def process_item(self, item, spider):
+        line = (self.encoder.encode(ItemAdapter(item).asdict()) + "\n").encode("utf-8")
+        os.write(self.data_fd, line)
+        os.write(self.index_fd, struct.pack(OFFSET_FORMAT, self.position))
+        self.position += len(line)
+        return item
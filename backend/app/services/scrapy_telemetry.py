@@ -0,0 +1,121 @@
+"""
+Scrapy extension reporting crawl statistics over a local socket.
+
+It is enabled through the EXTENSIONS setting and only activates when
+TELEMETRY_SOCKET is set. While the spider is open it writes a
+"stats" event every TELEMETRY_INTERVAL seconds, and a final "closed" event with
+the complete Scrapy stats when the spider closes. Events are JSON lines.
+"""
+import json
+import logging
+import resource
+import socket
+import sys
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import task
+
+logger = logging.getLogger(__name__)
+
+# Prefix of the protocol events warm workers write to stdout (see scrapy_worker.py);
+# any other line is log output
+EVENT_PREFIX = "@@birdscrapyd "
+
+# Prefix of the Scrapy stats counting responses by HTTP status
+RESPONSE_STATUS_PREFIX = "downloader/response_status_count/"
+
+
+def peak_memory_mb() -> float:
+    """Peak resident memory of this process in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class TelemetryExtension:
+    """Send periodic snapshots of the crawler stats to the application"""
+
+    def __init__(self, crawler, address: str, interval: float):
+        self.crawler = crawler
+        self.address = address
+        self.interval = interval
+        self.socket = None
+        self.task = None
+        self.started = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        address = crawler.settings.get("TELEMETRY_SOCKET")
+        if not address:
+            raise NotConfigured
+        extension = cls(crawler, address, crawler.settings.getfloat("TELEMETRY_INTERVAL", 1.0))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        self.started = time.monotonic()
+        try:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(self.address)
+        except OSError as e:
+            logger.warning(f"Telemetry disabled, cannot connect to {self.address}: {e}")
+            self.socket = None
+            return
+        self.task = task.LoopingCall(self.send, "stats")
+        self.task.start(self.interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        if self.task and self.task.running:
+            self.task.stop()
+        self.send("closed", reason=reason, stats=self.crawler.stats.get_stats())
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+
+    def snapshot(self) -> dict:
+        """The counters reported in every event"""
+        stats = self.crawler.stats.get_stats()
+        snapshot = {
+            "items_scraped": stats.get("item_scraped_count", 0),
+            "items_dropped": stats.get("item_dropped_count", 0),
+            "requests": stats.get("downloader/request_count", 0),
+            "responses": {
+                key[len(RESPONSE_STATUS_PREFIX):]: value
+                for key, value in stats.items() if key.startswith(RESPONSE_STATUS_PREFIX)
+            },
+            "response_bytes": stats.get("downloader/response_bytes", 0),
+            "errors": stats.get("log_count/ERROR", 0),
+            "peak_memory_mb": round(peak_memory_mb(), 1),
+            "elapsed": round(time.monotonic() - self.started, 3),
+        }
+        if "incremental/hits" in stats:
+            snapshot["incremental"] = {
+                "hits": stats.get("incremental/hits", 0),
+                "misses": stats.get("incremental/misses", 0),
+            }
+        if "http_cache/misses" in stats:
+            hits, misses = stats.get("http_cache/hits", 0), stats["http_cache/misses"]
+            snapshot["http_cache"] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+                "stored_bytes": stats.get("http_cache/stored_bytes", 0),
+            }
+        return snapshot
+
+    def send(self, event: str, **data):
+        """Write an event to the socket; telemetry must never break the crawl"""
+        if not self.socket:
+            return
+        payload = {"event": event, **self.snapshot(), **data}
+        try:
+            self.socket.sendall((json.dumps(payload, default=str) + "\n").encode())
+        except OSError as e:
+            logger.warning(f"Telemetry disabled, cannot send to {self.address}: {e}")
+            self.socket.close()
+            self.socket = None
+            if self.task and self.task.running:
+                self.task.stop()
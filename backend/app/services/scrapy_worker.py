@@ -0,0 +1,174 @@
+"""
+Warm Scrapy worker process.
+
+This module is executed as a standalone script by ScrapyWorkerPool and must not
+import the application package. It imports Scrapy and starts the Twisted reactor
+once, then runs spider jobs received as JSON lines on stdin with a CrawlerRunner.
+A job carries either spider source code or the path of a cached spider module;
+a {"command": "shutdown"} line stops the running crawl gracefully instead.
+Scrapy logs go to stderr; protocol events are written to stdout prefixed with
+EVENT_PREFIX. The worker exits after max_jobs jobs, when its peak memory exceeds
+max_memory_mb, or when stdin is closed.
+"""
+import importlib.util
+import json
+import os
+import sys
+import threading
+
+from scrapy.utils.reactor import install_reactor
+
+install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+
+import scrapy
+from scrapy.crawler import CrawlerRunner
+from scrapy.utils.log import configure_logging
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import get_project_settings
+from twisted.internet import reactor
+
+# Loaded as a sibling of this script, after the reactor is installed
+from scrapy_telemetry import EVENT_PREFIX, peak_memory_mb
+
+
+def send_event(event: str, **data):
+    """Write a protocol event to stdout"""
+    data["event"] = event
+    sys.stdout.write(EVENT_PREFIX + json.dumps(data) + "\n")
+    sys.stdout.flush()
+
+
+def preload_components(settings):
+    """Import the component classes Scrapy would otherwise load lazily on the first crawl"""
+    for name, value in settings.items():
+        if not (name.endswith("_BASE") or name.endswith("_CLASS")):
+            continue
+        # Component settings map class paths to orders, handler settings map names to class paths
+        paths = [*value.keys(), *value.values()] if hasattr(value, "keys") else [value]
+        for path in paths:
+            if isinstance(path, str) and "." in path:
+                try:
+                    load_object(path)
+                except Exception:
+                    # Optional components whose dependencies are not installed
+                    pass
+
+
+def find_spider_class(namespace: dict, module_name: str):
+    """Return the spider class defined in a module namespace"""
+    for value in namespace.values():
+        if (isinstance(value, type) and issubclass(value, scrapy.Spider)
+                and value.__module__ == module_name):
+            return value
+    raise ValueError("No spider class found in spider code")
+
+
+def load_spider_class(code: str, filename: str, module_name: str):
+    """Compile spider source code and return the spider class it defines"""
+    namespace = {"__name__": module_name, "__file__": filename}
+    exec(compile(code, filename, "exec"), namespace)
+    return find_spider_class(namespace, module_name)
+
+
+def load_spider_file(path: str):
+    """Import a cached spider module, using its bytecode when it is up to date"""
+    module_name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return find_spider_class(vars(module), module_name)
+
+
+class Worker:
+    """Run spider jobs one at a time inside a single reactor"""
+
+    def __init__(self, max_jobs: int, max_memory_mb: float):
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        self.jobs_run = 0
+        self.busy = False
+        self.closing = False
+        self.job_id = None
+        self.crawler = None
+        # Spider classes of cached modules; the files are content-addressed and never change
+        self.spider_classes = {}
+
+    def run_job(self, job: dict):
+        """Start a crawl for a job received from the pool"""
+        self.busy = True
+        job_id = job["job_id"]
+        try:
+            if job.get("path"):
+                path = job["path"]
+                if path not in self.spider_classes:
+                    self.spider_classes[path] = load_spider_file(path)
+                spider_cls = self.spider_classes[path]
+            else:
+                spider_cls = load_spider_class(
+                    job["code"], job.get("filename", "<spider>"), f"birdscrapyd_spider_{self.jobs_run}"
+                )
+            settings = get_project_settings()
+            settings.setdict(job.get("settings") or {}, priority="cmdline")
+            runner = CrawlerRunner(settings)
+            self.job_id, self.crawler = job_id, runner.create_crawler(spider_cls)
+            deferred = runner.crawl(self.crawler)
+        except Exception as e:
+            self.finish_job(job_id, "error", f"{type(e).__name__}: {e}")
+            return
+
+        deferred.addCallbacks(
+            lambda _: self.finish_job(job_id, "finished"),
+            lambda failure: self.finish_job(job_id, "error", failure.getErrorMessage())
+        )
+
+    def shutdown_job(self, job_id: str):
+        """Stop a crawl like a first Ctrl-C would: in-flight requests finish, JOBDIR state is saved"""
+        if self.crawler is not None and self.job_id == job_id:
+            self.crawler.stop()
+
+    def finish_job(self, job_id: str, status: str, error: str = None):
+        """Report a finished job and recycle the worker if it is worn out"""
+        self.busy = False
+        self.job_id = self.crawler = None
+        self.jobs_run += 1
+        recycle = self.jobs_run >= self.max_jobs or peak_memory_mb() >= self.max_memory_mb
+        send_event("finished", job_id=job_id, status=status, error=error, recycle=recycle)
+        if recycle or self.closing:
+            reactor.stop()
+
+    def close(self):
+        """Stop once the current job, if any, is finished"""
+        self.closing = True
+        if not self.busy:
+            reactor.stop()
+
+    def read_jobs(self):
+        """Read jobs from stdin in a thread and hand them to the reactor"""
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+            message = json.loads(line)
+            if message.get("command") == "shutdown":
+                reactor.callFromThread(self.shutdown_job, message["job_id"])
+            else:
+                reactor.callFromThread(self.run_job, message)
+        reactor.callFromThread(self.close)
+
+
+def main():
+    max_jobs = int(os.getenv("SCRAPY_WORKER_MAX_JOBS", "20"))
+    max_memory_mb = float(os.getenv("SCRAPY_WORKER_MAX_MEMORY_MB", "512"))
+
+    settings = get_project_settings()
+    configure_logging(settings)
+    preload_components(settings)
+    worker = Worker(max_jobs, max_memory_mb)
+    threading.Thread(target=worker.read_jobs, daemon=True).start()
+
+    reactor.callWhenRunning(send_event, "ready", pid=os.getpid())
+    reactor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Content-addressed cache of generated spider code"""
+from typing import Any, Callable, Optional
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import py_compile
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the cached spider modules and their bytecode
+SPIDER_CACHE_DIR = os.getenv(
+    "SPIDER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "birdscrapyd_spiders")
+)
+
+# Maximum number of cached spider modules kept on disk
+SPIDER_CACHE_SIZE = int(os.getenv("SPIDER_CACHE_SIZE", "256"))
+
+
+def _config_value(spider, field: str) -> Any:
+    """Read a config field from an ORM object, a Pydantic model or a dict"""
+    value = spider.get(field) if isinstance(spider, dict) else getattr(spider, field, None)
+    if isinstance(value, list):
+        return [item.model_dump() if hasattr(item, "model_dump") else item for item in value]
+    return value
+
+
+# Modules whose source determines the generated code (the block compiler, its
+# spider template and runtime helpers, and the graph analysis it builds on);
+# changing them invalidates cached spiders, unlike changes to the rest of the app
+GENERATOR_MODULES = ("app.services.block_compiler", "app.services.block_graph")
+
+
+@lru_cache(maxsize=None)
+def generator_version() -> str:
+    """Hash of the source of the code generator, so an upgrade does not run modules it generated before"""
+    digest = hashlib.sha256()
+    for name in GENERATOR_MODULES:
+        with open(importlib.util.find_spec(name).origin, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+def spider_config_hash(spider) -> str:
+    """Hash the parts of a spider configuration, and the generator, that determine its generated code"""
+    config = {field: _config_value(spider, field) for field in ("name", "start_urls", "blocks", "settings")}
+    config["settings"] = config["settings"] or {}
+    config["generator"] = generator_version()
+    payload = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CachedSpider:
+    """A generated spider module stored in the cache"""
+
+    def __init__(self, key: str, path: str):
+        self.key = key
+        self.path = path
+
+    @property
+    def bytecode_path(self) -> str:
+        return importlib.util.cache_from_source(self.path)
+
+
+class SpiderCodeCache:
+    """
+    Cache generated spider modules on disk, keyed by a hash of the spider config.
+
+    Each entry is a `spider_<hash>.py` module plus its bytecode in `__pycache__`,
+    so `scrapy runspider` and the warm workers import it without re-parsing.
+    Entries are reused across runs until the config changes and evicted in LRU
+    order once the cache holds more than max_entries modules.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_entries: Optional[int] = None):
+        self.directory = directory or SPIDER_CACHE_DIR
+        self.max_entries = max_entries or SPIDER_CACHE_SIZE
+        self._entries: "OrderedDict[str, CachedSpider]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._load_index()
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"spider_{key}.py")
+
+    def _load_index(self):
+        """Rebuild the LRU order from the modules already on disk"""
+        modules = []
+        for filename in os.listdir(self.directory):
+            if filename.startswith("spider_") and filename.endswith(".py"):
+                path = os.path.join(self.directory, filename)
+                modules.append((os.path.getmtime(path), filename[len("spider_"):-len(".py")], path))
+        for _, key, path in sorted(modules):
+            self._entries[key] = CachedSpider(key, path)
+
+    def get_or_build(self, spider, build: Callable[[Any], str]) -> CachedSpider:
+        """Return the cached module for a spider config, generating it on a miss"""
+        key = spider_config_hash(spider)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and os.path.exists(entry.path):
+                self._entries.move_to_end(key)
+                os.utime(entry.path)
+                return entry
+
+        entry = CachedSpider(key, self._path_for(key))
+        self._write(entry, build(spider))
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def _write(self, entry: CachedSpider, code: str):
+        """Atomically write the module source and compile its bytecode"""
+        fd, temp_path = tempfile.mkstemp(suffix=".py", dir=self.directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as source:
+                source.write(code)
+            os.replace(temp_path, entry.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+
+        try:
+            # The source never changes for a given key, so the bytecode does not need
+            # to be revalidated against the file's mtime (which LRU touches update)
+            py_compile.compile(
+                entry.path, doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH
+            )
+        except py_compile.PyCompileError as e:
+            # Leave the source in place; the runner will report the syntax error
+            logger.error(f"Error compiling cached spider {entry.key}: {str(e)}")
+
+    def _evict(self):
+        """Drop least recently used entries beyond the size limit"""
+        while len(self._entries) > self.max_entries:
+            _, entry = self._entries.popitem(last=False)
+            self._remove_files(entry)
+
+    def invalidate(self, spider) -> bool:
+        """Remove the cached module for a spider config"""
+        key = spider_config_hash(spider)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._remove_files(entry)
+        return True
+
+    def clear(self):
+        """Remove every cached module"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._remove_files(entry)
+
+    @staticmethod
+    def _remove_files(entry: CachedSpider):
+        for path in (entry.path, entry.bytecode_path):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,138 @@
+"""Asynchronous subprocess runner for Scrapy spiders"""
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import logging
+import signal
+
+logger = logging.getLogger(__name__)
+
+# Callback invoked for every line a spider process writes to one of its pipes
+LineHandler = Callable[[str], Awaitable[None]]
+
+# Maximum line length buffered by the stream readers (Scrapy item logs can be long)
+STREAM_LIMIT = 1024 * 1024
+
+
+class SpiderProcess:
+    """
+    Run a command as an asyncio subprocess and stream its output.
+
+    stdout and stderr are drained concurrently by two reader tasks, so a chatty
+    stream can never fill its pipe and deadlock the child while we wait on the
+    other one. Every line is pushed to the matching handler as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        args: List[str],
+        on_stdout: Optional[LineHandler] = None,
+        on_stderr: Optional[LineHandler] = None,
+        cwd: Optional[str] = None,
+        env: Optional[Dict[str, str]] = None,
+        stdin: bool = False
+    ):
+        self.args = args
+        self.on_stdout = on_stdout
+        self.on_stderr = on_stderr
+        self.cwd = cwd
+        self.env = env
+        self.stdin = stdin
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.stopped = False
+        self.interrupted = False
+        # Set when the worker lost the lease of the execution and another one runs it now
+        self.lease_lost = False
+        # Whether the run keeps its crawl state in a JOBDIR, so it can be paused
+        self.pausable = False
+        self._readers: List[asyncio.Task] = []
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self.process.returncode if self.process else None
+
+    async def start(self) -> "SpiderProcess":
+        """Start the subprocess and the pipe reader tasks"""
+        self.process = await asyncio.create_subprocess_exec(
+            *self.args,
+            stdin=asyncio.subprocess.PIPE if self.stdin else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=self.cwd,
+            env=self.env,
+            limit=STREAM_LIMIT
+        )
+        self._readers = [
+            asyncio.create_task(self._pump(self.process.stdout, self.on_stdout)),
+            asyncio.create_task(self._pump(self.process.stderr, self.on_stderr)),
+        ]
+        return self
+
+    async def _pump(self, stream: asyncio.StreamReader, handler: Optional[LineHandler]):
+        """Read a stream line by line until EOF and hand each line to the handler"""
+        while True:
+            try:
+                line = await stream.readline()
+            except ValueError:
+                # Line exceeded STREAM_LIMIT; the reader already discarded it
+                logger.warning(f"Dropped an over-long output line from process {self.pid}")
+                continue
+
+            if not line:
+                break
+
+            if handler is None:
+                continue
+
+            try:
+                await handler(line.decode(errors="replace").rstrip("\r\n"))
+            except Exception as e:
+                # A failing consumer must not stop us from draining the pipe
+                logger.exception(f"Error handling output of process {self.pid}: {str(e)}")
+
+    async def write_line(self, line: str):
+        """Write a line to the process stdin (requires stdin=True)"""
+        self.process.stdin.write(line.encode() + b"\n")
+        await self.process.stdin.drain()
+
+    async def close_stdin(self):
+        """Close the process stdin, signalling end of input"""
+        if self.process.stdin and not self.process.stdin.is_closing():
+            self.process.stdin.close()
+            await self.process.stdin.wait_closed()
+
+    async def wait(self) -> int:
+        """Wait until both pipes are drained and the process has exited"""
+        await asyncio.gather(*self._readers)
+        return await self.process.wait()
+
+    async def interrupt(self):
+        """
+        Ask the process to shut down gracefully with SIGINT, once; Scrapy then
+        finishes the requests in progress and saves its JOBDIR state before exiting
+        """
+        if self.interrupted or self.process.returncode is not None:
+            return
+        self.interrupted = True
+        try:
+            self.process.send_signal(signal.SIGINT)
+        except ProcessLookupError:
+            pass
+
+    async def terminate(self, timeout: float = 5.0) -> int:
+        """Ask the process to terminate, killing it if it does not exit in time"""
+        self.stopped = True
+        if self.process.returncode is None:
+            try:
+                self.process.terminate()
+                await asyncio.wait_for(self.process.wait(), timeout=timeout)
+            except ProcessLookupError:
+                pass
+            except asyncio.TimeoutError:
+                # Force kill if it doesn't terminate gracefully
+                self.process.kill()
+                await self.process.wait()
+        return self.process.returncode
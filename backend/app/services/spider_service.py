@@ -1,61 +1,189 @@
-from typing import List, Dict, Tuple, Optional
-from sqlalchemy.orm import Session
+from typing import AsyncIterator, List, Dict, Tuple, Optional
+from sqlalchemy import and_, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from app.models import Spider, SpiderExecution
 from app.schemas import (
     SpiderCreate, SpiderUpdate, SpiderConfig, SpiderStatus,
-    UrlAnalysisResponse, SelectorInfo
+    UrlAnalysisResponse, SelectorInfo, SpiderSummary, ExecutionSummary
 )
-from app.db import SessionLocal
+from app.db import AsyncSessionLocal
 from app.api import manager
+from app.services.spider_runner import SpiderProcess
+from app.services.worker_pool import ScrapyWorkerPool
+from app.services.spider_cache import SpiderCodeCache
+from app.services.block_compiler import compile_block_graph, RUNTIME_HELPERS, SPIDER_TEMPLATE
+from app.services.block_graph import analyze_block_graph
+from app.services.telemetry import TelemetryChannel, TelemetryEvent, EXTENSION_DIR
+from app.services.item_store import ItemStore
+from app.services.log_store import LogStore
+from app.services.fingerprint_store import FingerprintStore
+from app.services.http_cache import HttpCache
+from app.services.job_state import JobStateStore
+from app.services.preview import preview_blocks
+from app.services.page_cache import PageCache
+from app.services.page_analysis import analyze_page
+from app.services.parse_pool import ParsePool
+from app.services.http_client import HttpClient
+from app.services.pagination import decode_cursor, page, parse_fields
+from app.services.columnar import (
+    columnar_available, write_columnar, query_columnar, COLUMNAR_BATCH_SIZE
+)
 import asyncio
 import json
 import os
-import subprocess
-import tempfile
+import re
 import datetime
 import uuid
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
-# Standalone functions for API endpoints
-def get_all_spiders(db: Session) -> List[Spider]:
-    """Get all spider configurations from the database"""
-    return db.query(Spider).all()
+# Log level of spider runs unless the spider sets LOG_LEVEL itself; item counts come
+# from the telemetry extension, so Scrapy no longer needs to log every item at DEBUG
+SPIDER_LOG_LEVEL = os.getenv("SPIDER_LOG_LEVEL", "INFO")
+
+# Seconds between checks for new items when following an execution
+ITEM_FOLLOW_INTERVAL = float(os.getenv("ITEM_FOLLOW_INTERVAL", "0.5"))
+
+# Execution statuses that can still produce items
+ACTIVE_STATUSES = ("queued", "running", "stopping", "pausing", "paused")
+
+# Fields of the spider and execution listings
+SPIDER_FIELDS = ("id", "name", "status", "start_urls", "blocks", "settings", "created_at", "updated_at")
+EXECUTION_FIELDS = (
+    "id", "spider_id", "queued_at", "started_at", "finished_at", "status", "priority",
+    "items_scraped", "error_message", "stats"
+)
+
+def _load_only(model, columns: Optional[List[str]]):
+    """Load only some columns; reading another one raises instead of querying it"""
+    return load_only(*(getattr(model, column) for column in columns), raiseload=True)
 
-def get_spider_jobs(db: Session, spider_id: Optional[str] = None) -> List[SpiderExecution]:
-    """Get all jobs for a specific spider or all spiders"""
-    query = db.query(SpiderExecution)
+# Standalone functions for API endpoints
+async def get_all_spiders(db: AsyncSession, limit: Optional[int] = None, after: Optional[Tuple] = None,
+                          columns: Optional[List[str]] = None) -> List[Spider]:
+    """
+    Get spider configurations from the database, oldest first. With a limit,
+    a page of them after the (created_at, id) key of the previous page.
+    Spiders without a creation time come first.
+    """
+    query = select(Spider).order_by(Spider.created_at.asc().nulls_first(), Spider.id)
+    if after:
+        created_at, spider_id = after
+        if created_at is None:
+            # The previous page ended among the spiders without a creation time
+            query = query.where(or_(
+                and_(Spider.created_at.is_(None), Spider.id > spider_id), Spider.created_at.is_not(None)
+            ))
+        else:
+            query = query.where(tuple_(Spider.created_at, Spider.id) > tuple_(created_at, spider_id))
+    if columns:
+        query = query.options(_load_only(Spider, columns))
+    if limit:
+        query = query.limit(limit)
+    return list(await db.scalars(query))
+
+async def get_spider_jobs(db: AsyncSession, spider_id: Optional[str] = None, limit: Optional[int] = None,
+                          after: Optional[Tuple] = None, columns: Optional[List[str]] = None) -> List[SpiderExecution]:
+    """
+    Get the jobs of a specific spider or all spiders, newest first. With a
+    limit, a page of them after the (created_at, id) key of the previous page;
+    the cost of a page does not depend on the length of the history. Jobs
+    without a creation time come last.
+    """
+    query = select(SpiderExecution)
     if spider_id:
-        query = query.filter(SpiderExecution.spider_id == spider_id)
-    return query.order_by(SpiderExecution.started_at.desc()).all()
+        query = query.where(SpiderExecution.spider_id == spider_id)
+    if columns:
+        query = query.options(_load_only(SpiderExecution, columns))
+    without_time = query.where(SpiderExecution.created_at.is_(None)).order_by(SpiderExecution.id.desc())
+
+    if after and after[0] is None:
+        # The previous page ended among the jobs without a creation time
+        query = without_time.where(SpiderExecution.id < after[1])
+    else:
+        if after:
+            query = query.where(tuple_(SpiderExecution.created_at, SpiderExecution.id) < tuple_(*after))
+        query = query.order_by(SpiderExecution.created_at.desc().nulls_last(), SpiderExecution.id.desc())
+    if limit:
+        query = query.limit(limit)
+    jobs = list(await db.scalars(query))
+
+    # The jobs without a creation time follow a page that ran out of timestamped
+    # ones; they are queried apart so the keyset condition keeps using the index
+    if after and after[0] is not None and (not limit or len(jobs) < limit):
+        if limit:
+            without_time = without_time.limit(limit - len(jobs))
+        jobs += await db.scalars(without_time)
+    return jobs
 
 class SpiderService:
     """Service for managing Scrapy spiders"""
 
-    def __init__(self):
-        self.running_spiders = {}  # Store running spider processes
+    def __init__(self, worker_pool: Optional[ScrapyWorkerPool] = None,
+                 code_cache: Optional[SpiderCodeCache] = None,
+                 item_store: Optional[ItemStore] = None,
+                 log_store: Optional[LogStore] = None,
+                 fingerprint_store: Optional[FingerprintStore] = None,
+                 http_cache: Optional[HttpCache] = None,
+                 job_state: Optional[JobStateStore] = None,
+                 page_cache: Optional[PageCache] = None,
+                 http_client: Optional[HttpClient] = None,
+                 parse_pool: Optional[ParsePool] = None):
+        # Spider processes running in this process and their spider IDs, by execution ID
+        self.running_spiders = {}
+        self.running_executions = {}
+        # Warm Scrapy workers; when None every run starts a `scrapy runspider` subprocess
+        self.worker_pool = worker_pool
+        # Generated spider modules keyed by configuration hash
+        self.code_cache = code_cache or SpiderCodeCache()
+        # Scraped items of every execution
+        self.item_store = item_store or ItemStore()
+        # Log of every execution
+        self.log_store = log_store or LogStore()
+        # Pages crawled by earlier runs of incremental spiders
+        self.fingerprint_store = fingerprint_store or FingerprintStore()
+        # Pages downloaded by earlier runs, revalidated with conditional requests
+        self.http_cache = http_cache or HttpCache()
+        # Crawl state of every run, kept while an execution is paused
+        self.job_state = job_state or JobStateStore()
+        # Pages fetched to analyze URLs and preview spiders
+        self.page_cache = page_cache or PageCache()
+        # Connection pool shared by URL analyses and previews
+        self.http_client = http_client or HttpClient()
+        # Worker processes parsing pages off the event loop
+        self.parse_pool = parse_pool or ParsePool()
 
     async def get_all_spiders(self) -> List[Spider]:
         """Get all spider configurations from the database"""
-        db = SessionLocal()
-        try:
-            return db.query(Spider).all()
-        finally:
-            db.close()
+        async with AsyncSessionLocal() as db:
+            return await get_all_spiders(db)
+
+    async def list_spiders(self, limit: Optional[int] = None, cursor: Optional[str] = None,
+                           fields: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get a page of spiders with the requested fields (a summary by default)
+        and the cursor of the next page, if any.
+        """
+        fields = parse_fields(fields, SPIDER_FIELDS, SpiderSummary.model_fields)
+        after = decode_cursor(cursor) if cursor else None
+        async with AsyncSessionLocal() as db:
+            spiders = await get_all_spiders(
+                db, limit + 1 if limit else None, after, list({*fields, "created_at"})
+            )
+        spiders, next_cursor = page(spiders, limit, lambda spider: (spider.created_at, spider.id))
+        return [{field: getattr(spider, field) for field in fields} for spider in spiders], next_cursor
 
     async def get_spider(self, spider_id: str) -> Optional[Spider]:
         """Get a specific spider configuration by ID"""
-        db = SessionLocal()
-        try:
-            return db.query(Spider).filter(Spider.id == spider_id).first()
-        finally:
-            db.close()
+        async with AsyncSessionLocal() as db:
+            return await db.get(Spider, spider_id)
 
     async def create_spider(self, spider: SpiderCreate) -> Spider:
         """Create a new spider configuration"""
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             # First validate the configuration
             is_valid, message = await self.validate_spider_config(spider)
             if not is_valid:
@@ -73,29 +201,26 @@ class SpiderService:
             )
 
             db.add(db_spider)
-            db.commit()
-            db.refresh(db_spider)
+            await db.commit()
+            await db.refresh(db_spider)
             return db_spider
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
 
     async def update_spider(self, spider_id: str, spider: SpiderUpdate) -> Optional[Spider]:
         """Update an existing spider configuration"""
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             # First validate the configuration
             is_valid, message = await self.validate_spider_config(spider)
             if not is_valid:
                 raise ValueError(f"Invalid spider configuration: {message}")
 
             # Get the existing spider
-            db_spider = db.query(Spider).filter(Spider.id == spider_id).first()
+            db_spider = await db.get(Spider, spider_id)
             if not db_spider:
                 return None
 
+            # Drop the generated code of the old configuration
+            self.code_cache.invalidate(db_spider)
+
             # Update the spider fields
             db_spider.name = spider.name
             db_spider.start_urls = spider.start_urls
@@ -103,37 +228,28 @@ class SpiderService:
             db_spider.settings = spider.settings or {}
             db_spider.updated_at = datetime.datetime.now()
 
-            db.commit()
-            db.refresh(db_spider)
+            await db.commit()
+            await db.refresh(db_spider)
             return db_spider
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
 
     async def delete_spider(self, spider_id: str) -> bool:
         """Delete a spider configuration"""
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             # Get the existing spider
-            db_spider = db.query(Spider).filter(Spider.id == spider_id).first()
+            db_spider = await db.get(Spider, spider_id)
             if not db_spider:
                 return False
 
             # Stop the spider if it's running
-            if spider_id in self.running_spiders:
-                await self.stop_spider(spider_id)
-
-            # Delete the spider
-            db.delete(db_spider)
-            db.commit()
+            await self.stop_spider(spider_id)
+
+            # Delete the spider, its generated code and its crawl history
+            self.code_cache.invalidate(db_spider)
+            self.fingerprint_store.delete(spider_id)
+            self.http_cache.purge(spider_id)
+            await db.delete(db_spider)
+            await db.commit()
             return True
-        except Exception as e:
-            db.rollback()
-            raise e
-        finally:
-            db.close()
 
     async def validate_spider_config(self, config: SpiderConfig) -> Tuple[bool, str]:
         """Validate a spider configuration"""
@@ -149,38 +265,57 @@ class SpiderService:
         if not config.blocks:
             return False, "At least one block is required"
 
-        # Validate block connections
-        block_ids = set(block.id for block in config.blocks)
-        next_ids = set()
-
-        for block in config.blocks:
-            if block.type not in ["Selector", "Processor", "Output"]:
-                return False, f"Invalid block type: {block.type}"
-
-            # Check if next block IDs exist
-            if "next" in block.params:
-                next_block_ids = block.params["next"]
-                if isinstance(next_block_ids, list):
-                    for next_id in next_block_ids:
-                        next_ids.add(next_id)
-                        if next_id not in block_ids:
-                            return False, f"Block {next_id} referenced in 'next' parameter does not exist"
-                elif isinstance(next_block_ids, str):
-                    next_ids.add(next_block_ids)
-                    if next_block_ids not in block_ids:
-                        return False, f"Block {next_block_ids} referenced in 'next' parameter does not exist"
-
-        # Check for cycles
-        # This is a simple check, a more robust cycle detection would use a graph algorithm
-        if len(next_ids) >= len(block_ids):
-            return False, "Cycle detected in block connections"
+        # Block types, parameters and connections, checked once per distinct graph
+        graph = analyze_block_graph(config.blocks)
+        if not graph.valid:
+            return False, graph.error
 
         return True, "Configuration is valid"
 
-    async def run_spider(self, spider_id: str):
-        """Run a spider and send real-time updates via WebSocket"""
-        # Initialize execution_id to avoid undefined reference in case of exceptions
-        execution_id = None
+    def estimate_cost(self, config: SpiderConfig) -> Dict:
+        """Static cost of a valid block graph: paths to outputs, nesting and fan-out"""
+        return analyze_block_graph(config.blocks).cost
+
+    def graph_warnings(self, config: SpiderConfig) -> List[str]:
+        """Problems of a valid block graph that do not stop it from running, e.g. unused blocks"""
+        return analyze_block_graph(config.blocks).warnings
+
+    async def preview_spider(self, config: SpiderConfig, url: Optional[str] = None,
+                             html: Optional[str] = None, limit: int = 20) -> Dict:
+        """
+        Dry run a block graph against one page without starting a crawl: the page
+        is fetched (or an HTML snapshot used) and the blocks run in the parse pool.
+        Returns the first `limit` items with per-block match counts and timings.
+        """
+        graph = analyze_block_graph(config.blocks)
+        if not graph.valid:
+            raise ValueError(graph.error)
+        url = url or (config.start_urls[0] if config.start_urls else None)
+        if html is None and not url:
+            raise ValueError("A URL or an HTML snapshot is required")
+
+        started = time.perf_counter()
+        if html is not None:
+            body = html.encode("utf-8")
+            url = url or "about:blank"
+        else:
+            session = await self.http_client.session()
+            body = (await self.page_cache.fetch(session, url)).body
+        fetch_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        result = await self.parse_pool.run(preview_blocks, graph, body, url, limit)
+        return {
+            "url": url,
+            **result,
+            "fetch_ms": fetch_ms,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+
+    async def run_spider(self, spider_id: str, execution_id: Optional[str] = None):
+        """
+        Run a spider and send real-time updates via WebSocket.
+        When execution_id is given, the existing (scheduled) execution record is used.
+        """
         try:
             # Get the spider configuration
             db_spider = await self.get_spider(spider_id)
@@ -189,23 +324,37 @@ class SpiderService:
                     "status": "error",
                     "message": f"Spider {spider_id} not found"
                 })
+                if execution_id:
+                    await self._fail_execution(execution_id, f"Spider {spider_id} not found")
                 return
 
+            # A graph that slipped past validation (e.g. saved before it got stricter)
+            # must not reach the generated code, where a cycle would recurse forever
+            graph = analyze_block_graph(db_spider.blocks)
+            if not graph.valid:
+                raise ValueError(f"Invalid spider configuration: {graph.error}")
+
             # Update spider status
-            db = SessionLocal()
-            db_spider.status = "running"
-            db.commit()
-
-            # Create execution record
-            execution = SpiderExecution(
-                spider_id=spider_id,
-                started_at=datetime.datetime.now(),
-                status="running"
-            )
-            db.add(execution)
-            db.commit()
-            execution_id = execution.id
-            db.close()
+            async with AsyncSessionLocal() as db:
+                await db.execute(update(Spider).where(Spider.id == spider_id).values(status="running"))
+
+                # Items scraped before the execution was paused
+                items_before = 0
+                if execution_id:
+                    # Scheduled execution claimed from the queue
+                    execution = await db.get(SpiderExecution, execution_id)
+                    execution.status = "running"
+                    items_before = execution.items_scraped or 0
+                else:
+                    # Create execution record
+                    execution = SpiderExecution(
+                        spider_id=spider_id,
+                        started_at=datetime.datetime.now(),
+                        status="running"
+                    )
+                    db.add(execution)
+                await db.commit()
+                execution_id = execution.id
 
             # Send initial status update
             await manager.broadcast_to_spider(spider_id, {
@@ -216,147 +365,193 @@ class SpiderService:
             })
 
             # Generate Scrapy spider code from configuration
-            spider_code = self._generate_spider_code(db_spider)
+            # (reused from the code cache while the configuration is unchanged)
+            cached_spider = self.code_cache.get_or_build(db_spider, self._generate_spider_code)
 
-            # Create a temporary file for the spider code
-            with tempfile.NamedTemporaryFile(suffix=".py", delete=False) as temp_file:
-                temp_file.write(spider_code.encode())
-                temp_file_path = temp_file.name
+            # A paused execution continues from its saved crawl state; any other run
+            # (e.g. a retry after a lost lease) starts over without the items and
+            # log of the previous attempt
+            if not self.job_state.prepare(execution_id):
+                items_before = 0
+                self.item_store.delete(execution_id)
+                self.log_store.delete(execution_id)
 
             # Run the spider using Scrapy
             # In a real implementation, you would use Scrapyd or similar
-            # For this example, we'll use subprocess
-            process = subprocess.Popen(
-                ["scrapy", "runspider", temp_file_path, "-o", f"output_{spider_id}.json"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True
-            )
+            # For this example, we'll use warm local Scrapy workers or a scrapy subprocess
+            items_scraped = items_before
+            # Streamed to the execution's log file; only recent lines stay in memory
+            execution_log = self.log_store.open(execution_id)
+            process = None
+
+            def lease_lost() -> bool:
+                # The execution, its items and log belong to the worker running it now
+                return process is not None and process.lease_lost
+
+            async def handle_telemetry(event: TelemetryEvent):
+                nonlocal items_scraped
+                if lease_lost():
+                    return
+                items_scraped = items_before + event.items_scraped
+                stats = event.summary()
+                await self._update_execution_stats(execution_id, items_scraped, stats)
+
+                # Send update via WebSocket
+                await manager.broadcast_to_spider(spider_id, {
+                    "status": "running",
+                    "items_scraped": items_scraped,
+                    "stats": stats,
+                    "execution_id": execution_id
+                })
 
-            # Store the process for potential cancellation
-            self.running_spiders[spider_id] = process
+            async def handle_stdout(line: str):
+                if not lease_lost():
+                    execution_log.write(line)
 
-            # Send periodic updates
-            items_scraped = 0
-            output_buffer = ""
-            error_buffer = ""
+            async def handle_stderr(line: str):
+                if lease_lost():
+                    return
+                execution_log.write(line)
 
-            while process.poll() is None:
-                # Read output without blocking
-                output = process.stdout.readline()
-                error = process.stderr.readline()
+                # Scrapy writes its log to stderr
+                await manager.broadcast_to_spider(spider_id, {
+                    "status": "running",
+                    "items_scraped": items_scraped,
+                    "error_message": line.strip(),
+                    "execution_id": execution_id
+                })
 
-                # Add to buffers
-                if output:
-                    output_buffer += output
-                if error:
-                    error_buffer += error
+            # Stats are reported on a dedicated socket instead of being parsed from the log
+            telemetry = await TelemetryChannel(on_event=handle_telemetry).open()
+            # Items are streamed to the execution's JSON Lines file in the item store
+            settings = self._run_settings(db_spider, execution_id, telemetry)
 
-                # Parse output to get stats
-                if "Scraped" in output:
-                    items_scraped += 1
+            try:
+                if self.worker_pool is not None:
+                    # Hand the compiled spider module to a warm worker that has already imported Scrapy
+                    process = await self.worker_pool.submit(
+                        path=cached_spider.path,
+                        settings=settings,
+                        on_log=handle_stderr
+                    )
+                else:
+                    args = ["scrapy", "runspider", cached_spider.path]
+                    for name, value in settings.items():
+                        value = json.dumps(value) if isinstance(value, dict) else value
+                        args.extend(["-s", f"{name}={value}"])
+                    process = SpiderProcess(
+                        args,
+                        on_stdout=handle_stdout,
+                        on_stderr=handle_stderr,
+                        env=self._runspider_env()
+                    )
+                    await process.start()
 
-                    # Send update via WebSocket
-                    await manager.broadcast_to_spider(spider_id, {
-                        "status": "running",
-                        "items_scraped": items_scraped,
-                        "message": output.strip() if output else None,
-                        "execution_id": execution_id
-                    })
+                # Store the process for potential cancellation
+                process.pausable = "JOBDIR" in settings
+                self.running_spiders[execution_id] = process
+                self.running_executions[execution_id] = spider_id
 
-                # Handle errors immediately
-                if error:
-                    await manager.broadcast_to_spider(spider_id, {
-                        "status": "running",
-                        "error_message": error.strip(),
-                        "execution_id": execution_id
-                    })
+                # Wait for both pipes to drain and the process to exit
+                return_code = await process.wait()
+            finally:
+                # Waits for the final stats event of the run
+                await telemetry.close()
+                execution_log.close()
+                await self.evict_http_cache(spider_id)
 
-                # Sleep to avoid high CPU usage
-                await asyncio.sleep(0.1)
+            stats = telemetry.latest.summary() if telemetry.latest else None
 
-            # Process completed
-            return_code = process.returncode
+            if process.lease_lost:
+                self._forget_run(execution_id)
+                logger.warning(f"Abandoned the run of execution {execution_id}, another worker owns it")
+                return
 
-            # Get any remaining output
-            stdout, stderr = process.communicate()
-            if stdout:
-                output_buffer += stdout
-            if stderr:
-                error_buffer += stderr
+            if process.stopped:
+                # stop_execution has already recorded the final state
+                self._forget_run(execution_id)
+                await self._update_execution_stats(execution_id, items_scraped, stats)
+                return
+
+            # A crawl that finished before the pause took effect just finishes
+            if process.interrupted and stats and stats.get("reason") == "shutdown":
+                await self._pause_execution(spider_id, execution_id, items_scraped, stats)
+                return
 
             # Update execution record
-            db = SessionLocal()
-            execution = db.query(SpiderExecution).filter(SpiderExecution.id == execution_id).first()
-            execution.finished_at = datetime.datetime.now()
-            execution.items_scraped = items_scraped
+            async with AsyncSessionLocal() as db:
+                execution = await db.get(SpiderExecution, execution_id)
+                execution.finished_at = datetime.datetime.now()
+                execution.items_scraped = items_scraped
+                execution.stats = stats
 
-            # Update spider status
-            db_spider = db.query(Spider).filter(Spider.id == spider_id).first()
+                # Update spider status
+                db_spider = await db.get(Spider, spider_id)
 
-            if return_code == 0:
-                execution.status = "finished"
-                db_spider.status = "idle"
+                if return_code == 0:
+                    execution.status = "finished"
+                    db_spider.status = "idle"
 
-                # Send final update
-                await manager.broadcast_to_spider(spider_id, {
-                    "status": "finished",
-                    "items_scraped": items_scraped,
-                    "message": f"Spider {db_spider.name} completed successfully",
-                    "execution_id": execution_id,
-                    "timestamp": execution.finished_at.isoformat()
-                })
-            else:
-                execution.status = "error"
-                execution.error_message = stderr
-                db_spider.status = "error"
+                    # Send final update
+                    await manager.broadcast_to_spider(spider_id, {
+                        "status": "finished",
+                        "items_scraped": items_scraped,
+                        "stats": stats,
+                        "message": f"Spider {db_spider.name} completed successfully",
+                        "execution_id": execution_id,
+                        "timestamp": execution.finished_at.isoformat()
+                    })
+                else:
+                    execution.status = "error"
+                    # The end of the log; the whole log is served by the log API
+                    error_excerpt = execution_log.excerpt()
+                    execution.error_message = error_excerpt
+                    db_spider.status = "error"
 
-                # Send error update
-                await manager.broadcast_to_spider(spider_id, {
-                    "status": "error",
-                    "error_message": stderr,
-                    "execution_id": execution_id,
-                    "timestamp": execution.finished_at.isoformat()
-                })
+                    # Send error update
+                    await manager.broadcast_to_spider(spider_id, {
+                        "status": "error",
+                        "error_message": error_excerpt,
+                        "execution_id": execution_id,
+                        "timestamp": execution.finished_at.isoformat()
+                    })
 
-            db.commit()
-            db.close()
+                await db.commit()
 
             # Clean up
-            if spider_id in self.running_spiders:
-                del self.running_spiders[spider_id]
+            self._forget_run(execution_id)
+            self.job_state.delete(execution_id)
 
-            # Delete temporary file
-            os.unlink(temp_file_path)
+            # Columnar copy of the items for queries and analysts' downloads
+            await self.export_execution_items(execution_id)
 
         except Exception as e:
             # Handle exceptions
             logger.exception(f"Error running spider {spider_id}: {str(e)}")
+            if execution_id:
+                run = self._forget_run(execution_id)
+                if run is not None and run.lease_lost:
+                    return
 
             # Update status
-            db = None
             try:
-                db = SessionLocal()
-                db_spider = db.query(Spider).filter(Spider.id == spider_id).first()
-                if db_spider:
-                    db_spider.status = "error"
-
-                # Update execution if it exists
-                if execution_id:
-                    execution = db.query(SpiderExecution).filter(SpiderExecution.id == execution_id).first()
-                    if execution:
-                        execution.status = "error"
-                        execution.error_message = str(e)
-                        execution.finished_at = datetime.datetime.now()
-
-                db.commit()
+                async with AsyncSessionLocal() as db:
+                    db_spider = await db.get(Spider, spider_id)
+                    if db_spider:
+                        db_spider.status = "error"
+
+                    # Update execution if it exists
+                    if execution_id:
+                        execution = await db.get(SpiderExecution, execution_id)
+                        if execution:
+                            execution.status = "error"
+                            execution.error_message = str(e)
+                            execution.finished_at = datetime.datetime.now()
+                        self.job_state.delete(execution_id)
+
+                    await db.commit()
             except Exception as db_error:
                 logger.exception(f"Error updating database after spider error: {str(db_error)}")
-                if db:
-                    db.rollback()
-            finally:
-                if db:
-                    db.close()
 
             # Send error via WebSocket
             try:
@@ -368,346 +563,407 @@ class SpiderService:
             except Exception as ws_error:
                 logger.exception(f"Error sending WebSocket message: {str(ws_error)}")
 
-    async def stop_spider(self, spider_id: str) -> bool:
-        """Stop a running spider"""
-        if spider_id in self.running_spiders:
-            process = self.running_spiders[spider_id]
-            process.terminate()
+    def _spider_runs(self, spider_id: str) -> List[str]:
+        """IDs of the executions of a spider running in this process"""
+        return [execution_id for execution_id, running in self.running_executions.items() if running == spider_id]
 
-            # Wait for the process to terminate
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                # Force kill if it doesn't terminate gracefully
-                process.kill()
-
-            # Update status in database
-            db = SessionLocal()
-            db_spider = db.query(Spider).filter(Spider.id == spider_id).first()
+    def _forget_run(self, execution_id: str):
+        """Stop tracking the process of an execution and return it"""
+        self.running_executions.pop(execution_id, None)
+        return self.running_spiders.pop(execution_id, None)
+
+    async def stop_spider(self, spider_id: str) -> bool:
+        """Stop the running executions of a spider"""
+        execution_ids = self._spider_runs(spider_id)
+        for execution_id in execution_ids:
+            await self.stop_execution(execution_id)
+        return len(execution_ids) > 0
+
+    async def stop_execution(self, execution_id: str) -> bool:
+        """Stop an execution running in this process"""
+        process = self.running_spiders.get(execution_id)
+        if process is None:
+            return False
+        spider_id = self.running_executions[execution_id]
+
+        # Wait for the process to terminate without blocking the event loop
+        await process.terminate(timeout=5)
+
+        # Update status in database
+        async with AsyncSessionLocal() as db:
+            db_spider = await db.get(Spider, spider_id)
             if db_spider:
                 db_spider.status = "idle"
 
             # Update execution record
-            execution = db.query(SpiderExecution).filter(
+            await db.execute(update(SpiderExecution).where(
+                SpiderExecution.id == execution_id,
+                SpiderExecution.status.in_(("running", "stopping", "pausing"))
+            ).values(status="stopped", finished_at=datetime.datetime.now()))
+            self.job_state.delete(execution_id)
+
+            await db.commit()
+
+        # Send status update via WebSocket
+        await manager.broadcast_to_spider(spider_id, {
+            "status": "stopped",
+            "message": f"Spider {spider_id} stopped",
+            "execution_id": execution_id,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+
+        # Clean up
+        self._forget_run(execution_id)
+        return True
+
+    async def pause_spider(self, spider_id: str) -> bool:
+        """Pause the running executions of a spider"""
+        execution_ids = self._spider_runs(spider_id)
+        for execution_id in execution_ids:
+            await self.pause_execution(execution_id)
+        return len(execution_ids) > 0
+
+    async def pause_execution(self, execution_id: str) -> bool:
+        """
+        Pause an execution running in this process: the crawl shuts down
+        gracefully and its pending requests are saved, so resuming the execution
+        continues where it stopped. Returns as soon as the shutdown is requested;
+        the run reports "paused" once the requests in progress are done.
+        """
+        process = self.running_spiders.get(execution_id)
+        if process is None:
+            return False
+        if not process.pausable:
+            raise ValueError("The run keeps no crawl state to resume from; set \"PAUSABLE\": true to pause it")
+        spider_id = self.running_executions[execution_id]
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(SpiderExecution).where(
+                SpiderExecution.id == execution_id,
+                SpiderExecution.status.in_(("running", "pausing"))
+            ).values(status="pausing"))
+            await db.commit()
+
+        await process.interrupt()
+        await manager.broadcast_to_spider(spider_id, {
+            "status": "pausing",
+            "message": f"Spider {spider_id} is pausing",
+            "execution_id": execution_id,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+        return True
+
+    async def _pause_execution(self, spider_id: str, execution_id: str, items_scraped: int, stats: Optional[Dict]):
+        """Record a run that was shut down by pause_spider"""
+        self.job_state.mark_paused(execution_id)
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(SpiderExecution).where(SpiderExecution.id == execution_id).values(
+                status="paused",
+                items_scraped=items_scraped,
+                stats=stats
+            ))
+            await db.execute(update(Spider).where(Spider.id == spider_id).values(status="paused"))
+            await db.commit()
+        self._forget_run(execution_id)
+
+        await manager.broadcast_to_spider(spider_id, {
+            "status": "paused",
+            "items_scraped": items_scraped,
+            "stats": stats,
+            "message": f"Spider {spider_id} paused",
+            "execution_id": execution_id,
+            "timestamp": datetime.datetime.now().isoformat()
+        })
+
+    async def discard_paused(self, spider_id: str) -> bool:
+        """Stop a paused execution for good, dropping its saved crawl state"""
+        async with AsyncSessionLocal() as db:
+            executions = list(await db.scalars(select(SpiderExecution).where(
                 SpiderExecution.spider_id == spider_id,
-                SpiderExecution.status == "running"
-            ).order_by(SpiderExecution.started_at.desc()).first()
-
-            if execution:
+                SpiderExecution.status == "paused"
+            )))
+            for execution in executions:
                 execution.status = "stopped"
                 execution.finished_at = datetime.datetime.now()
-
-            db.commit()
-            db.close()
-
-            # Send status update via WebSocket
-            await manager.broadcast_to_spider(spider_id, {
-                "status": "stopped",
-                "message": f"Spider {spider_id} stopped",
-                "execution_id": execution.id if execution else None,
-                "timestamp": datetime.datetime.now().isoformat()
-            })
-
-            # Clean up
-            del self.running_spiders[spider_id]
-            return True
-
-        return False
-
-    async def get_spider_executions(self, spider_id: str) -> List[Dict]:
-        """Get the execution history for a spider"""
-        db = SessionLocal()
-        try:
+                self.job_state.delete(execution.id)
+            if executions:
+                await db.execute(update(Spider).where(Spider.id == spider_id).values(status="idle"))
+            await db.commit()
+            return len(executions) > 0
+
+    def _run_settings(self, spider, execution_id: str, telemetry: TelemetryChannel) -> Dict:
+        """Scrapy settings added to every run, on top of the spider's own settings"""
+        spider_settings = spider.settings or {}
+        settings = {
+            **telemetry.settings(),
+            **self.item_store.pipeline_settings(execution_id)
+        }
+        # Disk queues cost every request a pickle and a write, so only runs that
+        # may be paused, or continue a paused crawl, keep a JOBDIR
+        if spider_settings.get("PAUSABLE") or self.job_state.exists(execution_id):
+            settings.update(self.job_state.settings(execution_id))
+        optional = []
+        if spider_settings.get("INCREMENTAL"):
+            optional.append(self.fingerprint_store.middleware_settings(spider.id))
+        if self.http_cache.enabled and spider_settings.get("HTTP_CACHE", True):
+            optional.append(self.http_cache.middleware_settings(spider.id))
+        for extra in optional:
+            for name, value in extra.items():
+                settings[name] = {**settings.get(name, {}), **value} if isinstance(value, dict) else value
+        # Keep components enabled by the spider, the run settings take precedence over them
+        for name in ("EXTENSIONS", "ITEM_PIPELINES", "DOWNLOADER_MIDDLEWARES"):
+            if name in settings:
+                settings[name] = {**(spider_settings.get(name) or {}), **settings[name]}
+        if "LOG_LEVEL" not in spider_settings:
+            settings["LOG_LEVEL"] = SPIDER_LOG_LEVEL
+        return settings
+
+    @staticmethod
+    def _runspider_env() -> Dict[str, str]:
+        """Environment of `scrapy runspider` processes, able to import the telemetry extension"""
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [EXTENSION_DIR, env.get("PYTHONPATH")]))
+        return env
+
+    async def _update_execution_stats(self, execution_id: str, items_scraped: int, stats: Optional[Dict]):
+        """Record the latest telemetry of a run"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(SpiderExecution).where(SpiderExecution.id == execution_id).values(
+                items_scraped=items_scraped,
+                stats=stats
+            ))
+            await db.commit()
+
+    async def _fail_execution(self, execution_id: str, error_message: str):
+        """Mark an execution as failed before it could start"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(SpiderExecution).where(SpiderExecution.id == execution_id).values(
+                status="error",
+                error_message=error_message,
+                finished_at=datetime.datetime.now()
+            ))
+            await db.commit()
+
+    @staticmethod
+    def _serialize_execution(execution: SpiderExecution, fields=EXECUTION_FIELDS) -> Dict:
+        """Convert an execution record to dictionary format for API responses"""
+        data = {}
+        for field in fields:
+            value = getattr(execution, field)
+            data[field] = value.isoformat() if isinstance(value, datetime.datetime) else value
+        return data
+
+    async def get_spider_executions(self, spider_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                                    fields: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Get a page of the execution history of a spider, newest first, with the
+        requested fields (a summary by default) and the cursor of the next page.
+        """
+        fields = parse_fields(fields, EXECUTION_FIELDS, ExecutionSummary.model_fields)
+        after = decode_cursor(cursor) if cursor else None
+        async with AsyncSessionLocal() as db:
             # Query the executions
-            executions = db.query(SpiderExecution).filter(
-                SpiderExecution.spider_id == spider_id
-            ).order_by(SpiderExecution.started_at.desc()).all()
+            executions = await get_spider_jobs(
+                db, spider_id, limit + 1 if limit else None, after, list({*fields, "created_at"})
+            )
 
-            # Convert to dictionary format for API response
-            result = []
-            for execution in executions:
-                result.append({
-                    "id": execution.id,
-                    "spider_id": execution.spider_id,
-                    "started_at": execution.started_at.isoformat() if execution.started_at else None,
-                    "finished_at": execution.finished_at.isoformat() if execution.finished_at else None,
-                    "status": execution.status,
-                    "items_scraped": execution.items_scraped,
-                    "error_message": execution.error_message,
-                    "stats": execution.stats
-                })
-            return result
-        finally:
-            db.close()
+        executions, next_cursor = page(executions, limit, lambda execution: (execution.created_at, execution.id))
+        # Convert to dictionary format for API response
+        return [self._serialize_execution(execution, fields) for execution in executions], next_cursor
 
     async def get_execution(self, execution_id: str) -> Optional[Dict]:
         """Get a specific execution by ID"""
-        db = SessionLocal()
-        try:
+        async with AsyncSessionLocal() as db:
             # Query the execution
-            execution = db.query(SpiderExecution).filter(
-                SpiderExecution.id == execution_id
-            ).first()
+            execution = await db.get(SpiderExecution, execution_id)
 
             if not execution:
                 return None
 
             # Convert to dictionary format for API response
-            return {
-                "id": execution.id,
-                "spider_id": execution.spider_id,
-                "started_at": execution.started_at.isoformat() if execution.started_at else None,
-                "finished_at": execution.finished_at.isoformat() if execution.finished_at else None,
-                "status": execution.status,
-                "items_scraped": execution.items_scraped,
-                "error_message": execution.error_message,
-                "stats": execution.stats
-            }
-        finally:
-            db.close()
+            return self._serialize_execution(execution)
+
+    async def get_execution_items(self, execution_id: str, offset: int = 0, limit: int = 100,
+                                  tail: Optional[int] = None) -> Dict:
+        """
+        Get a page of the items scraped by an execution.
+        With tail, the last `tail` items are returned instead.
+        """
+        if tail is not None:
+            offset = max(0, self.item_store.count(execution_id) - tail)
+            limit = tail
+        items, total = self.item_store.read(execution_id, offset, limit)
+        return {
+            "execution_id": execution_id,
+            "offset": offset,
+            "total": total,
+            "next_offset": offset + len(items),
+            "items": items
+        }
+
+    async def get_execution_log(self, execution_id: str, offset: int = 0, limit: int = 100,
+                                tail: Optional[int] = None) -> Dict:
+        """
+        Get a range of log lines of an execution.
+        With tail, the last `tail` lines are returned instead.
+        """
+        if tail is not None:
+            offset = max(0, self.log_store.count(execution_id) - tail)
+            limit = tail
+        lines, total = self.log_store.read(execution_id, offset, limit)
+        return {
+            "execution_id": execution_id,
+            "offset": offset,
+            "total_lines": total,
+            "next_offset": offset + len(lines),
+            "lines": lines
+        }
+
+    async def follow_execution_items(self, execution_id: str, offset: int = 0,
+                                     batch_size: int = 500) -> AsyncIterator[Dict]:
+        """Yield the items of an execution from offset on, waiting for new ones until it ends"""
+        while True:
+            # Read the status first, so items written before the run ended are not missed
+            execution = await self.get_execution(execution_id)
+            finished = not execution or execution["status"] not in ACTIVE_STATUSES
+
+            items, _ = self.item_store.read(execution_id, offset, batch_size)
+            for item in items:
+                yield item
+            offset += len(items)
+
+            if len(items) < batch_size:
+                if finished:
+                    return
+                await asyncio.sleep(ITEM_FOLLOW_INTERVAL)
+
+    async def export_execution_items(self, execution_id: str) -> Optional[Dict]:
+        """
+        Convert the items of an execution to a Parquet file and record it in the
+        execution's stats under "columnar"
+        """
+        if not columnar_available():
+            logger.warning("pyarrow is not installed, skipping the columnar export of items")
+            return None
+        if not self.item_store.count(execution_id):
+            return None
+
+        try:
+            columnar = await asyncio.to_thread(
+                write_columnar,
+                lambda: self.item_store.iter_batches(execution_id, COLUMNAR_BATCH_SIZE),
+                self.item_store.columnar_path(execution_id)
+            )
+        except Exception as e:
+            logger.exception(f"Error exporting items of execution {execution_id}: {str(e)}")
+            return None
+
+        async with AsyncSessionLocal() as db:
+            execution = await db.get(SpiderExecution, execution_id)
+            if execution:
+                execution.stats = {**(execution.stats or {}), "columnar": columnar}
+                await db.commit()
+        return columnar
+
+    async def query_execution_items(self, execution_id: str, query: Dict) -> Dict:
+        """
+        Run a projection, filter and group-by query over the items of a finished
+        execution, converting them to the columnar format first if needed
+        """
+        if not columnar_available():
+            raise RuntimeError("pyarrow is required to query items")
+
+        execution = await self.get_execution(execution_id)
+        columnar = (execution["stats"] or {}).get("columnar")
+        path = self.item_store.columnar_path(execution_id)
+        if not columnar or not os.path.exists(path):
+            columnar = await self.export_execution_items(execution_id)
+        if not columnar:
+            return {"execution_id": execution_id, "scanned_rows": 0, "columns": [], "rows": [], "row_count": 0}
+
+        result = await asyncio.to_thread(query_columnar, path, **query)
+        return {"execution_id": execution_id, "scanned_rows": columnar["rows"], **result}
+
+    async def get_http_cache(self, spider_id: str) -> Dict[str, int]:
+        """Number and size of the pages cached for a spider"""
+        return await asyncio.to_thread(self.http_cache.usage, spider_id)
+
+    async def purge_http_cache(self, spider_id: str) -> Dict[str, int]:
+        """Drop the cached pages of a spider; its next run downloads every page"""
+        return await asyncio.to_thread(self.http_cache.purge, spider_id)
+
+    async def evict_http_cache(self, spider_id: str):
+        """Keep the HTTP cache within its size limits after a run added pages to it"""
+        if not self.http_cache.enabled:
+            return
+        try:
+            evicted = await asyncio.to_thread(self.http_cache.evict, spider_id)
+        except Exception as e:
+            logger.exception(f"Error evicting the HTTP cache of spider {spider_id}: {str(e)}")
+            return
+        if evicted["entries"]:
+            logger.info(f"Evicted {evicted['entries']} pages ({evicted['bytes']} bytes) from the HTTP cache")
 
     async def analyze_url(self, url: str) -> UrlAnalysisResponse:
         """Analyze a URL and extract possible selectors"""
-        import aiohttp
-        from bs4 import BeautifulSoup
-        from collections import defaultdict
+        try:
+            # Repeated analyses reuse the cached page and, while it is hot, its analysis
+            page = await self.page_cache.fetch(await self.http_client.session(), url)
+            analysis = await self.page_cache.parsed(
+                page, lambda page: self.parse_pool.run(analyze_page, page.body, page.encoding)
+            )
 
-        async with aiohttp.ClientSession() as session:
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-                }
-                async with session.get(url, headers=headers, timeout=10) as response:
-                    if response.status != 200:
-                        return UrlAnalysisResponse(
-                            url=url,
-                            status="error",
-                            available_selectors=[],
-                            page_title=None
-                        )
-
-                    html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    available_selectors = []
-
-                    # Analyze common elements
-                    elements_to_analyze = {
-                        'links': {'tag': 'a', 'attribute': 'href'},
-                        'images': {'tag': 'img', 'attribute': 'src'},
-                        'text_blocks': {'tag': ['p', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']},
-                        'lists': {'tag': ['ul', 'ol']},
-                        'tables': {'tag': 'table'}
-                    }
-
-                    for element_type, config in elements_to_analyze.items():
-                        elements = soup.find_all(config['tag'])
-                        if elements:
-                            # CSS selector
-                            css_selector = self._generate_css_selector(elements[0])
-                            sample_values = []
-                            if 'attribute' in config:
-                                sample_values = [e.get(config['attribute']) for e in elements[:3] if e.get(config['attribute'])]
-                            else:
-                                sample_values = [e.get_text().strip() for e in elements[:3] if e.get_text().strip()]
-
-                            available_selectors.append(SelectorInfo(
-                                selector=css_selector,
-                                type='css',
-                                count=len(elements),
-                                sample_values=sample_values,
-                                element_type=element_type
-                            ))
-
-                            # XPath selector
-                            xpath_selector = self._generate_xpath_selector(elements[0])
-                            available_selectors.append(SelectorInfo(
-                                selector=xpath_selector,
-                                type='xpath',
-                                count=len(elements),
-                                sample_values=sample_values,
-                                element_type=element_type
-                            ))
-
-                    return UrlAnalysisResponse(
-                        url=url,
-                        status="success",
-                        available_selectors=available_selectors,
-                        page_title=soup.title.string if soup.title else None
-                    )
+            return UrlAnalysisResponse(
+                url=url,
+                status="success",
+                available_selectors=[SelectorInfo(**selector) for selector in analysis["selectors"]],
+                page_title=analysis["page_title"],
+                tag_counts=analysis["tags"],
+                class_counts=analysis["classes"]
+            )
 
-            except Exception as e:
-                logger.error(f"Error analyzing URL {url}: {str(e)}")
-                return UrlAnalysisResponse(
-                    url=url,
-                    status="error",
-                    available_selectors=[],
-                    page_title=None
-                )
-
-    def _generate_css_selector(self, element) -> str:
-        """Generate a CSS selector for a given element"""
-        classes = element.get('class', [])
-        if classes:
-            return f"{element.name}.{'.'.join(classes)}"
-        elif element.get('id'):
-            return f"#{element.get('id')}"
-        else:
-            return element.name
-
-    def _generate_xpath_selector(self, element) -> str:
-        """Generate an XPath selector for a given element"""
-        classes = element.get('class', [])
-        if classes:
-            return f"//{element.name}[contains(@class, '{' '.join(classes)}')]"
-        elif element.get('id'):
-            return f"//{element.name}[@id='{element.get('id')}']"
-        else:
-            return f"//{element.name}"
+        except Exception as e:
+            logger.error(f"Error analyzing URL {url}: {str(e)}")
+            return UrlAnalysisResponse(
+                url=url,
+                status="error",
+                available_selectors=[],
+                page_title=None
+            )
+
+    async def analyze_urls(self, urls: List[str]) -> AsyncIterator[UrlAnalysisResponse]:
+        """
+        Analyze several URLs concurrently and yield each result as soon as it is
+        ready. The number of pages analyzed at once is bounded across all batches.
+        """
+        slots = await self.http_client.slots()
+
+        async def analyze(url: str) -> UrlAnalysisResponse:
+            async with slots:
+                return await self.analyze_url(url)
+
+        tasks = [asyncio.create_task(analyze(url)) for url in dict.fromkeys(urls)]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # The client went away before the batch was done
+            for task in tasks:
+                task.cancel()
 
     def _generate_spider_code(self, spider):
         """Generate a Scrapy spider Python code from the spider configuration"""
         # Extract spider parameters
         name = spider.name
         start_urls = spider.start_urls
-        blocks = spider.blocks
         settings = spider.settings or {}
+        class_name = re.sub(r"\W", "_", name).capitalize()
 
-        # Start building the spider code
-        code = f"""
-import scrapy
-import json
-from scrapy.linkextractors import LinkExtractor
-from scrapy.spiders import CrawlSpider, Rule
-from datetime import datetime
-
-class {name.capitalize()}Spider(scrapy.Spider):
-    name = '{name}'
-    start_urls = {start_urls}
-    custom_settings = {settings}
-    
-    def parse(self, response):
-        \"\"\"Main parsing method for start URLs\"\"\"
-        # Process the response based on the block configuration
-        """
-
-        # Create a mapping of block IDs to their block data
-        # Handle different possible block formats - could be a list of dicts or a list of Pydantic models
-        block_map = {}
-        if blocks and isinstance(blocks, list):
-            for block in blocks:
-                # Check if block is a dict or a Pydantic model
-                if isinstance(block, dict):
-                    block_map[block["id"]] = block
-                else:
-                    # Assuming it's a Pydantic model, convert to dict
-                    block_dict = block.model_dump() if hasattr(block, "model_dump") else vars(block)
-                    block_map[block_dict["id"]] = block_dict
-
-        # Find the starting blocks (blocks that are not referenced in any 'next' parameter)
-        all_blocks = set(block_map.keys())
-        next_blocks = set()
-
-        for block_id, block in block_map.items():
-            params = block.get("params", {})
-            if "next" in params:
-                next_ids = params["next"]
-                if isinstance(next_ids, list):
-                    next_blocks.update(next_ids)
-                elif isinstance(next_ids, str):
-                    next_blocks.add(next_ids)
-
-        starting_blocks = all_blocks - next_blocks
-        if not starting_blocks and all_blocks:
-            # If no clear starting block, just use the first one
-            starting_blocks = {list(all_blocks)[0]}
-
-        # Add the parse method implementation for the starting blocks
-        code += f"""
-        # Execute starting blocks
-        for starting_block_id in {list(starting_blocks)}:
-            yield from self.process_block(response, starting_block_id)
-            
-    def process_block(self, response, block_id):
-        \"\"\"Process a specific block by ID\"\"\"
-        # Block mapping
-        block_mapping = {json.dumps(block_map)}
-        
-        # Get the block data
-        block = block_mapping.get(block_id)
-        if not block:
-            self.logger.error(f"Block {{block_id}} not found")
-            return
-            
-        block_type = block.get('type')
-        params = block.get('params', {{}})
-        
-        # Process based on block type
-        if block_type == 'Selector':
-            # Extract data using the selector
-            selector_type = params.get('selector_type', 'css')
-            selector = params.get('selector', '')
-            
-            if selector_type == 'css':
-                elements = response.css(selector)
-            elif selector_type == 'xpath':
-                elements = response.xpath(selector)
-            else:
-                self.logger.error(f"Unknown selector type: {{selector_type}}")
-                return
-                
-            # Process each element with the next blocks
-            for element in elements:
-                if 'next' in params:
-                    next_blocks = params['next']
-                    if isinstance(next_blocks, list):
-                        for next_id in next_blocks:
-                            yield from self.process_block(element, next_id)
-                    elif isinstance(next_blocks, str):
-                        yield from self.process_block(element, next_blocks)
-                        
-        elif block_type == 'Processor':
-            # Apply data processing
-            processor_type = params.get('processor_type', 'extract')
-            
-            if processor_type == 'extract':
-                data = response.get() if hasattr(response, 'get') else response.extract()
-            elif processor_type == 'extract_first':
-                data = response.get() if hasattr(response, 'get') else response.extract_first()
-            elif processor_type == 'regular_expression':
-                import re
-                pattern = params.get('pattern', '')
-                text = response.get() if hasattr(response, 'get') else response.extract()
-                match = re.search(pattern, text)
-                data = match.group(1) if match else None
-            else:
-                self.logger.error(f"Unknown processor type: {{processor_type}}")
-                return
-                
-            # Process with the next blocks
-            if 'next' in params:
-                next_blocks = params['next']
-                if isinstance(next_blocks, list):
-                    for next_id in next_blocks:
-                        yield from self.process_block(data, next_id)
-                elif isinstance(next_blocks, str):
-                    yield from self.process_block(data, next_blocks)
-                    
-        elif block_type == 'Output':
-            # Generate the output item
-            field_name = params.get('field_name', 'data')
-            
-            # Create an item dictionary
-            item = {{}}
-            if isinstance(response, str):
-                item[field_name] = response
-            else:
-                item[field_name] = response.get() if hasattr(response, 'get') else response.extract()
-                
-            # Add metadata
-            item['timestamp'] = datetime.now().isoformat()
-            item['url'] = getattr(response, 'url', None)
-            
-            yield item
-        """
+        # The block graph is compiled into straight-line callbacks with every
+        # parameter resolved here, instead of being interpreted per element
+        compiled = compile_block_graph(spider.blocks)
 
-        return code
+        return SPIDER_TEMPLATE.format(
+            runtime_helpers=RUNTIME_HELPERS, constants=compiled.constants, class_name=class_name,
+            name=name, start_urls=start_urls, settings=settings, methods=compiled.methods
+        )
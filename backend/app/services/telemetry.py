@@ -0,0 +1,131 @@
+"""Structured crawl statistics reported by Scrapy processes"""
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional, Set
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Directory of the Scrapy extension module (see scrapy_telemetry.py), importable
+# by warm workers as a sibling of their script and by runspider via PYTHONPATH.
+# The scrapy_* modules are loaded there as top-level modules, so they import
+# nothing from the application; the application imports their file formats.
+EXTENSION_DIR = os.path.dirname(os.path.abspath(__file__))
+EXTENSION_PATH = "scrapy_telemetry.TelemetryExtension"
+
+# Seconds between two stats events sent by a running spider
+TELEMETRY_INTERVAL = float(os.getenv("TELEMETRY_INTERVAL", "1.0"))
+
+
+class TelemetryEvent(NamedTuple):
+    """A stats snapshot sent by the telemetry extension"""
+    event: str  # "stats" while the spider runs, "closed" once it has finished
+    items_scraped: int = 0
+    items_dropped: int = 0
+    requests: int = 0
+    responses: Dict[str, int] = {}
+    response_bytes: int = 0
+    errors: int = 0
+    peak_memory_mb: float = 0.0
+    elapsed: float = 0.0
+    incremental: Optional[Dict[str, int]] = None  # hits and misses of the incremental mode
+    http_cache: Optional[Dict[str, Any]] = None  # hits, misses and hit rate of the HTTP cache
+    reason: Optional[str] = None
+    stats: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TelemetryEvent":
+        return cls(**{field: data[field] for field in cls._fields if field in data})
+
+    def summary(self) -> Dict[str, Any]:
+        """Counters stored in SpiderExecution.stats and sent over WebSocket"""
+        summary = self._asdict()
+        del summary["event"], summary["stats"]
+        # Counters of optional components, absent when they are disabled
+        for name in ("incremental", "http_cache"):
+            if summary[name] is None:
+                del summary[name]
+        if self.stats:
+            # Complete Scrapy stats, only present in the final event
+            summary["scrapy"] = self.stats
+        return summary
+
+
+TelemetryHandler = Callable[[TelemetryEvent], Awaitable[None]]
+
+
+class TelemetryChannel:
+    """
+    Unix socket a single spider run reports its stats on.
+
+    The socket path and the extension are passed to Scrapy through settings(), so the
+    same channel works for warm workers and `scrapy runspider`. Events are decoded
+    into TelemetryEvent and handed to on_event as they arrive; the last one is kept
+    in `latest`.
+    """
+
+    def __init__(self, on_event: Optional[TelemetryHandler] = None, interval: Optional[float] = None):
+        self.on_event = on_event
+        self.interval = TELEMETRY_INTERVAL if interval is None else interval
+        self.latest: Optional[TelemetryEvent] = None
+        self.path: Optional[str] = None
+        self._directory: Optional[str] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Set[asyncio.Task] = set()
+
+    async def open(self) -> "TelemetryChannel":
+        """Start listening on a socket in a private temporary directory"""
+        self._directory = tempfile.mkdtemp(prefix="birdscrapyd_")
+        self.path = os.path.join(self._directory, "telemetry.sock")
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        return self
+
+    def settings(self) -> Dict[str, Any]:
+        """Scrapy settings enabling the telemetry extension for this channel"""
+        return {
+            "EXTENSIONS": {EXTENSION_PATH: 0},
+            "TELEMETRY_SOCKET": self.path,
+            "TELEMETRY_INTERVAL": self.interval,
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    event = TelemetryEvent.from_dict(json.loads(line))
+                except (ValueError, TypeError) as e:
+                    logger.warning(f"Ignoring malformed telemetry event: {str(e)}")
+                    continue
+                self.latest = event
+                if self.on_event:
+                    try:
+                        await self.on_event(event)
+                    except Exception as e:
+                        logger.exception(f"Error handling telemetry event: {str(e)}")
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def close(self, timeout: float = 2.0):
+        """
+        Stop listening. Connections still open are given `timeout` seconds to
+        deliver their last events (the final one is sent as the spider closes).
+        """
+        if self._connections:
+            _, pending = await asyncio.wait(set(self._connections), timeout=timeout)
+            for connection in pending:
+                connection.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._directory:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
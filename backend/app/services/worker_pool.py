@@ -0,0 +1,225 @@
+"""Pool of warm Scrapy worker processes"""
+from typing import Any, Dict, List, Optional, Set
+from app.services.scrapy_telemetry import EVENT_PREFIX
+from app.services.spider_runner import SpiderProcess, LineHandler
+import asyncio
+import json
+import logging
+import os
+import sys
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Script run by every worker process (see scrapy_worker.py)
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrapy_worker.py")
+
+# Number of idle workers kept warm and ready to accept a job
+SCRAPY_WORKER_POOL_SIZE = int(os.getenv("SCRAPY_WORKER_POOL_SIZE", "2"))
+
+
+class WorkerJob:
+    """Handle to a spider job running on a warm worker"""
+
+    def __init__(self, worker: "WarmWorker", on_log: Optional[LineHandler] = None):
+        self.id = str(uuid.uuid4())
+        self.worker = worker
+        self.on_log = on_log
+        self.stopped = False
+        self.interrupted = False
+        # Set when the worker lost the lease of the execution and another one runs it now
+        self.lease_lost = False
+        # Whether the run keeps its crawl state in a JOBDIR, so it can be paused
+        self.pausable = False
+        self.result: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def wait(self) -> int:
+        """Wait for the job to finish and return 0 on success, like a process exit code"""
+        result = await self.result
+        return 0 if result.get("status") == "finished" else 1
+
+    async def interrupt(self):
+        """Ask the worker to shut the crawl down gracefully, keeping the worker alive"""
+        if self.interrupted or self.result.done():
+            return
+        self.interrupted = True
+        await self.worker.process.write_line(json.dumps({"command": "shutdown", "job_id": self.id}))
+
+    async def terminate(self, timeout: float = 5.0) -> int:
+        """Stop the job by terminating the worker running it"""
+        self.stopped = True
+        await self.worker.process.terminate(timeout=timeout)
+        return await self.wait()
+
+
+class WarmWorker:
+    """A long-lived worker process that has already imported Scrapy"""
+
+    def __init__(self, pool: "ScrapyWorkerPool"):
+        self.pool = pool
+        self.loop = asyncio.get_running_loop()
+        self.ready = asyncio.Event()
+        self.job: Optional[WorkerJob] = None
+        self.recycle = False
+        self.was_ready = False
+        self.process = SpiderProcess(
+            [sys.executable, WORKER_SCRIPT],
+            on_stdout=self._on_stdout,
+            on_stderr=self._on_log,
+            stdin=True
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None and not self.recycle
+
+    async def start(self) -> "WarmWorker":
+        """Start the worker process and wait until it reports it is ready"""
+        await self.process.start()
+        self.pool._background(self._watch())
+        await self.ready.wait()
+        if not self.was_ready:
+            raise RuntimeError(f"Scrapy worker exited with code {self.process.returncode} during startup")
+        return self
+
+    async def run(self, job: WorkerJob, code: Optional[str], path: Optional[str], settings: Dict[str, Any]):
+        """Send a job to the worker"""
+        self.job = job
+        await self.process.write_line(json.dumps({
+            "job_id": job.id,
+            "code": code,
+            "path": path,
+            "filename": f"<spider {job.id}>",
+            "settings": settings
+        }))
+
+    async def _on_stdout(self, line: str):
+        if not line.startswith(EVENT_PREFIX):
+            await self._on_log(line)
+            return
+
+        event = json.loads(line[len(EVENT_PREFIX):])
+        if event["event"] == "ready":
+            self.was_ready = True
+            self.ready.set()
+        elif event["event"] == "finished" and self.job and event["job_id"] == self.job.id:
+            self.recycle = event.get("recycle", False)
+            job, self.job = self.job, None
+            job.result.set_result(event)
+            self.pool._release(self)
+
+    async def _on_log(self, line: str):
+        if self.job and self.job.on_log:
+            await self.job.on_log(line)
+
+    async def _watch(self):
+        """Fail the current job if the worker process exits while running it"""
+        return_code = await self.process.wait()
+        self.ready.set()
+        if self.job and not self.job.result.done():
+            self.job.result.set_result({"status": "error", "error": f"Worker exited with code {return_code}"})
+        self.job = None
+        self.pool._discard(self)
+
+
+class ScrapyWorkerPool:
+    """
+    Keep a number of pre-started Scrapy worker processes ready for spider runs.
+
+    The pool does not limit concurrency (that is the scheduler's job): when no warm
+    worker is idle a new one is started on demand. After every job the worker goes
+    back to the idle set unless it asked to be recycled or the pool is already full,
+    and a replacement is started in the background to keep the pool warm.
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = SCRAPY_WORKER_POOL_SIZE if size is None else size
+        self.idle: List[WarmWorker] = []
+        self.workers: Set[WarmWorker] = set()
+        self._warming = 0
+        self._closed = False
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self):
+        """Start the configured number of warm workers"""
+        self._closed = False
+        await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+
+    async def close(self):
+        """Terminate all workers"""
+        self._closed = True
+        await asyncio.gather(
+            *(worker.process.terminate() for worker in list(self.workers)),
+            return_exceptions=True
+        )
+        self.idle.clear()
+
+    async def submit(self, code: Optional[str] = None, settings: Optional[Dict[str, Any]] = None,
+                     on_log: Optional[LineHandler] = None, path: Optional[str] = None) -> WorkerJob:
+        """
+        Run a spider on a warm worker and return a handle to the job.
+        The spider is given either as source code or as the path of a cached module.
+        """
+        worker = await self._acquire()
+        job = WorkerJob(worker, on_log=on_log)
+        await worker.run(job, code, path, settings or {})
+        self._replenish()
+        return job
+
+    async def _acquire(self) -> WarmWorker:
+        loop = asyncio.get_running_loop()
+        while self.idle:
+            worker = self.idle.pop()
+            # Workers bound to another event loop (or already gone) cannot be used
+            if worker.alive and worker.loop is loop:
+                return worker
+        return await self._start_worker()
+
+    async def _start_worker(self) -> WarmWorker:
+        worker = WarmWorker(self)
+        self.workers.add(worker)
+        return await worker.start()
+
+    async def _spawn(self):
+        """Start a worker and add it to the idle set"""
+        self._warming += 1
+        try:
+            worker = await self._start_worker()
+            if worker.alive and len(self.idle) < self.size:
+                self.idle.append(worker)
+            elif worker.alive:
+                await worker.process.close_stdin()
+        except Exception as e:
+            # Workers still starting up are terminated when the pool closes
+            if not self._closed:
+                logger.exception(f"Error starting Scrapy worker: {str(e)}")
+        finally:
+            self._warming -= 1
+
+    def _background(self, coro):
+        """Run a coroutine as a task, keeping a reference until it is done"""
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _replenish(self):
+        """Start workers in the background until the pool is full again"""
+        missing = self.size - len(self.idle) - self._warming
+        for _ in range(max(0, missing) if not self._closed else 0):
+            self._background(self._spawn())
+
+    def _release(self, worker: WarmWorker):
+        """Return a worker to the idle set after a job"""
+        if worker.alive and not self._closed and len(self.idle) < self.size:
+            self.idle.append(worker)
+        elif worker.alive:
+            self._background(worker.process.close_stdin())
+
+    def _discard(self, worker: WarmWorker):
+        """Forget a worker whose process has exited"""
+        self.workers.discard(worker)
+        if worker in self.idle:
+            self.idle.remove(worker)
+        # Do not respawn workers that could not even start, or we would loop forever
+        if worker.was_ready:
+            self._replenish()
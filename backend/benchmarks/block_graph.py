@@ -0,0 +1,150 @@
+"""
+Micro-benchmark of generated spider callbacks on a synthetic large page.
+
+Usage (from the backend directory):
+    python -m benchmarks.block_graph [--items 5000] [--extra-blocks 200] [--repeat 5]
+
+Compares the compiled block graph against the previous generator, which embedded
+the whole block map as a literal in a recursive `process_block` method. Unused
+extra blocks grow the block map without changing the work per element.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from scrapy.http import HtmlResponse
+
+from app.services.block_compiler import normalize_blocks, starting_block_ids
+from app.services.spider_service import SpiderService
+
+# The per-element interpreter produced before the block graph compiler
+LEGACY_TEMPLATE = """
+import scrapy
+from datetime import datetime
+
+class LegacySpider(scrapy.Spider):
+    name = 'legacy'
+
+    def parse(self, response):
+        for starting_block_id in {starting}:
+            yield from self.process_block(response, starting_block_id)
+
+    def process_block(self, response, block_id):
+        block_mapping = {block_map}
+        block = block_mapping.get(block_id)
+        if not block:
+            return
+        block_type = block.get('type')
+        params = block.get('params', {{}})
+        if block_type == 'Selector':
+            selector_type = params.get('selector_type', 'css')
+            selector = params.get('selector', '')
+            if selector_type == 'css':
+                elements = response.css(selector)
+            else:
+                elements = response.xpath(selector)
+            for element in elements:
+                if 'next' in params:
+                    next_blocks = params['next']
+                    if isinstance(next_blocks, list):
+                        for next_id in next_blocks:
+                            yield from self.process_block(element, next_id)
+                    elif isinstance(next_blocks, str):
+                        yield from self.process_block(element, next_blocks)
+        elif block_type == 'Processor':
+            processor_type = params.get('processor_type', 'extract')
+            if processor_type == 'regular_expression':
+                import re
+                pattern = params.get('pattern', '')
+                text = response.get() if hasattr(response, 'get') else response.extract()
+                match = re.search(pattern, text)
+                data = match.group(1) if match else None
+            else:
+                data = response.get() if hasattr(response, 'get') else response.extract()
+            if 'next' in params:
+                next_blocks = params['next']
+                if isinstance(next_blocks, list):
+                    for next_id in next_blocks:
+                        yield from self.process_block(data, next_id)
+                elif isinstance(next_blocks, str):
+                    yield from self.process_block(data, next_blocks)
+        elif block_type == 'Output':
+            field_name = params.get('field_name', 'data')
+            item = {{}}
+            if isinstance(response, str):
+                item[field_name] = response
+            else:
+                item[field_name] = response.get() if hasattr(response, 'get') else response.extract()
+            item['timestamp'] = datetime.now().isoformat()
+            item['url'] = getattr(response, 'url', None)
+            yield item
+"""
+
+
+def make_blocks(extra_blocks: int):
+    blocks = [
+        {"id": "rows", "type": "Selector", "params": {"selector_type": "css", "selector": "li.product", "next": ["name", "price"]}},
+        {"id": "name", "type": "Selector", "params": {"selector_type": "css", "selector": "b::text", "next": "name_out"}},
+        {"id": "name_out", "type": "Output", "params": {"field_name": "name"}},
+        {"id": "price", "type": "Processor", "params": {"processor_type": "regular_expression", "pattern": r"(\d+) EUR", "next": "price_out"}},
+        {"id": "price_out", "type": "Output", "params": {"field_name": "price"}},
+    ]
+    # Unreachable ring of blocks that only makes the block map bigger
+    for index in range(extra_blocks):
+        next_id = f"unused_{(index + 1) % extra_blocks}"
+        blocks.append({"id": f"unused_{index}", "type": "Processor", "params": {"processor_type": "extract", "next": next_id}})
+    return blocks
+
+
+def make_page(items: int) -> HtmlResponse:
+    rows = "".join(
+        f'<li class="product"><b>Product {index}</b> <span>{index % 97} EUR</span></li>'
+        for index in range(items)
+    )
+    body = f"<html><body><ul>{rows}</ul></body></html>".encode()
+    return HtmlResponse(url="https://example.com/catalog", body=body, encoding="utf-8")
+
+
+def build_spider(code: str, class_name: str):
+    namespace = {}
+    exec(compile(code, f"<{class_name}>", "exec"), namespace)
+    return namespace[class_name]()
+
+
+def timed(spider, response, repeat: int):
+    timings = []
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        count = sum(1 for _ in spider.parse(response))
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), count
+
+
+def main(items: int, extra_blocks: int, repeat: int):
+    blocks = make_blocks(extra_blocks)
+    response = make_page(items)
+    config = type("Config", (object,), {
+        "name": "bench", "start_urls": [response.url], "blocks": blocks, "settings": {}
+    })
+
+    compiled = build_spider(SpiderService()._generate_spider_code(config), "BenchSpider")
+    legacy = build_spider(LEGACY_TEMPLATE.format(
+        starting=starting_block_ids(normalize_blocks(blocks)),
+        block_map=json.dumps({block["id"]: block for block in blocks})
+    ), "LegacySpider")
+
+    print(f"{items} elements, {len(blocks)} blocks, median of {repeat} runs")
+    for label, spider in (("legacy process_block", legacy), ("compiled block graph", compiled)):
+        elapsed, count = timed(spider, response, repeat)
+        print(f"{label:<22} {elapsed * 1000:9.1f} ms   {count} items")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--extra-blocks", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.items, args.extra_blocks, args.repeat)
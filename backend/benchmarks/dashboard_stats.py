@@ -0,0 +1,92 @@
+"""
+Latency of the dashboard statistics as the execution history grows.
+
+Usage (from the backend directory):
+    python -m benchmarks.dashboard_stats [--sizes 10000,100000,1000000] [--repeat 20]
+
+Executions are added to a migrated SQLite database in a temporary directory
+until each size is reached. The statistics are then computed by scanning the
+spiders and executions, as GET /dashboard/stats did before, and by reading the
+dashboard counters.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.db.database import AsyncSessionLocal, SessionLocal, engine  # noqa: E402
+from app.db.init_db import migrate  # noqa: E402
+from app.models.models import Spider, SpiderExecution  # noqa: E402
+from app.services.dashboard_counters import get_dashboard_stats  # noqa: E402
+
+SPIDERS = 100
+STATUSES = ["finished"] * 8 + ["error", "stopped"]
+
+
+async def scan_stats(db):
+    spiders = list(await db.scalars(select(Spider)))
+    return {
+        "total_spiders": len(spiders),
+        "running_spiders": sum(1 for spider in spiders if spider.status == "running"),
+        "completed_jobs": await db.scalar(
+            select(func.count(SpiderExecution.id)).where(SpiderExecution.status == "finished")
+        ),
+        "total_items_scraped": await db.scalar(select(func.sum(SpiderExecution.items_scraped))) or 0,
+    }
+
+
+async def measure(compute, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            await compute(db)
+            timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+def grow(spider_ids, start: int, stop: int):
+    with engine.begin() as connection:
+        for batch in range(start, stop, 50000):
+            connection.execute(insert(SpiderExecution), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "spider_id": spider_ids[index % SPIDERS],
+                    "status": STATUSES[index % len(STATUSES)],
+                    "items_scraped": index % 500,
+                }
+                for index in range(batch, min(batch + 50000, stop))
+            ])
+
+
+def main(sizes, repeat: int):
+    migrate()
+    db = SessionLocal()
+    spiders = [Spider(name=f"bench_{index}", start_urls=[], blocks=[]) for index in range(SPIDERS)]
+    db.add_all(spiders)
+    db.commit()
+    spider_ids = [spider.id for spider in spiders]
+    db.close()
+
+    print(f"median of {repeat} requests")
+    size = 0
+    for target in sizes:
+        grow(spider_ids, size, target)
+        size = target
+        scan = asyncio.run(measure(scan_stats, repeat))
+        counters = asyncio.run(measure(get_dashboard_stats, repeat))
+        print(f"{size:>9} executions   scan {scan * 1000:8.2f} ms   counters {counters * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.repeat)
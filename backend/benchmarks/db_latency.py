@@ -0,0 +1,142 @@
+"""
+Load test of API reads while a crawl writes its progress.
+
+Usage (from the backend directory):
+    python -m benchmarks.db_latency [--readers 20] [--reads 100] [--write-interval 0.005] [--stats-kb 256]
+
+A writer records telemetry of a running execution in a loop, like run_spider
+does on every stats event, while concurrent readers fetch the spider and the
+execution. The latency of the reads and the lag of the event loop (how late a
+1 ms timer fires, i.e. how long every other request of the worker is stalled)
+are reported for the previous data layer, which used synchronous sessions inside
+`async def` methods, and for the async one. The benchmark uses its own SQLite
+database in a temporary directory.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import update  # noqa: E402
+
+from app.db.database import SessionLocal, engine  # noqa: E402
+from app.models.models import Base, Spider, SpiderExecution  # noqa: E402
+from app.services.spider_service import SpiderService  # noqa: E402
+
+
+class LegacyDataLayer:
+    """Blocking queries on the event loop, as the service made them before"""
+
+    async def get_spider(self, spider_id):
+        db = SessionLocal()
+        try:
+            return db.query(Spider).filter(Spider.id == spider_id).first()
+        finally:
+            db.close()
+
+    async def get_execution(self, execution_id):
+        db = SessionLocal()
+        try:
+            return db.query(SpiderExecution).filter(SpiderExecution.id == execution_id).first()
+        finally:
+            db.close()
+
+    async def _update_execution_stats(self, execution_id, items_scraped, stats):
+        db = SessionLocal()
+        try:
+            db.execute(update(SpiderExecution).where(SpiderExecution.id == execution_id).values(
+                items_scraped=items_scraped, stats=stats
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+
+def setup():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    spider = Spider(name="bench", start_urls=["https://example.com"], blocks=[], settings={})
+    db.add(spider)
+    db.flush()
+    execution = SpiderExecution(spider_id=spider.id, status="running")
+    db.add(execution)
+    db.commit()
+    ids = spider.id, execution.id
+    db.close()
+    return ids
+
+
+async def load(layer, spider_id: str, execution_id: str, readers: int, reads: int,
+               write_interval: float, stats_kb: int):
+    latencies = []
+    lags = []
+    writes = 0
+    done = asyncio.Event()
+
+    async def writer():
+        nonlocal writes
+        # Telemetry of a crawl with many distinct response codes, domains, etc.
+        padding = "x" * (stats_kb * 1024)
+        while not done.is_set():
+            stats = {"responses": {"200": writes}, "bytes": writes * 1024, "padding": padding}
+            await layer._update_execution_stats(execution_id, writes, stats)
+            writes += 1
+            await asyncio.sleep(write_interval)
+
+    async def monitor():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    async def reader():
+        for index in range(reads):
+            started = time.perf_counter()
+            if index % 2:
+                await layer.get_spider(spider_id)
+            else:
+                await layer.get_execution(execution_id)
+            latencies.append(time.perf_counter() - started)
+            # Clients poll rather than hammer the API
+            await asyncio.sleep(0.001)
+
+    started = time.perf_counter()
+    background = [asyncio.create_task(writer()), asyncio.create_task(monitor())]
+    await asyncio.gather(*(reader() for _ in range(readers)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await asyncio.gather(*background)
+    return latencies, lags, writes, elapsed
+
+
+def percentile(values, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main(readers: int, reads: int, write_interval: float, stats_kb: int):
+    spider_id, execution_id = setup()
+    print(f"{readers} readers x {reads} reads, a {stats_kb} KiB progress write every {write_interval * 1000:g} ms")
+    for label, layer in (("sync sessions", LegacyDataLayer()), ("async sessions", SpiderService())):
+        latencies, lags, writes, elapsed = asyncio.run(
+            load(layer, spider_id, execution_id, readers, reads, write_interval, stats_kb)
+        )
+        print(
+            f"{label:<15} reads p50 {percentile(latencies, 0.5) * 1000:7.2f} ms"
+            f"  p99 {percentile(latencies, 0.99) * 1000:7.2f} ms"
+            f"   loop lag p99 {percentile(lags, 0.99) * 1000:7.2f} ms  max {max(lags) * 1000:7.2f} ms"
+            f"   {len(latencies) / elapsed:6.0f} reads/s  {writes} writes"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--reads", type=int, default=100)
+    parser.add_argument("--write-interval", type=float, default=0.005)
+    parser.add_argument("--stats-kb", type=int, default=256)
+    args = parser.parse_args()
+    main(args.readers, args.reads, args.write_interval, args.stats_kb)
@@ -0,0 +1,120 @@
+"""
+Mixed read/write throughput of the database engine profiles.
+
+Usage (from the backend directory):
+    python -m benchmarks.db_profiles [--url URL] [--readers 8] [--writers 4] [--seconds 5]
+
+Reader threads poll the dashboard queries while writer threads record the
+progress of running executions and start new ones, as the API and the worker
+agents do during crawls. Each profile runs against a fresh database: by
+default a SQLite file in a temporary directory, otherwise the given URL (its
+tables are created and dropped). Operations per second and failed operations
+(e.g. "database is locked") are reported for SQLAlchemy's defaults and for the
+profile of the database.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import create_database_engine, database_profile
+from app.models.models import Base, Spider, SpiderExecution
+
+SEED_EXECUTIONS = 2000
+
+
+def setup(engine):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        spider = Spider(name="bench", start_urls=["https://example.com"], blocks=[], settings={})
+        db.add(spider)
+        db.flush()
+        db.add_all(
+            SpiderExecution(spider_id=spider.id, status="completed", items_scraped=index)
+            for index in range(SEED_EXECUTIONS)
+        )
+        db.commit()
+        return Session, spider.id
+
+
+def run(engine, readers: int, writers: int, seconds: float):
+    Session, spider_id = setup(engine)
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+
+    def reader():
+        while time.perf_counter() < deadline:
+            try:
+                with Session() as db:
+                    db.scalar(select(func.count(SpiderExecution.id)))
+                    db.scalar(select(func.sum(SpiderExecution.items_scraped)))
+                    db.scalars(
+                        select(SpiderExecution).order_by(SpiderExecution.started_at.desc()).limit(10)
+                    ).all()
+                count("reads")
+            except Exception:
+                count("errors")
+
+    def writer():
+        execution_id = None
+        progress = 0
+        while time.perf_counter() < deadline:
+            try:
+                with Session() as db:
+                    if execution_id is None or progress % 50 == 0:
+                        execution = SpiderExecution(spider_id=spider_id, status="running")
+                        db.add(execution)
+                        db.flush()
+                        execution_id = execution.id
+                    db.execute(update(SpiderExecution).where(SpiderExecution.id == execution_id).values(
+                        items_scraped=progress, stats={"responses": {"200": progress}}
+                    ))
+                    db.commit()
+                progress += 1
+                count("writes")
+            except Exception:
+                count("errors")
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+    return counts, elapsed
+
+
+def main(url, readers: int, writers: int, seconds: float):
+    print(f"{readers} reader and {writers} writer threads for {seconds:g} s")
+    for profile in ("default", database_profile(url or "sqlite://")):
+        database_url = url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+        counts, elapsed = run(create_database_engine(database_url, profile), readers, writers, seconds)
+        print(
+            f"{profile:<11} {counts['reads'] / elapsed:8.0f} reads/s"
+            f"   {counts['writes'] / elapsed:8.0f} writes/s   {counts['errors']} failed"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="database to run against instead of a temporary SQLite file")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    main(args.url, args.readers, args.writers, args.seconds)
@@ -0,0 +1,108 @@
+"""
+Latency of a spider's execution listing as its history grows.
+
+Usage (from the backend directory):
+    python -m benchmarks.execution_listing [--sizes 1000,100000,1000000] [--repeat 10]
+
+Executions of one spider are added to a migrated SQLite database in a
+temporary directory until each size is reached. The whole history with every
+column, as GET /spiders/{id}/executions returned it before, is compared with
+the first keyset page of 100 summaries and with a page from the middle of the
+history.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+import uuid
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from sqlalchemy import insert, select  # noqa: E402
+
+from app.db.database import AsyncSessionLocal, SessionLocal, engine  # noqa: E402
+from app.db.init_db import migrate  # noqa: E402
+from app.models.models import Spider, SpiderExecution  # noqa: E402
+from app.services.pagination import encode_cursor  # noqa: E402
+from app.services.spider_service import SpiderService  # noqa: E402
+
+# The full history is only loaded up to this size
+FULL_LISTING_LIMIT = 100000
+
+STATS = {"downloader/request_count": 120, "item_scraped_count": 100, "log_count/INFO": 40,
+         "response_received_count": 120, "http_cache": {"hits": 10, "misses": 110}}
+
+
+async def full_listing(spider_id: str):
+    async with AsyncSessionLocal() as db:
+        executions = await db.scalars(
+            select(SpiderExecution).where(SpiderExecution.spider_id == spider_id)
+            .order_by(SpiderExecution.created_at.desc())
+        )
+        return [SpiderService._serialize_execution(execution) for execution in executions]
+
+
+def median(timings):
+    return sorted(timings)[len(timings) // 2]
+
+
+async def measure(call, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - started)
+    return median(timings)
+
+
+def grow(spider_id: str, start: int, stop: int, first: datetime.datetime):
+    with engine.begin() as connection:
+        for batch in range(start, stop, 50000):
+            connection.execute(insert(SpiderExecution), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "spider_id": spider_id,
+                    "status": "finished",
+                    "created_at": first + datetime.timedelta(seconds=index),
+                    "started_at": first + datetime.timedelta(seconds=index),
+                    "items_scraped": 100,
+                    "stats": STATS,
+                }
+                for index in range(batch, min(batch + 50000, stop))
+            ])
+
+
+def main(sizes, repeat: int):
+    migrate()
+    db = SessionLocal()
+    spider = Spider(name="bench", start_urls=[], blocks=[])
+    db.add(spider)
+    db.commit()
+    spider_id = spider.id
+    db.close()
+
+    service = SpiderService()
+    first = datetime.datetime(2020, 1, 1)
+    print(f"median of {repeat} requests")
+    size = 0
+    for target in sizes:
+        grow(spider_id, size, target, first)
+        size = target
+        middle = encode_cursor(first + datetime.timedelta(seconds=size // 2), "")
+        first_page = asyncio.run(measure(lambda: service.get_spider_executions(spider_id, 100), repeat))
+        middle_page = asyncio.run(measure(lambda: service.get_spider_executions(spider_id, 100, middle), repeat))
+        line = f"{size:>9} executions   first page {first_page * 1000:6.2f} ms   middle page {middle_page * 1000:6.2f} ms"
+        if size <= FULL_LISTING_LIMIT:
+            full = asyncio.run(measure(lambda: full_listing(spider_id), max(1, repeat // 5)))
+            line += f"   full history {full * 1000:9.2f} ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(",")], args.repeat)
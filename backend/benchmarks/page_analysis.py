@@ -0,0 +1,72 @@
+"""
+Benchmark of URL analysis on a synthetic multi-megabyte page.
+
+Usage (from the backend directory):
+    python -m benchmarks.page_analysis [--rows 20000] [--repeat 3]
+
+Compares the single lxml pass of `analyze_dom` against the previous analysis,
+which parsed the page with BeautifulSoup's html.parser and ran one `find_all`
+per element type.
+"""
+import argparse
+import statistics
+import time
+
+from app.services.page_analysis import analyze_dom, parse_html
+
+LEGACY_ELEMENT_TYPES = {
+    'links': {'tag': 'a', 'attribute': 'href'},
+    'images': {'tag': 'img', 'attribute': 'src'},
+    'text_blocks': {'tag': ['p', 'div', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6']},
+    'lists': {'tag': ['ul', 'ol']},
+    'tables': {'tag': 'table'}
+}
+
+
+def legacy_analysis(body: bytes):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(body.decode("utf-8"), 'html.parser')
+    selectors = []
+    for element_type, config in LEGACY_ELEMENT_TYPES.items():
+        elements = soup.find_all(config['tag'])
+        if elements:
+            if 'attribute' in config:
+                samples = [e.get(config['attribute']) for e in elements[:3] if e.get(config['attribute'])]
+            else:
+                samples = [e.get_text().strip() for e in elements[:3] if e.get_text().strip()]
+            selectors.append((element_type, len(elements), samples))
+    return selectors
+
+
+def single_pass_analysis(body: bytes):
+    return analyze_dom(parse_html(body, "utf-8"))["selectors"]
+
+
+def make_page(rows: int) -> bytes:
+    items = "".join(
+        f'<div class="card row-{index % 7}"><h2>Item {index}</h2><p class="price">{index % 97} EUR</p>'
+        f'<a href="/item/{index}">details</a><img src="/img/{index}.png"><span>note</span></div>'
+        for index in range(rows)
+    )
+    return f"<html><head><title>Catalog</title></head><body><ul><li>x</li></ul>{items}</body></html>".encode()
+
+
+def main(rows: int, repeat: int):
+    body = make_page(rows)
+    print(f"{len(body) / 1024 / 1024:.1f} MiB page, median of {repeat} runs")
+    for label, analysis in (("html.parser + find_all", legacy_analysis), ("lxml single pass", single_pass_analysis)):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            selectors = analysis(body)
+            timings.append(time.perf_counter() - started)
+        print(f"{label:<24} {statistics.median(timings) * 1000:9.1f} ms   {len(selectors)} selectors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,124 @@
+"""
+Benchmark time-to-first-request of warm Scrapy workers against `scrapy runspider`.
+
+Usage (from the backend directory):
+    python -m benchmarks.worker_startup [--runs 5]
+
+A local HTTP server records when the first request of each run arrives; the time
+is measured from the moment the run is submitted.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from app.services.spider_runner import SpiderProcess
+from app.services.worker_pool import ScrapyWorkerPool
+
+SPIDER_CODE = """
+import scrapy
+
+class BenchSpider(scrapy.Spider):
+    name = 'bench'
+    start_urls = ['{url}']
+    custom_settings = {{'LOG_LEVEL': 'WARNING'}}
+
+    def parse(self, response):
+        yield {{'title': response.css('title::text').get()}}
+"""
+
+
+class FirstRequestServer:
+    """HTTP server that records the arrival time of every request"""
+
+    def __init__(self):
+        hits = self.hits = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(time.perf_counter())
+                body = b"<html><head><title>bench</title></head></html>"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    async def wait_for_hit(self, count: int):
+        while len(self.hits) < count:
+            await asyncio.sleep(0.001)
+        return self.hits[count - 1]
+
+
+async def bench_subprocess(server: FirstRequestServer, code: str, runs: int):
+    """Cold start: one `scrapy runspider` process per run"""
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as spider_file:
+        spider_file.write(code)
+
+    timings = []
+    try:
+        for _ in range(runs):
+            expected = len(server.hits) + 1
+            started = time.perf_counter()
+            process = SpiderProcess(["scrapy", "runspider", spider_file.name])
+            await process.start()
+            timings.append(await server.wait_for_hit(expected) - started)
+            await process.wait()
+    finally:
+        os.unlink(spider_file.name)
+    return timings
+
+
+async def bench_pool(server: FirstRequestServer, code: str, runs: int):
+    """Warm start: jobs submitted to pre-started workers"""
+    pool = ScrapyWorkerPool(size=1)
+    await pool.start()
+
+    timings = []
+    try:
+        for _ in range(runs):
+            # Let the pool refill so every run finds a warm worker
+            while not pool.idle:
+                await asyncio.sleep(0.01)
+            expected = len(server.hits) + 1
+            started = time.perf_counter()
+            job = await pool.submit(code)
+            timings.append(await server.wait_for_hit(expected) - started)
+            await job.wait()
+    finally:
+        await pool.close()
+    return timings
+
+
+def report(label: str, timings):
+    print(f"{label:<22} median {statistics.median(timings) * 1000:8.1f} ms"
+          f"   min {min(timings) * 1000:8.1f} ms   max {max(timings) * 1000:8.1f} ms")
+
+
+async def main(runs: int):
+    server = FirstRequestServer()
+    code = SPIDER_CODE.format(url=server.url)
+
+    print(f"Time to first request over {runs} runs")
+    report("scrapy runspider", await bench_subprocess(server, code, runs))
+    report("warm worker pool", await bench_pool(server, code, runs))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(main(parser.parse_args().runs))
@@ -1,4 +1,5 @@
 import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.db.init_db import init_db
@@ -6,11 +7,29 @@ from app.db.init_db import init_db
 # Initialize database on startup
 init_db()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.api.api_v1.endpoints.spiders import scheduler, worker_pool, spider_service
+    # Pre-start warm Scrapy workers
+    if worker_pool is not None:
+        await worker_pool.start()
+    # Connection pool for the pages the API fetches itself, and processes parsing them
+    await spider_service.http_client.start()
+    spider_service.parse_pool.start()
+    # Pick up executions left in the persistent queue by a previous run
+    await scheduler.resume()
+    yield
+    await spider_service.http_client.close()
+    spider_service.parse_pool.close()
+    if worker_pool is not None:
+        await worker_pool.close()
+
 # Create FastAPI app instance
 app = FastAPI(
     title="BirdScrapyd",
     description="A modern web-based tool for configuring, visually creating, and orchestrating Scrapy spiders",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -20,6 +39,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets browsers read the cursor of the next page of listings
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Import and include API routers
@@ -175,6 +175,16 @@ def test_validate_spider():
     assert response.status_code == 200, f"Failed to validate valid spider: {response.text}"
     data = response.json()
     assert data["valid"] is True
+    assert data["cost"]["paths"] == 1 and data["cost"]["max_selector_depth"] == 1
+    assert data["warnings"] == []
+
+    # A half-built branch is reported but the configuration stays valid
+    draft_spider = json.loads(json.dumps(test_spider))
+    draft_spider["blocks"].append({"id": "draft", "type": "Processor", "params": {"processor_type": "extract"}})
+    data = client.post("/api/v1/spiders/validate", json=draft_spider).json()
+    assert data["valid"] is True and data["warnings"] == [
+        "Blocks not reachable from a starting Selector: draft", "Blocks with no path to an Output: draft"
+    ]
 
     # Test with invalid spider (missing required field)
     invalid_spider = test_spider.copy()
@@ -182,3 +192,415 @@ def test_validate_spider():
     response = client.post("/api/v1/spiders/validate", json=invalid_spider)
     # It could be either 400 or 422 depending on whether FastAPI or our custom validation catches it
     assert response.status_code in [400, 422], f"Expected error status code, got {response.status_code}"
+
+def test_queue_stats():
+    """Test the execution queue statistics endpoint"""
+    response = client.get("/api/v1/executions/queue")
+    assert response.status_code == 200
+    data = response.json()
+    for key in ["queued", "active_workers", "max_concurrent", "longest_wait_seconds", "average_wait_seconds"]:
+        assert key in data
+
+def test_execution_items(db_setup, create_test_spider, tmp_path, monkeypatch):
+    """Test paging, tailing and following the items of an execution"""
+    from app.api.api_v1.endpoints.spiders import spider_service
+    from app.services.item_store import ItemStore
+    from app.services.scrapy_item_store import ItemStorePipeline
+
+    monkeypatch.setattr(spider_service, "item_store", ItemStore(str(tmp_path)))
+    execution = SpiderExecution(spider_id=create_test_spider, status="finished")
+    db_setup.add(execution)
+    db_setup.commit()
+
+    pipeline = ItemStorePipeline(spider_service.item_store.pipeline_settings(execution.id)["ITEM_STORE_PATH"])
+    pipeline.open_spider(None)
+    for i in range(30):
+        pipeline.process_item({"n": i}, None)
+    pipeline.close_spider(None)
+
+    response = client.get(f"/api/v1/executions/{execution.id}/items?offset=10&limit=5")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 30 and data["next_offset"] == 15
+    assert [item["n"] for item in data["items"]] == [10, 11, 12, 13, 14]
+
+    data = client.get(f"/api/v1/executions/{execution.id}/items?tail=3").json()
+    assert data["offset"] == 27 and [item["n"] for item in data["items"]] == [27, 28, 29]
+
+    # Following a finished execution streams the remaining items and ends
+    response = client.get(f"/api/v1/executions/{execution.id}/items?offset=25&follow=true")
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["n"] for line in response.text.splitlines()] == [25, 26, 27, 28, 29]
+
+    assert client.get("/api/v1/executions/missing/items").status_code == 404
+
+def test_execution_items_query(db_setup, create_test_spider, tmp_path, monkeypatch):
+    """Test server-side projection, filters and aggregates over execution items"""
+    from app.api.api_v1.endpoints.spiders import spider_service
+    from app.services.item_store import ItemStore
+    from app.services.scrapy_item_store import ItemStorePipeline
+
+    monkeypatch.setattr(spider_service, "item_store", ItemStore(str(tmp_path)))
+    execution = SpiderExecution(spider_id=create_test_spider, status="finished")
+    db_setup.add(execution)
+    db_setup.commit()
+
+    pipeline = ItemStorePipeline(spider_service.item_store.pipeline_settings(execution.id)["ITEM_STORE_PATH"])
+    pipeline.open_spider(None)
+    for i in range(20):
+        pipeline.process_item({"category": "even" if i % 2 == 0 else "odd", "price": i}, None)
+    pipeline.close_spider(None)
+
+    url = f"/api/v1/executions/{execution.id}/items/query"
+    response = client.post(url, json={
+        "filters": [{"column": "price", "op": "ge", "value": 10}],
+        "group_by": ["category"],
+        "aggregates": [{"function": "count"}, {"function": "sum", "column": "price"}]
+    })
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["scanned_rows"] == 20
+    rows = {row["category"]: row for row in data["rows"]}
+    assert rows["even"]["count_all"] == 5 and rows["even"]["price_sum"] == 70
+    assert rows["odd"]["count_all"] == 5 and rows["odd"]["price_sum"] == 75
+
+    data = client.post(url, json={"aggregates": [{"function": "distinct", "column": "category"}]}).json()
+    assert sorted(data["rows"][0]["category_distinct"]) == ["even", "odd"]
+
+    data = client.post(url, json={
+        "columns": ["price"], "filters": [{"column": "category", "op": "in", "value": ["odd"]}], "limit": 3
+    }).json()
+    assert data["rows"] == [{"price": 1}, {"price": 3}, {"price": 5}]
+
+    # The conversion is recorded in the execution's stats
+    columnar = client.get(f"/api/v1/executions/{execution.id}").json()["stats"]["columnar"]
+    assert columnar["rows"] == 20 and columnar["columns"] == {"category": "string", "price": "int64"}
+
+    assert client.post(url, json={"columns": ["missing"]}).status_code == 400
+    assert client.post(url, json={"aggregates": [{"function": "median", "column": "price"}]}).status_code == 422
+
+    response = client.get(f"/api/v1/executions/{execution.id}/items.parquet")
+    assert response.status_code == 200 and response.content.startswith(b"PAR1")
+
+def test_execution_log(db_setup, create_test_spider, tmp_path, monkeypatch):
+    """Test reading ranges and the tail of an execution log"""
+    from app.api.api_v1.endpoints.spiders import spider_service
+    from app.services.log_store import LogStore
+
+    monkeypatch.setattr(spider_service, "log_store", LogStore(str(tmp_path)))
+    execution = SpiderExecution(spider_id=create_test_spider, status="running")
+    db_setup.add(execution)
+    db_setup.commit()
+
+    log = spider_service.log_store.open(execution.id)
+    for i in range(50):
+        log.write(f"line {i}")
+    log.close()
+
+    data = client.get(f"/api/v1/executions/{execution.id}/log?offset=10&limit=3").json()
+    assert data["total_lines"] == 50 and data["next_offset"] == 13
+    assert data["lines"] == ["line 10", "line 11", "line 12"]
+
+    data = client.get(f"/api/v1/executions/{execution.id}/log?tail=2").json()
+    assert data["offset"] == 48 and data["lines"] == ["line 48", "line 49"]
+
+    assert client.get("/api/v1/executions/missing/log").status_code == 404
+
+def test_http_cache_purge(tmp_path, monkeypatch):
+    """Test reading the size of a spider's HTTP cache and purging it"""
+    from app.api.api_v1.endpoints.spiders import spider_service
+    from app.services.http_cache import HttpCache
+
+    cached_spider = test_spider.copy()
+    cached_spider["name"] = f"cached_test_spider_{int(time.time())}"
+    spider_id = client.post("/api/v1/spiders/", json=cached_spider).json()["id"]
+
+    monkeypatch.setattr(spider_service, "http_cache", HttpCache(str(tmp_path)))
+    directory = tmp_path / spider_id
+    directory.mkdir()
+    (directory / "page.cache").write_bytes(b"x" * 10)
+
+    data = client.get(f"/api/v1/spiders/{spider_id}/http-cache").json()
+    assert data == {"spider_id": spider_id, "entries": 1, "bytes": 10}
+
+    data = client.delete(f"/api/v1/spiders/{spider_id}/http-cache").json()
+    assert data["success"] and data["purged"] == {"entries": 1, "bytes": 10}
+    assert not directory.exists()
+
+    assert client.delete("/api/v1/spiders/missing/http-cache").status_code == 404
+    client.delete(f"/api/v1/spiders/{spider_id}")
+
+def test_preview_spider():
+    """Test dry running a spider configuration against an HTML snapshot"""
+    preview_spider = json.loads(json.dumps(test_spider))
+    preview_spider["blocks"][0]["params"]["selector"] = "h1::text"
+    html = "<html><body><h1>First</h1><h1>Second</h1><h1>Third</h1></body></html>"
+    response = client.post("/api/v1/spiders/preview", json={"config": preview_spider, "html": html, "limit": 2})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert [item["title"] for item in data["items"]] == ["First", "Second"]
+    assert data["item_count"] == 2 and data["limit_reached"] is True
+    blocks = {block["id"]: block for block in data["blocks"]}
+    assert blocks["block1"]["inputs"] == 1 and blocks["block1"]["outputs"] == 3
+    assert blocks["block3"]["outputs"] == 2
+    assert all(block["ms"] >= 0 for block in data["blocks"])
+
+    # Regex processors behave like in the generated spider
+    regex_spider = json.loads(json.dumps(preview_spider))
+    regex_spider["blocks"][1]["params"] = {
+        "processor_type": "regular_expression", "pattern": r"[A-Z]\w", "regex_mode": "all", "next": "block3"
+    }
+    data = client.post("/api/v1/spiders/preview", json={"config": regex_spider, "html": "<h1>Ab Cd</h1>"}).json()
+    assert [item["title"] for item in data["items"]] == ["Ab", "Cd"] and data["limit_reached"] is False
+
+    # Blocks with several parents run as methods of the compiled spider
+    fan_in_spider = json.loads(json.dumps(preview_spider))
+    fan_in_spider["blocks"].insert(0, {
+        "id": "block0", "type": "Selector", "params": {"selector_type": "css", "selector": "h2::text", "next": "block2"}
+    })
+    data = client.post("/api/v1/spiders/preview", json={"config": fan_in_spider, "html": html.replace("</body>", "<h2>Fourth</h2></body>")}).json()
+    assert sorted(item["title"] for item in data["items"]) == ["First", "Fourth", "Second", "Third"]
+    blocks = {block["id"]: block for block in data["blocks"]}
+    assert blocks["block2"]["inputs"] == 4 and blocks["block3"]["outputs"] == 4
+
+    invalid_spider = json.loads(json.dumps(preview_spider))
+    invalid_spider["blocks"][2]["type"] = "Unknown"
+    response = client.post("/api/v1/spiders/preview", json={"config": invalid_spider, "html": html})
+    assert response.status_code == 400
+
+def test_sqlite_engine_profile(tmp_path):
+    """Test the pragmas and pool of the SQLite engine profile"""
+    from sqlalchemy import text
+    from app.db.database import create_database_engine, database_profile, engine_options
+
+    url = f"sqlite:///{tmp_path / 'profile.db'}"
+    profiled = create_database_engine(url)
+    with profiled.connect() as connection:
+        pragmas = [connection.execute(text(f"PRAGMA {name}")).scalar()
+                   for name in ("journal_mode", "synchronous", "busy_timeout")]
+    assert pragmas == ["wal", 1, 15000]
+    assert profiled.pool.size() == 10
+    profiled.dispose()
+
+    with create_database_engine(url, "default").connect() as connection:
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 2
+
+    assert database_profile("postgresql://user@localhost/db") == "postgresql"
+    assert engine_options("postgresql://user@localhost/db")["pool_pre_ping"] is True
+    with pytest.raises(ValueError):
+        database_profile(url, "postgresql")
+
+def test_migrate_upgrades_databases_without_queue_columns(tmp_path):
+    """Test that databases built by create_all before and during the queue changes are upgraded in place"""
+    import datetime
+    from sqlalchemy import create_engine, inspect, select, text
+    from sqlalchemy.orm import Session
+    from app.db.init_db import migrate
+
+    for name, columns in (("before", []), ("during", ["priority INTEGER", "queued_at DATETIME"])):
+        built = create_engine(f"sqlite:///{tmp_path / (name + '.db')}")
+        # The schema of create_all before the scheduler, with the columns an
+        # intermediate version may have added, and no Alembic version table
+        migrate(built, "0001")
+        with built.begin() as connection:
+            connection.execute(text("DROP TABLE alembic_version"))
+            for column in columns:
+                connection.execute(text(f"ALTER TABLE spider_executions ADD COLUMN {column}"))
+            connection.execute(text("INSERT INTO spiders (id, name, start_urls, blocks) VALUES ('s', 'old', '[]', '[]')"))
+            connection.execute(text(
+                "INSERT INTO spider_executions (id, spider_id, status, started_at) "
+                "VALUES ('e', 's', 'finished', '2024-01-01 00:00:00')"
+            ))
+
+        migrate(built)
+        existing = {column["name"] for column in inspect(built).get_columns("spider_executions")}
+        assert {"priority", "queued_at", "worker_id", "lease_expires_at", "attempts", "created_at"} <= existing
+        with Session(built) as db:
+            execution = db.scalar(select(SpiderExecution))
+            assert execution.id == "e" and execution.created_at == datetime.datetime(2024, 1, 1)
+        built.dispose()
+
+def test_execution_query_plans(tmp_path):
+    """Test that the migrated indexes serve the execution queries on a large table"""
+    import datetime
+    import uuid
+    from sqlalchemy import create_engine, func, insert, select, text, tuple_
+    from app.db.init_db import migrate
+
+    migrated = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    migrate(migrated)
+    statuses = ["finished"] * 90 + ["error"] * 5 + ["queued"] * 3 + ["running"] * 2
+    spider_ids = [str(uuid.uuid4()) for _ in range(200)]
+    started = datetime.datetime(2024, 1, 1)
+    keyset = started + datetime.timedelta(days=30)
+    with migrated.begin() as connection:
+        connection.execute(insert(Spider), [
+            {"id": spider_id, "name": f"spider_{index}", "start_urls": [], "blocks": []}
+            for index, spider_id in enumerate(spider_ids)
+        ])
+        connection.execute(insert(SpiderExecution), [
+            {
+                "id": str(uuid.uuid4()),
+                "spider_id": spider_ids[index % len(spider_ids)],
+                "status": statuses[index % len(statuses)],
+                "priority": index % 3,
+                "created_at": started + datetime.timedelta(minutes=index // 2),
+                "started_at": started + datetime.timedelta(minutes=index // 2),
+                "worker_id": f"worker-{index % 10}",
+            }
+            for index in range(100000)
+        ])
+        connection.execute(text("ANALYZE"))
+
+    queries = [
+        ("ix_spider_executions_spider_id_created_at_id", select(SpiderExecution)
+            .where(SpiderExecution.spider_id == spider_ids[0])
+            .order_by(SpiderExecution.created_at.desc().nulls_last(), SpiderExecution.id.desc()).limit(100)),
+        # A later keyset page of the listing
+        ("ix_spider_executions_spider_id_created_at_id", select(SpiderExecution)
+            .where(SpiderExecution.spider_id == spider_ids[0],
+                   tuple_(SpiderExecution.created_at, SpiderExecution.id) < tuple_(keyset, "z"))
+            .order_by(SpiderExecution.created_at.desc().nulls_last(), SpiderExecution.id.desc()).limit(100)),
+        # The executions without a creation time that follow the last keyset page
+        ("ix_spider_executions_spider_id_created_at_id", select(SpiderExecution)
+            .where(SpiderExecution.spider_id == spider_ids[0], SpiderExecution.created_at.is_(None))
+            .order_by(SpiderExecution.id.desc()).limit(100)),
+        ("ix_spider_executions_spider_id_started_at_id", select(SpiderExecution.id)
+            .where(SpiderExecution.spider_id == spider_ids[0])
+            .order_by(SpiderExecution.started_at.desc()).limit(1)),
+        ("ix_spiders_created_at_id", select(Spider)
+            .where(tuple_(Spider.created_at, Spider.id) > tuple_(keyset, "z"))
+            .order_by(Spider.created_at.asc().nulls_first(), Spider.id).limit(100)),
+        ("ix_spider_executions_status_priority_queued_at", select(SpiderExecution.id)
+            .where(SpiderExecution.status == "queued")
+            .order_by(SpiderExecution.priority.desc(), SpiderExecution.queued_at.asc()).limit(1)),
+        ("ix_spider_executions_status_priority_queued_at", select(func.count(SpiderExecution.id))
+            .where(SpiderExecution.status == "running")),
+        ("ix_spider_executions_started_at", select(SpiderExecution)
+            .order_by(SpiderExecution.started_at.desc()).limit(10)),
+        ("ix_spider_executions_worker_id", select(SpiderExecution.id)
+            .where(SpiderExecution.worker_id == "worker-1")),
+    ]
+    with migrated.connect() as connection:
+        for index, query in queries:
+            sql = str(query.compile(migrated, compile_kwargs={"literal_binds": True}))
+            plan = " | ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+            assert index in plan, plan
+            assert "TEMP B-TREE" not in plan, plan
+    migrated.dispose()
+
+def test_dashboard_counters():
+    """Test that the dashboard counters follow execution changes and can be rebuilt"""
+    from sqlalchemy import func, update
+    from app.models import DashboardCounter
+
+    def recount():
+        db = SessionLocal()
+        try:
+            return {
+                "total_spiders": db.query(Spider).count(),
+                "running_spiders": db.query(Spider).filter(Spider.status == "running").count(),
+                "completed_jobs": db.query(SpiderExecution).filter(SpiderExecution.status == "finished").count(),
+                "total_items_scraped": db.query(func.sum(SpiderExecution.items_scraped)).scalar() or 0,
+            }
+        finally:
+            db.close()
+
+    counters_spider = dict(test_spider, name="counters_test_spider")
+    spider_id = client.post("/api/v1/spiders/", json=counters_spider).json()["id"]
+    db = SessionLocal()
+    try:
+        execution = SpiderExecution(spider_id=spider_id, status="running", items_scraped=0)
+        db.add(execution)
+        db.commit()
+        db.execute(update(SpiderExecution).where(SpiderExecution.id == execution.id).values(items_scraped=42))
+        db.execute(update(Spider).where(Spider.id == spider_id).values(status="running"))
+        db.commit()
+        stats = client.get("/api/v1/dashboard/stats").json()
+        assert stats == recount()
+
+        execution.status = "finished"
+        db.commit()
+        stats = client.get("/api/v1/dashboard/stats").json()
+        assert stats == recount() and stats["completed_jobs"] >= 1 and stats["total_items_scraped"] >= 42
+
+        # Counters that drifted are corrected by the rebuild
+        db.query(DashboardCounter).filter(DashboardCounter.name == "items_scraped").update({"value": -1})
+        db.commit()
+        data = client.post("/api/v1/dashboard/stats/rebuild").json()
+        assert data["corrected"]["items_scraped"]["counted"] == -1
+        assert data["stats"] == recount()
+        assert client.post("/api/v1/dashboard/stats/rebuild").json()["corrected"] == {}
+
+        db.delete(execution)
+        db.commit()
+    finally:
+        db.close()
+    client.delete(f"/api/v1/spiders/{spider_id}")
+    assert client.get("/api/v1/dashboard/stats").json() == recount()
+
+def test_listing_pagination():
+    """Test keyset pages and field projection of the spider and execution listings"""
+    import datetime
+
+    paged_spider = dict(test_spider, name="paged_test_spider")
+    spider_id = client.post("/api/v1/spiders/", json=paged_spider).json()["id"]
+    db = SessionLocal()
+    created = datetime.datetime(2024, 1, 1)
+    # Pairs of executions created at the same time are ordered by ID, and the
+    # executions without a creation time come last
+    db.add_all(
+        SpiderExecution(spider_id=spider_id, status="finished", items_scraped=index, stats={"index": index},
+                        created_at=created + datetime.timedelta(minutes=index // 2) if index < 22 else None)
+        for index in range(25)
+    )
+    db.commit()
+    executions = db.query(SpiderExecution).filter(SpiderExecution.spider_id == spider_id).all()
+    executions.sort(key=lambda execution: execution.id, reverse=True)
+    executions.sort(key=lambda execution: (execution.created_at is not None, execution.created_at or created),
+                    reverse=True)
+    expected = [execution.id for execution in executions]
+    newest = [{"id": execution.id, "stats": execution.stats} for execution in executions[:2]]
+    db.close()
+
+    url = f"/api/v1/spiders/{spider_id}/executions"
+    seen = []
+    cursor = None
+    while True:
+        response = client.get(url, params={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= 4 and all("stats" not in execution for execution in page)
+        seen += [execution["id"] for execution in page]
+        if len(seen) == 4:
+            # Claiming an execution again does not move it between pages
+            db = SessionLocal()
+            db.query(SpiderExecution).filter(SpiderExecution.id == expected[10]) \
+                .update({"started_at": datetime.datetime.now()})
+            db.commit()
+            db.close()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == expected
+
+    page = client.get(url, params={"limit": 2, "fields": "id,stats"}).json()
+    assert page == newest
+    assert client.get(url, params={"fields": "id,secret"}).status_code == 400
+    assert client.get(url, params={"cursor": "not-a-cursor"}).status_code == 400
+
+    spiders = client.get("/api/v1/spiders/").json()
+    listed = next(spider for spider in spiders if spider["id"] == spider_id)
+    assert set(listed) == {"id", "name", "status", "created_at", "updated_at"}
+    listed = client.get("/api/v1/spiders/", params={"fields": "id,blocks"}).json()
+    assert any(spider["id"] == spider_id and len(spider["blocks"]) == 3 for spider in listed)
+    first = client.get("/api/v1/spiders/", params={"limit": 1})
+    second = client.get("/api/v1/spiders/", params={"limit": 1, "cursor": first.headers.get("X-Next-Cursor", "")})
+    if len(spiders) > 1:
+        assert [spider["id"] for spider in first.json() + second.json()] == [spider["id"] for spider in spiders[:2]]
+
+    db = SessionLocal()
+    db.query(SpiderExecution).filter(SpiderExecution.spider_id == spider_id).delete()
+    db.commit()
+    db.close()
+    client.delete(f"/api/v1/spiders/{spider_id}")
@@ -5,13 +5,52 @@ from app.models.models import Base, Spider, SpiderExecution
 import os
 import json
 import time
+import sys
+import asyncio
+import threading
+import aiohttp
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
 from main import app
+from app.api.api_v1.endpoints import spiders as spiders_endpoint
 from app.services.spider_service import SpiderService
+from app.services.spider_runner import SpiderProcess
+from app.services.scheduler import SpiderScheduler
+from app.services.worker_pool import ScrapyWorkerPool
+from app.services import spider_cache
+from app.services.spider_cache import SpiderCodeCache, generator_version, spider_config_hash
+from app.services.block_graph import analyze_block_graph
+from app.services.telemetry import TelemetryChannel
+from app.services.item_store import ItemStore
+from app.services.scrapy_item_store import ItemStorePipeline
+from app.services.columnar import write_columnar, query_columnar
+from app.services.log_store import LogStore
+from app.services.fingerprint_store import FingerprintStore
+from app.services.http_cache import HttpCache
+from app.services.job_state import JobStateStore
+from app.services.page_cache import PageCache
+from app.services.http_client import HttpClient
+from app.services.page_analysis import analyze_dom, parse_html
+from app.services.parse_pool import ParsePool
+from app.services.scrapy_incremental import FingerprintFile, merge_fingerprints
+from app.services.execution_queue import ExecutionLeases, requeue_expired, MAX_EXECUTION_ATTEMPTS
+from app.services.agent import WorkerAgent
+from concurrent.futures import ThreadPoolExecutor
 
 # Set up test client
 client = TestClient(app)
 spider_service = SpiderService()
 
+def local_stores(tmp_path):
+    """Stores of a SpiderService kept in the temporary directory of a test"""
+    return {
+        "item_store": ItemStore(str(tmp_path / "items")),
+        "log_store": LogStore(str(tmp_path / "logs")),
+        "fingerprint_store": FingerprintStore(str(tmp_path / "fingerprints")),
+        "http_cache": HttpCache(str(tmp_path / "http_cache")),
+        "job_state": JobStateStore(str(tmp_path / "jobs")),
+    }
+
 # Test data for a simple spider
 simple_spider = {
     "name": "simple_test_spider",
@@ -125,15 +164,996 @@ def test_generate_spider_code():
     assert "custom_settings = {'USER_AGENT': 'Mozilla/5.0'}" in code, "Custom settings not found in generated code"
 
     # Check if the code has the selector for h1 elements
-    assert "selector = params.get('selector', '')" in code, "Selector parameter not found in generated code"
+    assert "'descendant-or-self::h1'" in code, "Selector not found in generated code"
 
     # Check if output field name is processed
-    assert "field_name = params.get('field_name', 'data')" in code, "Field name parameter not found in generated code"
+    assert "yield _item('title', " in code, "Field name not found in generated code"
+
+def test_generated_spider_regex_modes():
+    """Test the first, all and groups modes of the regular expression processor"""
+    from scrapy.http import HtmlResponse
+
+    def blocks(mode, pattern):
+        return [
+            {'id': 'cell', 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'td::text', 'next': 'regex'}},
+            {'id': 'regex', 'type': 'Processor', 'params': {'processor_type': 'regular_expression', 'pattern': pattern, 'regex_mode': mode, 'next': 'out'}},
+            {'id': 'out', 'type': 'Output', 'params': {'field_name': 'value'}}
+        ]
+
+    response = HtmlResponse(url="https://example.com", body=b"<table><tr><td>10x20 cm</td></tr></table>", encoding="utf-8")
+
+    def parse(mode, pattern):
+        mock_spider = type('obj', (object,), {'name': 'regex_spider', 'start_urls': [], 'blocks': blocks(mode, pattern), 'settings': {}})
+        code = spider_service._generate_spider_code(mock_spider)
+        # Patterns are compiled once at module level
+        assert "re.compile(" in code and "re.search(" not in code
+        namespace = {}
+        exec(compile(code, "<spider>", "exec"), namespace)
+        return list(namespace["Regex_spiderSpider"]().parse(response))
+
+    assert [item["value"] for item in parse("first", r"(\d+)")] == ["10"]
+    assert [item["value"] for item in parse("all", r"\d+")] == ["10", "20"]
+    items = parse("groups", r"(?P<width>\d+)x(?P<height>\d+)")
+    assert items[0]["width"] == "10" and items[0]["height"] == "20"
+
+def test_validate_rejects_invalid_regex():
+    """Test that invalid regular expressions are rejected by validation"""
+    invalid_spider = dict(simple_spider)
+    invalid_spider["blocks"] = [
+        {"id": "block1", "type": "Processor", "params": {"processor_type": "regular_expression", "pattern": "(unclosed"}}
+    ]
+    response = client.post("/api/v1/spiders/validate", json=invalid_spider)
+    assert response.status_code == 400
+    assert "Invalid regular expression" in response.json()["detail"]
+
+    # Patterns that are not strings are rejected the same way instead of failing
+    for pattern in (None, 42, ["a"]):
+        invalid_spider["blocks"][0]["params"]["pattern"] = pattern
+        for url, payload in (
+            ("/api/v1/spiders/validate", invalid_spider),
+            ("/api/v1/spiders/", dict(invalid_spider, name="non_string_regex_spider")),
+            ("/api/v1/spiders/preview", {"config": invalid_spider, "html": "<h1>Page</h1>"}),
+        ):
+            response = client.post(url, json=payload)
+            assert response.status_code == 400, response.text
+            assert "Invalid regular expression in block block1" in response.json()["detail"]
+
+def test_block_graph_validation():
+    """Test cycle detection, warnings about unused blocks and the cost estimate of block graphs"""
+    def selector(block_id, next_ids):
+        return {'id': block_id, 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'li', 'next': next_ids}}
+
+    output = {'id': 'out', 'type': 'Output', 'params': {'field_name': 'value'}}
+
+    # Fan-out and fan-in
+    graph = analyze_block_graph([
+        selector('rows', ['name', 'price']),
+        selector('name', 'out'),
+        {'id': 'price', 'type': 'Processor', 'params': {'processor_type': 'regular_expression', 'pattern': r'(\d+)', 'regex_mode': 'all', 'next': 'out'}},
+        output
+    ])
+    assert graph.valid and graph.order.index('rows') < graph.order.index('name') < graph.order.index('out')
+    assert graph.cost['paths'] == 2 and graph.cost['max_selector_depth'] == 2
+    assert graph.cost['estimated_items_per_page'] == 200
+
+    graph = analyze_block_graph([selector('start', 'a'), selector('a', 'b'), selector('b', ['a', 'out']), output])
+    assert graph.error == "Cycle detected in block connections: a -> b -> a"
+
+    # Unused blocks are reported but still compile and run
+    graph = analyze_block_graph([selector('start', 'out'), {'id': 'orphan', 'type': 'Processor', 'params': {'next': 'out'}}, output])
+    assert graph.valid and graph.warnings == ["Blocks not reachable from a starting Selector: orphan"]
+
+    graph = analyze_block_graph([selector('start', ['out', 'dead']), selector('dead', None), output])
+    assert graph.valid and graph.warnings == ["Blocks with no path to an Output: dead"]
+    assert graph.cost['paths'] == 1
+
+    # Results are cached by the hash of the blocks
+    blocks = [selector('start', 'out'), output]
+    assert analyze_block_graph(blocks) is analyze_block_graph([dict(block) for block in blocks])
+
+def test_generated_spider_parses_block_graph():
+    """Test the compiled block graph with fan-out, fan-in and a regex processor"""
+    from scrapy.http import HtmlResponse
+
+    mock_spider = type('obj', (object,), {
+        'name': 'graph_spider',
+        'start_urls': ['https://example.com'],
+        'blocks': [
+            {'id': 'items', 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'li', 'next': ['name', 'price']}},
+            {'id': 'name', 'type': 'Selector', 'params': {'selector_type': 'xpath', 'selector': './b/text()', 'next': 'out'}},
+            {'id': 'price', 'type': 'Processor', 'params': {'processor_type': 'regular_expression', 'pattern': r'(\d+) EUR', 'next': 'out'}},
+            {'id': 'out', 'type': 'Output', 'params': {'field_name': 'value'}}
+        ],
+        'settings': {}
+    })
+    code = spider_service._generate_spider_code(mock_spider)
+
+    # The shared output block becomes a method, the rest is inlined
+    assert "def _block_3(self, value):" in code
+    assert "block_mapping" not in code
+
+    namespace = {}
+    exec(compile(code, "<spider>", "exec"), namespace)
+    spider = namespace["Graph_spiderSpider"]()
+    response = HtmlResponse(
+        url="https://example.com",
+        body=b"<ul><li><b>Apple</b> 3 EUR</li><li><b>Pear</b> 5 EUR</li></ul>",
+        encoding="utf-8"
+    )
+    values = [item["value"] for item in spider.parse(response)]
+    assert values == ["Apple", "3", "Pear", "5"]
+
+def test_spider_process_streams_both_pipes():
+    """Test that the subprocess runner drains stdout and stderr concurrently"""
+    # Write far more to stderr than a pipe buffer holds before touching stdout
+    script = (
+        "import sys\n"
+        "for i in range(20000): sys.stderr.write('log line %d\\n' % i)\n"
+        "print('Scraped item')\n"
+    )
+    stdout_lines = []
+    stderr_lines = []
+
+    async def on_stdout(line):
+        stdout_lines.append(line)
+
+    async def on_stderr(line):
+        stderr_lines.append(line)
+
+    async def run():
+        process = SpiderProcess([sys.executable, "-c", script], on_stdout=on_stdout, on_stderr=on_stderr)
+        await process.start()
+        return await asyncio.wait_for(process.wait(), timeout=30)
+
+    return_code = asyncio.run(run())
+
+    assert return_code == 0
+    assert stdout_lines == ["Scraped item"]
+    assert len(stderr_lines) == 20000
+    assert stderr_lines[-1] == "log line 19999"
+
+def test_spider_process_terminate():
+    """Test that terminating a running process does not block"""
+    async def run():
+        process = SpiderProcess([sys.executable, "-c", "import time; time.sleep(60)"])
+        await process.start()
+        await process.terminate(timeout=5)
+        await process.wait()
+        return process
+
+    process = asyncio.run(run())
+    assert process.stopped
+    assert process.returncode != 0
+
+def test_scheduler_runs_by_priority(db_setup):
+    """Test that the scheduler drains the queue by priority within its worker limit"""
+    started = []
+
+    class RecordingService(SpiderService):
+        async def run_spider(self, spider_id, execution_id=None):
+            started.append(spider_id)
+
+    scheduler = SpiderScheduler(RecordingService(), max_concurrent=1)
+
+    async def run():
+        await scheduler.enqueue("sched_low", priority=0)
+        await scheduler.enqueue("sched_high", priority=5)
+        await scheduler.enqueue("sched_mid", priority=1)
+        assert await scheduler.queue_depth() == 3
+
+        assert scheduler.reserve_worker()
+        # The pool is full until the first worker exits
+        assert not scheduler.reserve_worker()
+        await scheduler.run_worker()
+
+        # Executions left in the queue are picked up by resume
+        await scheduler.enqueue("sched_left", priority=0)
+        assert await scheduler.resume() == 1
+        await asyncio.gather(*scheduler._tasks)
+        return await scheduler.get_queue_stats()
+
+    try:
+        stats = asyncio.run(run())
+        assert started == ["sched_high", "sched_mid", "sched_low", "sched_left"]
+        assert stats["queued"] == 0
+        assert stats["active_workers"] == 0
+        assert stats["max_concurrent"] == 1
+    finally:
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id.like("sched_%")).delete(synchronize_session=False)
+        db_setup.commit()
+
+def test_execution_claims_are_exclusive(db_setup):
+    """Test that workers racing for the queue never claim the same execution"""
+    scheduler = SpiderScheduler(SpiderService())
+
+    def drain(worker):
+        leases = ExecutionLeases(f"lease_worker_{worker}")
+        claimed = []
+        while True:
+            execution = leases.claim()
+            if execution is None:
+                return claimed
+            claimed.append(execution["id"])
+
+    try:
+        async def fill():
+            return [(await scheduler.enqueue(f"lease_{i}"))["id"] for i in range(30)]
+        queued = asyncio.run(fill())
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            claims = list(executor.map(drain, range(4)))
+        claimed = [execution_id for worker_claims in claims for execution_id in worker_claims]
+        assert sorted(claimed) == sorted(queued)
+    finally:
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id.like("lease_%")).delete(synchronize_session=False)
+        db_setup.commit()
+
+def test_expired_leases_are_requeued(db_setup):
+    """Test that executions of a lost worker go back to the queue, then fail"""
+    scheduler = SpiderScheduler(SpiderService())
+    lost_worker = ExecutionLeases("lease_lost", lease_seconds=0)
+    try:
+        execution_id = asyncio.run(scheduler.enqueue("lease_expiring"))["id"]
+        for attempt in range(1, MAX_EXECUTION_ATTEMPTS + 1):
+            assert lost_worker.claim()["id"] == execution_id
+            time.sleep(0.01)
+            assert requeue_expired() == (1 if attempt < MAX_EXECUTION_ATTEMPTS else 0)
+            # The heartbeat of the lost worker finds out it no longer owns the execution
+            assert lost_worker.renew() == ({execution_id}, set(), set())
+            lost_worker.held.clear()
+
+        db_setup.expire_all()
+        execution = db_setup.query(SpiderExecution).filter(SpiderExecution.id == execution_id).one()
+        assert execution.status == "error"
+        assert execution.attempts == MAX_EXECUTION_ATTEMPTS
+        assert lost_worker.claim() is None
+    finally:
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id.like("lease_%")).delete(synchronize_session=False)
+        db_setup.commit()
+
+def test_spider_code_cache(tmp_path):
+    """Test that generated spider code is cached by config hash with LRU eviction"""
+    cache = SpiderCodeCache(directory=str(tmp_path), max_entries=2)
+    builds = []
+
+    def build(spider):
+        builds.append(spider["name"])
+        return spider_service._generate_spider_code(type('obj', (object,), spider))
+
+    def config(name):
+        return {
+            'name': name,
+            'start_urls': ['https://example.com'],
+            'blocks': [{'id': 'block1', 'type': 'Output', 'params': {'field_name': 'page'}}],
+            'settings': {}
+        }
+
+    first = cache.get_or_build(config('cached_a'), build)
+    assert os.path.exists(first.path)
+    assert os.path.exists(first.bytecode_path)
+
+    # Same configuration is served from the cache
+    assert cache.get_or_build(config('cached_a'), build).path == first.path
+    assert builds == ['cached_a']
+
+    # Adding two more configurations evicts the least recently used one
+    cache.get_or_build(config('cached_b'), build)
+    cache.get_or_build(config('cached_c'), build)
+    assert len(cache) == 2
+    assert not os.path.exists(first.path)
+    assert not os.path.exists(first.bytecode_path)
+
+    # Explicit invalidation removes the entry
+    assert cache.invalidate(config('cached_b'))
+    assert len(cache) == 1
+
+    # A new cache instance picks up the modules left on disk
+    assert len(SpiderCodeCache(directory=str(tmp_path), max_entries=2)) == 1
+
+    # Modules generated by another version of the generator are not reused
+    key = spider_config_hash(config('cached_c'))
+    generator_version.cache_clear()
+    original = spider_cache.GENERATOR_MODULES
+    try:
+        spider_cache.GENERATOR_MODULES = original[:-1]
+        assert spider_config_hash(config('cached_c')) != key
+    finally:
+        spider_cache.GENERATOR_MODULES = original
+        generator_version.cache_clear()
+    assert spider_config_hash(config('cached_c')) == key
+
+@pytest.fixture
+def local_site(tmp_path):
+    """Serve a small static page from a local HTTP server"""
+    (tmp_path / "index.html").write_text("<html><body><h1>Hello</h1><h1>World</h1></body></html>")
+    handler = partial(SimpleHTTPRequestHandler, directory=str(tmp_path))
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/index.html"
+    server.shutdown()
+
+class CountingHandler(SimpleHTTPRequestHandler):
+    """Serve files and record the status of every response"""
+    statuses = []
+
+    def log_request(self, code='-', size='-'):
+        self.statuses.append(int(code))
+
+def test_analyze_url_page_cache(tmp_path):
+    """Test that repeated URL analyses reuse the cached page and its analysis"""
+    (tmp_path / "index.html").write_text("<html><head><title>Cached</title></head><body><h1>Hello</h1></body></html>")
+    CountingHandler.statuses = []
+    server = HTTPServer(("127.0.0.1", 0), partial(CountingHandler, directory=str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/index.html"
+    try:
+        service = SpiderService(page_cache=PageCache(ttl=60), parse_pool=ParsePool(workers=1))
+        first = asyncio.run(service.analyze_url(url))
+        analysis = service.page_cache.get(url).parsed
+        second = asyncio.run(service.analyze_url(url))
+        assert first.status == second.status == "success" and second.page_title == "Cached"
+        # The fresh page is neither downloaded nor parsed again
+        assert CountingHandler.statuses == [200]
+        assert service.page_cache.get(url).parsed is analysis
+        assert service.page_cache.stats()["hits"] == 1
+        assert service.parse_pool.stats()["tasks"] == 1
+
+        # Once the TTL is over the page is revalidated with If-Modified-Since
+        service.page_cache.ttl = 0
+        assert asyncio.run(service.analyze_url(url)).status == "success"
+        assert CountingHandler.statuses == [200, 304]
+        assert service.page_cache.get(url).parsed is analysis
+
+        # Concurrent requests for a page that is not cached download it once
+        async def fetch_concurrently():
+            cache = PageCache(ttl=60)
+            async with aiohttp.ClientSession() as session:
+                pages = await asyncio.gather(*(cache.fetch(session, url) for _ in range(5)))
+            return cache, pages
+
+        CountingHandler.statuses = []
+        cache, pages = asyncio.run(fetch_concurrently())
+        assert CountingHandler.statuses == [200]
+        assert all(page is pages[0] for page in pages)
+        assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 4
+    finally:
+        server.shutdown()
+        service.parse_pool.close()
+
+    # Least recently used pages go first, and only hot pages keep their parsed form
+    cache = PageCache(max_bytes=25, hot_entries=1)
+    for name in ("a", "b", "c"):
+        cache.store(name, b"x" * 10)
+    assert cache.get("a") is None and len(cache) == 2
+
+    async def upper(page):
+        return page.text.upper()
+
+    asyncio.run(cache.parsed(cache.get("b"), upper))
+    asyncio.run(cache.parsed(cache.get("c"), upper))
+    assert cache.get("b").parsed is None and cache.get("c").parsed == "X" * 10
+
+    # Validators are found whatever the case of the header names
+    page = cache.store("d", b"x", headers={"etag": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"})
+    assert page.conditional_headers() == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+def test_parse_pool_limits():
+    """Test the queue bound and the timeout of the parse pool"""
+    pool = ParsePool(workers=0, queue_size=1, timeout=0.2)
+
+    async def overload():
+        return await asyncio.gather(pool.run(time.sleep, 0.1), pool.run(time.sleep, 0.1), return_exceptions=True)
+
+    results = asyncio.run(overload())
+    assert results[0] is None and isinstance(results[1], ValueError)
+    with pytest.raises(ValueError, match="longer than"):
+        asyncio.run(pool.run(time.sleep, 0.5))
+    # The timed out task still runs and holds its slot until it is done
+    assert pool.stats()["pending"] == 1
+    with pytest.raises(ValueError, match="Too many pages"):
+        asyncio.run(pool.run(time.sleep, 0))
+    time.sleep(0.5)
+    stats = pool.stats()
+    assert stats["tasks"] == 1 and stats["rejected"] == 2 and stats["timeouts"] == 1
+    assert stats["average_run_ms"] >= 100 and stats["pending"] == 0
+    pool.close()
+
+def test_analyze_urls_batch(local_site):
+    """Test analyzing several URLs concurrently over the shared session"""
+    missing = local_site.replace("index.html", "missing.html")
+    response = client.post("/api/v1/spiders/analyze-urls", json={"urls": [local_site, missing, local_site]})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {result["url"]: result for result in map(json.loads, response.text.splitlines())}
+    assert len(results) == 2
+    assert results[local_site]["status"] == "success" and results[missing]["status"] == "error"
+    assert client.post("/api/v1/spiders/analyze-urls", json={"urls": []}).status_code == 422
+
+    async def analyze_twice():
+        service = SpiderService()
+        session = await service.http_client.session()
+        results = [result async for result in service.analyze_urls([local_site])]
+        assert await service.http_client.session() is session
+        await service.http_client.close()
+        return results
+
+    assert [result.status for result in asyncio.run(analyze_twice())] == ["success"]
+
+def test_http_client_closes_session_of_previous_loop():
+    """Test that using the shared client from a new event loop closes the old session"""
+    http_client = HttpClient()
+    first_loop = asyncio.new_event_loop()
+    try:
+        first = first_loop.run_until_complete(http_client.session())
+        second = asyncio.run(http_client.session())
+        assert second is not first and not second.closed
+        # The old session is closed by its own loop
+        first_loop.run_until_complete(asyncio.sleep(0))
+        assert first.closed
+    finally:
+        first_loop.close()
+    # The session of a loop that is gone is dropped on the next use
+    third_loop = asyncio.new_event_loop()
+    try:
+        assert third_loop.run_until_complete(http_client.session()) is not second
+        third_loop.run_until_complete(http_client.close())
+    finally:
+        third_loop.close()
+
+def test_analyze_dom_ranks_selectors():
+    """Test the single-pass page analysis"""
+    cards = "".join(f'<div class="card"><a href="/{i}">Item {i}</a></div>' for i in range(5))
+    body = f"""<html><head><title> Shop </title></head><body>
+        <div id="main">{cards}<p>Intro</p><a class="nav" href="/home">Home</a></div>
+        <!-- comment --></body></html>""".encode()
+    analysis = analyze_dom(parse_html(body))
+    assert analysis["page_title"] == "Shop"
+    assert analysis["tags"]["div"] == 6 and analysis["classes"] == {"card": 5, "nav": 1}
+
+    selectors = [s for s in analysis["selectors"] if s["element_type"] == "links"]
+    assert [(s["selector"], s["count"]) for s in selectors if s["type"] == "css"] == [("a", 5), ("a.nav", 1)]
+    assert selectors[0]["sample_values"] == ["/0", "/1", "/2"]
+    blocks = [s for s in analysis["selectors"] if s["element_type"] == "text_blocks" and s["type"] == "xpath"]
+    assert [(s["selector"], s["count"]) for s in blocks] == [
+        ("//div[contains(@class, 'card')]", 5), ("//div[@id='main']", 1), ("//p", 1)
+    ]
+
+def test_worker_pool_reuses_warm_worker(local_site, tmp_path):
+    """Test that consecutive jobs run on pre-started worker processes"""
+    mock_spider = type('obj', (object,), {
+        'name': 'pool_spider',
+        'start_urls': [local_site],
+        'blocks': [
+            {'id': 'block1', 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'h1::text', 'next': 'block2'}},
+            {'id': 'block2', 'type': 'Output', 'params': {'field_name': 'title'}}
+        ],
+        'settings': {}
+    })
+    code = spider_service._generate_spider_code(mock_spider)
+
+    async def run():
+        pool = ScrapyWorkerPool(size=1)
+        await pool.start()
+        try:
+            for i in range(2):
+                warm_pids = {worker.process.pid for worker in pool.idle}
+                feed = str(tmp_path / f"items_{i}.json")
+                job = await pool.submit(code, settings={"FEEDS": {feed: {"format": "json"}}})
+                # The job must run on a worker that was started ahead of time
+                assert job.worker.process.pid in warm_pids
+                assert await asyncio.wait_for(job.wait(), timeout=60) == 0
+        finally:
+            await pool.close()
+
+    asyncio.run(run())
+    for i in range(2):
+        items = json.loads((tmp_path / f"items_{i}.json").read_text())
+        assert [item["title"] for item in items] == ["Hello", "World"]
+
+def test_telemetry_reports_stats(local_site, tmp_path):
+    """Test that a spider run reports its stats over the telemetry socket"""
+    mock_spider = type('obj', (object,), {
+        'id': 'telemetry',
+        'name': 'telemetry_spider',
+        'start_urls': [local_site],
+        'blocks': [
+            {'id': 'block1', 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'h1::text', 'next': 'block2'}},
+            {'id': 'block2', 'type': 'Output', 'params': {'field_name': 'title'}}
+        ],
+        'settings': {}
+    })
+    spider_file = tmp_path / "telemetry_spider.py"
+    spider_file.write_text(spider_service._generate_spider_code(mock_spider))
+    service = SpiderService(**local_stores(tmp_path))
+    events = []
+    log_lines = []
+
+    async def on_event(event):
+        events.append(event)
+
+    async def on_log(line):
+        log_lines.append(line)
+
+    async def run():
+        telemetry = await TelemetryChannel(on_event=on_event, interval=0.1).open()
+        args = ["scrapy", "runspider", str(spider_file)]
+        for name, value in service._run_settings(mock_spider, "execution", telemetry).items():
+            args.extend(["-s", f"{name}={json.dumps(value) if isinstance(value, dict) else value}"])
+        process = SpiderProcess(args, on_stderr=on_log, env=spider_service._runspider_env())
+        await process.start()
+        assert await asyncio.wait_for(process.wait(), timeout=60) == 0
+        await telemetry.close()
+        return telemetry
+
+    telemetry = asyncio.run(run())
+    final = telemetry.latest
+    assert final is events[-1] and final.event == "closed"
+    assert final.items_scraped == 2
+    assert final.responses == {"200": 1}
+    assert final.reason == "finished"
+    assert final.summary()["scrapy"]["item_scraped_count"] == 2
+    # Items are counted without Scrapy logging each of them at DEBUG level
+    assert not any("Scraped from" in line for line in log_lines)
+    items, total = service.item_store.read("execution")
+    assert total == 2 and [item["title"] for item in items] == ["Hello", "World"]
+
+def test_item_store_pages(tmp_path):
+    """Test paging through items written by the item store pipeline"""
+    store = ItemStore(str(tmp_path))
+    pipeline = ItemStorePipeline(store.pipeline_settings("execution")["ITEM_STORE_PATH"])
+    pipeline.open_spider(None)
+    for i in range(250):
+        pipeline.process_item({"n": i, "text": "caf\u00e9\nline"}, None)
+    pipeline.close_spider(None)
+
+    assert store.count("execution") == 250
+    items, total = store.read("execution", offset=100, limit=100)
+    assert total == 250 and [item["n"] for item in items] == list(range(100, 200))
+    items, _ = store.read("execution", offset=240, limit=100)
+    assert [item["n"] for item in items] == list(range(240, 250))
+    assert items[0]["text"] == "caf\u00e9\nline"
+    assert store.read("execution", offset=250) == ([], 250)
+    assert store.read("missing") == ([], 0)
+
+    # A line without its index entry yet, or half an entry, is not returned
+    path = store.path("execution")
+    with open(path + ".jl", "ab") as data, open(path + ".idx", "ab") as index:
+        data.write(b'{"n": 250}\n{"n": 25')
+        index.write(b"\x00\x00")
+    assert store.count("execution") == 250
+    items, _ = store.read("execution", offset=249)
+    assert [item["n"] for item in items] == [249]
+
+    # Resumed runs append after the existing items
+    pipeline.open_spider(None)
+    assert pipeline.position == os.path.getsize(path + ".jl")
+    pipeline.close_spider(None)
+
+    store.delete("execution")
+    assert store.count("execution") == 0
+
+def test_write_columnar_schema(tmp_path):
+    """Test that the columnar export finds a schema fitting every item"""
+    batches = [
+        [{"name": "a", "price": 1, "tags": ["x"]}, {"name": "b", "price": 2.5}],
+        [{"name": "c", "price": None, "available": True, "tags": {"y": 1}}],
+    ]
+    path = str(tmp_path / "items.parquet")
+    columnar = write_columnar(lambda: iter(batches), path)
+    assert columnar["rows"] == 3
+    assert columnar["columns"] == {"name": "string", "price": "double", "tags": "string", "available": "bool"}
+
+    result = query_columnar(path, columns=["name", "tags"], filters=[{"column": "price", "op": "is_null"}])
+    assert result["rows"] == [{"name": "c", "tags": '{"y": 1}'}]
+    result = query_columnar(path, aggregates=[{"function": "mean", "column": "price"}, {"function": "count"}])
+    assert result["rows"] == [{"price_mean": 1.75, "count_all": 3}]
+
+def test_log_store_ranges(tmp_path):
+    """Test reading log ranges across index checkpoints and the bounded error excerpt"""
+    store = LogStore(str(tmp_path))
+    log = store.open("execution", ring_size=50)
+    for i in range(2500):
+        log.write(f"line {i} \u00e9")
+    assert len(log.recent) == 50
+    assert log.excerpt(3) == "line 2497 \u00e9\nline 2498 \u00e9\nline 2499 \u00e9"
+
+    lines, total = store.read("execution", offset=995, limit=10)
+    assert total == 2500 and lines == [f"line {i} \u00e9" for i in range(995, 1005)]
+    lines, _ = store.read("execution", offset=2498, limit=10)
+    assert lines == ["line 2498 \u00e9", "line 2499 \u00e9"]
+    assert store.read("missing") == ([], 0)
+
+    # A line still being written is not counted
+    with open(store.path("execution") + ".log", "ab") as data:
+        data.write(b"partial")
+    assert store.count("execution") == 2500
+    log.close()
+
+    # Long excerpts are cut to fit in the database
+    log = store.open("long")
+    log.write("x" * 10000)
+    assert len(log.excerpt()) <= 4003
+    log.close()
+
+def test_merge_fingerprints(tmp_path):
+    """Test looking up, merging and expiring fingerprints of the incremental mode"""
+    path = str(tmp_path / "spider.fp")
+    assert merge_fingerprints(path, {b"b" * 16: 100, b"d" * 16: 100}, oldest=0) == 2
+    assert merge_fingerprints(path, {b"a" * 16: 50, b"b" * 16: 200, b"c" * 16: 300}, oldest=100) == 3
+
+    store = FingerprintFile(path)
+    assert [key[:1] for key, _ in store.records()] == [b"b", b"c", b"d"]
+    assert store.lookup(b"b" * 16) == 200
+    assert store.lookup(b"d" * 16) == 100
+    assert store.lookup(b"a" * 16) is None
+    assert store.lookup(b"e" * 16) is None
+    store.close()
+    assert FingerprintFile(str(tmp_path / "missing.fp")).lookup(b"a" * 16) is None
+
+def run_generated_spider(service, spider, spider_file, execution_id):
+    """Run a generated spider with `scrapy runspider` and the settings of the service"""
+    async def run():
+        async def on_event(event):
+            pass
+
+        telemetry = await TelemetryChannel(on_event=on_event).open()
+        args = ["scrapy", "runspider", str(spider_file)]
+        for name, value in service._run_settings(spider, execution_id, telemetry).items():
+            args.extend(["-s", f"{name}={json.dumps(value) if isinstance(value, dict) else value}"])
+        process = SpiderProcess(args, env=spider_service._runspider_env())
+        await process.start()
+        assert await asyncio.wait_for(process.wait(), timeout=60) == 0
+        await telemetry.close()
+        return telemetry.latest
+
+    return asyncio.run(run())
+
+def test_incremental_runs_skip_fresh_pages(local_site, tmp_path):
+    """Test that a second incremental run fetches its start URLs again but skips other pages crawled by the first"""
+    mock_spider = type('obj', (object,), {
+        'id': 'incremental',
+        'name': 'incremental_spider',
+        'start_urls': [local_site],
+        'blocks': [
+            {'id': 'block1', 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'h1::text', 'next': 'block2'}},
+            {'id': 'block2', 'type': 'Output', 'params': {'field_name': 'title'}}
+        ],
+        'settings': {'INCREMENTAL': True, 'HTTP_CACHE': False}
+    })
+    spider_file = tmp_path / "incremental_spider.py"
+    spider_file.write_text(spider_service._generate_spider_code(mock_spider))
+    service = SpiderService(**local_stores(tmp_path))
+
+    first = run_generated_spider(service, mock_spider, spider_file, "first")
+    assert first.items_scraped == 2
+    assert first.summary()["incremental"] == {"hits": 0, "misses": 0}
+    assert "http_cache" not in first.summary()
+    assert service.fingerprint_store.count("incremental") == 1
+
+    second = run_generated_spider(service, mock_spider, spider_file, "second")
+    assert second.items_scraped == 2 and second.requests == 1
+    assert second.summary()["incremental"] == {"hits": 0, "misses": 0}
+
+    # The same page requested without the exemption, as a followed link is, is skipped
+    followed_file = tmp_path / "incremental_followed_spider.py"
+    followed_file.write_text(
+        spider_file.read_text().replace(', meta={"dont_skip_incremental": True}', "")
+    )
+    third = run_generated_spider(service, mock_spider, followed_file, "third")
+    assert third.items_scraped == 0 and third.requests == 0
+    assert third.summary()["incremental"] == {"hits": 1, "misses": 0}
+
+    service.fingerprint_store.delete("incremental")
+    assert service.fingerprint_store.count("incremental") == 0
+
+def test_http_cache_revalidates_pages(local_site, tmp_path):
+    """Test that a page answered with 304 is parsed from the HTTP cache"""
+    mock_spider = type('obj', (object,), {
+        'id': 'cached',
+        'name': 'cached_spider',
+        'start_urls': [local_site],
+        'blocks': [
+            {'id': 'block1', 'type': 'Selector', 'params': {'selector_type': 'css', 'selector': 'h1::text', 'next': 'block2'}},
+            {'id': 'block2', 'type': 'Output', 'params': {'field_name': 'title'}}
+        ],
+        'settings': {}
+    })
+    spider_file = tmp_path / "cached_spider.py"
+    spider_file.write_text(spider_service._generate_spider_code(mock_spider))
+    service = SpiderService(**local_stores(tmp_path))
+
+    first = run_generated_spider(service, mock_spider, spider_file, "first")
+    assert first.responses == {"200": 1}
+    assert first.http_cache["hits"] == 0 and first.http_cache["misses"] == 1
+    assert service.http_cache.usage("cached")["entries"] == 1
+
+    second = run_generated_spider(service, mock_spider, spider_file, "second")
+    assert second.http_cache["hits"] == 1 and second.http_cache["misses"] == 0
+    assert second.http_cache["hit_rate"] == 1.0
+    items, _ = service.item_store.read("second")
+    assert [item["title"] for item in items] == ["Hello", "World"]
+
+    assert service.http_cache.purge("cached")["entries"] == 1
+    assert service.http_cache.usage("cached") == {"entries": 0, "bytes": 0}
+
+def test_http_cache_evicts_least_recently_used(tmp_path):
+    """Test eviction against the per-spider and the global size limits"""
+    cache = HttpCache(str(tmp_path), max_bytes=250, spider_max_bytes=200)
+    for spider_id, pages in (("a", 3), ("b", 1)):
+        os.makedirs(cache.path(spider_id))
+        for page in range(pages):
+            path = os.path.join(cache.path(spider_id), f"{page}.cache")
+            with open(path, "wb") as entry:
+                entry.write(b"x" * 100)
+            # b's page is the oldest, a's pages are used in order
+            mtime = 1000 + page if spider_id == "a" else 500
+            os.utime(path, (mtime, mtime))
+
+    # a is trimmed to 200 bytes, then b's older page goes to fit 250 bytes overall
+    assert cache.evict("a") == {"entries": 2, "bytes": 200}
+    assert sorted(os.listdir(cache.path("a"))) == ["1.cache", "2.cache"]
+    assert cache.usage("b") == {"entries": 0, "bytes": 0}
+    assert cache.usage() == {"entries": 2, "bytes": 200}
+
+def test_worker_agents_share_queue(db_setup, local_site, tmp_path):
+    """Test several worker agents draining the execution queue of one database"""
+    spider_ids = []
+    for i in range(3):
+        response = client.post("/api/v1/spiders/", json={
+            "name": f"agent_spider_{i}",
+            "start_urls": [local_site],
+            "blocks": [
+                {"id": "block1", "type": "Selector", "params": {"selector_type": "css", "selector": "h1::text", "next": "block2"}},
+                {"id": "block2", "type": "Output", "params": {"field_name": "title"}}
+            ],
+            "settings": {}
+        })
+        assert response.status_code == 200, response.text
+        spider_ids.append(response.json()["id"])
+
+    service = SpiderService(**local_stores(tmp_path))
+    scheduler = SpiderScheduler(service, max_concurrent=0)
+    agents = [WorkerAgent(service, concurrency=1, worker_id=f"agent_{i}", poll_interval=0.1) for i in range(2)]
+
+    async def run():
+        for spider_id in spider_ids:
+            await scheduler.enqueue(spider_id)
+        # The API does not run anything itself
+        assert not scheduler.reserve_worker()
+        await asyncio.wait_for(
+            asyncio.gather(*(agent.run(exit_when_idle=True) for agent in agents)), timeout=120
+        )
+
+    try:
+        asyncio.run(run())
+        db_setup.expire_all()
+        executions = db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id.in_(spider_ids)).all()
+        assert len(executions) == 3
+        assert all(execution.status == "finished" for execution in executions)
+        assert all(execution.items_scraped == 2 for execution in executions)
+        assert {execution.worker_id for execution in executions} <= {"agent_0", "agent_1"}
+        assert all(execution.attempts == 1 and execution.lease_expires_at is None for execution in executions)
+    finally:
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id.in_(spider_ids)).delete(synchronize_session=False)
+        db_setup.query(Spider).filter(Spider.id.in_(spider_ids)).delete(synchronize_session=False)
+        db_setup.commit()
+
+def test_retried_execution_starts_over(db_setup, local_site, tmp_path):
+    """Test that a retry of an execution does not keep the items and log of the failed attempt"""
+    response = client.post("/api/v1/spiders/", json={
+        "name": "retried_spider",
+        "start_urls": [local_site],
+        "blocks": [
+            {"id": "block1", "type": "Selector", "params": {"selector_type": "css", "selector": "h1::text", "next": "block2"}},
+            {"id": "block2", "type": "Output", "params": {"field_name": "title"}}
+        ],
+        "settings": {}
+    })
+    assert response.status_code == 200, response.text
+    spider_id = response.json()["id"]
+
+    service = SpiderService(**local_stores(tmp_path))
+    scheduler = SpiderScheduler(service, max_concurrent=0)
+    agent = WorkerAgent(service, concurrency=1, worker_id="retry_agent", poll_interval=0.1)
+
+    async def run():
+        execution_id = (await scheduler.enqueue(spider_id))["id"]
+        # Output of an attempt whose worker was lost
+        pipeline = ItemStorePipeline(service.item_store.pipeline_settings(execution_id)["ITEM_STORE_PATH"])
+        pipeline.open_spider(None)
+        pipeline.process_item({"title": "stale"}, None)
+        pipeline.close_spider(None)
+        log = service.log_store.open(execution_id)
+        log.write("stale attempt")
+        log.close()
+        await asyncio.wait_for(agent.run(exit_when_idle=True), timeout=120)
+        return execution_id
+
+    try:
+        execution_id = asyncio.run(run())
+        db_setup.expire_all()
+        execution = db_setup.get(SpiderExecution, execution_id)
+        assert execution.status == "finished" and execution.items_scraped == 2
+        items, total = service.item_store.read(execution_id)
+        assert total == 2 and [item["title"] for item in items] == ["Hello", "World"]
+        lines, _ = service.log_store.read(execution_id, limit=1000)
+        assert "stale attempt" not in lines
+    finally:
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id == spider_id).delete(synchronize_session=False)
+        db_setup.query(Spider).filter(Spider.id == spider_id).delete(synchronize_session=False)
+        db_setup.commit()
+
+class SlowPageHandler(SimpleHTTPRequestHandler):
+    """Serve static pages slowly, so a crawl is still in progress when it is paused"""
+
+    def do_GET(self):
+        time.sleep(0.1)
+        super().do_GET()
+
+@pytest.mark.parametrize("runner", ["subprocess", "pool"])
+def test_pause_and_resume_execution(db_setup, tmp_path, runner):
+    """Test that a paused execution resumes from its JOBDIR without fetching pages again"""
+    site = tmp_path / "site"
+    site.mkdir()
+    for page in range(20):
+        (site / f"{page}.html").write_text(f"<html><body><h1>Page {page}</h1></body></html>")
+    server = HTTPServer(("127.0.0.1", 0), partial(SlowPageHandler, directory=str(site)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    response = client.post("/api/v1/spiders/", json={
+        "name": f"pausable_spider_{runner}",
+        "start_urls": [f"{base_url}/{page}.html" for page in range(20)],
+        "blocks": [
+            {"id": "block1", "type": "Selector", "params": {"selector_type": "css", "selector": "h1::text", "next": "block2"}},
+            {"id": "block2", "type": "Output", "params": {"field_name": "title"}}
+        ],
+        "settings": {"CONCURRENT_REQUESTS": 1, "HTTP_CACHE": False, "PAUSABLE": True}
+    })
+    assert response.status_code == 200, response.text
+    spider_id = response.json()["id"]
+
+    async def run():
+        worker_pool = ScrapyWorkerPool(size=1) if runner == "pool" else None
+        if worker_pool is not None:
+            await worker_pool.start()
+        service = SpiderService(worker_pool=worker_pool, **local_stores(tmp_path))
+        scheduler = SpiderScheduler(service, max_concurrent=0)
+        try:
+            execution = await scheduler.enqueue(spider_id)
+            run = asyncio.create_task(service.run_spider(spider_id, execution_id=execution["id"]))
+            while service.item_store.count(execution["id"]) < 3:
+                assert not run.done()
+                await asyncio.sleep(0.05)
+            assert await service.pause_spider(spider_id)
+            await asyncio.wait_for(run, timeout=60)
+
+            paused = await service.get_execution(execution["id"])
+            assert paused["status"] == "paused"
+            assert 3 <= paused["items_scraped"] < 20
+            assert service.job_state.resumable(execution["id"])
+
+            resumed = await scheduler.resume_paused(spider_id)
+            assert resumed["id"] == execution["id"] and resumed["status"] == "queued"
+            await asyncio.wait_for(service.run_spider(spider_id, execution_id=execution["id"]), timeout=60)
+            return service, execution["id"]
+        finally:
+            if worker_pool is not None:
+                await worker_pool.close()
+
+    try:
+        service, execution_id = asyncio.run(run())
+        finished = asyncio.run(service.get_execution(execution_id))
+        assert finished["status"] == "finished" and finished["items_scraped"] == 20
+        items, total = service.item_store.read(execution_id, limit=100)
+        assert total == 20
+        assert sorted(item["title"] for item in items) == sorted(f"Page {page}" for page in range(20))
+        assert not service.job_state.exists(execution_id)
+    finally:
+        server.shutdown()
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id == spider_id).delete(synchronize_session=False)
+        db_setup.query(Spider).filter(Spider.id == spider_id).delete(synchronize_session=False)
+        db_setup.commit()
+
+def test_only_pausable_runs_keep_a_jobdir(db_setup, tmp_path):
+    """Test that the crawl state is kept on disk only for runs that can be paused"""
+    service = SpiderService(**local_stores(tmp_path))
+
+    async def run_settings(settings):
+        spider = type('obj', (object,), {'id': 'jobdir', 'settings': settings})
+        telemetry = await TelemetryChannel().open()
+        try:
+            return service._run_settings(spider, "jobdir_execution", telemetry)
+        finally:
+            await telemetry.close()
+
+    assert "JOBDIR" not in asyncio.run(run_settings({}))
+    assert asyncio.run(run_settings({"PAUSABLE": True}))["JOBDIR"] == service.job_state.settings("jobdir_execution")["JOBDIR"]
+    # A paused execution continues from its JOBDIR even if the spider is no longer pausable
+    service.job_state.mark_paused("jobdir_execution")
+    assert "JOBDIR" in asyncio.run(run_settings({}))
+
+    service.running_spiders["jobdir_execution"] = SpiderProcess(["true"])
+    service.running_executions["jobdir_execution"] = "jobdir"
+    with pytest.raises(ValueError, match="PAUSABLE"):
+        asyncio.run(service.pause_execution("jobdir_execution"))
+
+    response = client.post("/api/v1/spiders/", json=dict(simple_spider, name="unpausable_spider"))
+    spider_id = response.json()["id"]
+    try:
+        db_setup.query(Spider).filter(Spider.id == spider_id).update({"status": "running"})
+        db_setup.commit()
+        response = client.post(f"/api/v1/spiders/{spider_id}/pause")
+        assert response.status_code == 400 and "not pausable" in response.json()["detail"]
+    finally:
+        db_setup.query(Spider).filter(Spider.id == spider_id).delete(synchronize_session=False)
+        db_setup.commit()
+
+def test_lost_lease_abandons_run(db_setup, tmp_path):
+    """Test that a run whose lease was taken over stops without writing to the execution"""
+    site = tmp_path / "site"
+    site.mkdir()
+    for page in range(20):
+        (site / f"{page}.html").write_text(f"<html><body><h1>Page {page}</h1></body></html>")
+    server = HTTPServer(("127.0.0.1", 0), partial(SlowPageHandler, directory=str(site)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    response = client.post("/api/v1/spiders/", json={
+        "name": "lost_lease_spider",
+        "start_urls": [f"{base_url}/{page}.html" for page in range(20)],
+        "blocks": [
+            {"id": "block1", "type": "Selector", "params": {"selector_type": "css", "selector": "h1::text", "next": "block2"}},
+            {"id": "block2", "type": "Output", "params": {"field_name": "title"}}
+        ],
+        "settings": {"CONCURRENT_REQUESTS": 1, "HTTP_CACHE": False}
+    })
+    assert response.status_code == 200, response.text
+    spider_id = response.json()["id"]
+    service = SpiderService(**local_stores(tmp_path))
+    leases = ExecutionLeases("lease_owner", heartbeat_interval=0.1)
+
+    async def run():
+        await SpiderScheduler(service, max_concurrent=0).enqueue(spider_id, priority=100)
+        execution = await asyncio.to_thread(leases.claim)
+        assert execution["spider_id"] == spider_id
+        task = asyncio.create_task(service.run_spider(spider_id, execution_id=execution["id"]))
+        leases.start_heartbeat(service)
+        while service.item_store.count(execution["id"]) < 2:
+            assert not task.done()
+            await asyncio.sleep(0.05)
+
+        # Another worker took the execution over
+        db = SessionLocal()
+        db.query(SpiderExecution).filter(SpiderExecution.id == execution["id"]).update(
+            {"worker_id": "new_owner", "items_scraped": 7, "stats": {"owner": "new_owner"}}
+        )
+        db.commit()
+        db.close()
+        await asyncio.wait_for(task, timeout=30)
+        await leases.stop_heartbeat()
+        return execution["id"]
+
+    try:
+        execution_id = asyncio.run(run())
+        execution = asyncio.run(service.get_execution(execution_id))
+        assert execution["status"] == "running" and execution["items_scraped"] == 7
+        assert execution["stats"] == {"owner": "new_owner"}
+        assert service.running_spiders == {} and service.running_executions == {}
+        assert execution_id not in leases.held
+    finally:
+        server.shutdown()
+        db_setup.query(SpiderExecution).filter(SpiderExecution.spider_id == spider_id).delete(synchronize_session=False)
+        db_setup.query(Spider).filter(Spider.id == spider_id).delete(synchronize_session=False)
+        db_setup.commit()
 
 @pytest.mark.xfail(reason="This test might fail if the web server is unavailable or has changed")
-def test_run_spider(create_test_spider):
+def test_run_spider(create_test_spider, tmp_path, monkeypatch):
     """Test running a spider"""
     spider_id = create_test_spider
+    for name, store in local_stores(tmp_path).items():
+        monkeypatch.setattr(spiders_endpoint.spider_service, name, store)
 
     # Run the spider
     response = client.post(f"/api/v1/spiders/{spider_id}/run")
@@ -676,16 +676,34 @@ const SpiderBuilder = () => {
                 </TextField>
 
                 {selectedNode.data.params?.processor_type === 'regular_expression' && (
-                  <TextField
-                    fullWidth
-                    label="Pattern"
-                    value={selectedNode.data.params?.pattern || ''}
-                    onChange={(e) => handleNodeUpdate({
-                      ...selectedNode.data.params,
-                      pattern: e.target.value
-                    })}
-                    sx={{ mb: 2 }}
-                  />
+                  <>
+                    <TextField
+                      fullWidth
+                      label="Pattern"
+                      value={selectedNode.data.params?.pattern || ''}
+                      onChange={(e) => handleNodeUpdate({
+                        ...selectedNode.data.params,
+                        pattern: e.target.value
+                      })}
+                      sx={{ mb: 2 }}
+                    />
+                    <TextField
+                      fullWidth
+                      label="Match Mode"
+                      select
+                      SelectProps={{ native: true }}
+                      value={selectedNode.data.params?.regex_mode || 'first'}
+                      onChange={(e) => handleNodeUpdate({
+                        ...selectedNode.data.params,
+                        regex_mode: e.target.value
+                      })}
+                      sx={{ mb: 2 }}
+                    >
+                      <option value="first">First Match</option>
+                      <option value="all">All Matches</option>
+                      <option value="groups">Named Groups</option>
+                    </TextField>
+                  </>
                 )}
               </Box>
             )}